@@ -0,0 +1,155 @@
+"""
+Find the fastest torch thread and worker counts for this machine, measuring BERT
+disambiguation and parsing (parse_text_tuples) on sample sentences. Every configuration
+runs in a fresh process. The fastest one is saved to models/thread_config.json, and is
+used by default by text_to_conll_cli.py and the batch scripts on this machine.
+
+Usage:
+    autotune_threads [-i <input> | --input=<input>]
+        [-n <sentences> | --sentences=<sentences>]
+        [-m <model> | --model=<model>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--threads=<threads>] [--interop_threads=<interop_threads>] [--workers=<workers>]
+        [--no_save]
+    autotune_threads --measure --threads=<threads> --interop_threads=<interop_threads> --workers=<workers>
+        [-i <input> | --input=<input>] [-n <sentences> | --sentences=<sentences>]
+        [-m <model> | --model=<model>] [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+    autotune_threads (-h | --help)
+
+Options:
+    -i <input> --input=<input>
+        A text file, repeated up to the number of sentences [default: data/samples/input_text.txt]
+    -n <sentences> --sentences=<sentences>
+        The number of sentences processed by each configuration [default: 200]
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database to use [default: r13]
+    --threads=<threads>
+        Comma-separated intra-op thread counts to try. Defaults to powers of 2 up to the number of cores, and the number of cores
+    --interop_threads=<interop_threads>
+        Comma-separated inter-op thread counts to try [default: 1,2]
+    --workers=<workers>
+        Comma-separated worker counts to try. Defaults to powers of 2 up to the number of cores.
+        Only configurations with threads x workers <= cores are measured
+    --no_save
+        Only print the measurements, without saving the fastest configuration
+    --measure
+        Measure a single configuration in this process (used by the tool itself)
+    -h --help
+        Show this screen.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from docopt import docopt
+
+from src.utils.threads import THREAD_CONFIG_PATH, configure_threads, save_thread_config
+
+arguments = docopt(__doc__)
+
+
+def get_default_counts(cpu_count: int) -> List[int]:
+    counts = [2 ** i for i in range(cpu_count.bit_length()) if 2 ** i <= cpu_count]
+    return counts if cpu_count in counts else counts + [cpu_count]
+
+def read_sentences(input_path: str, sentence_count: int) -> List[str]:
+    with open(input_path, 'r') as f:
+        lines = [line for line in f.readlines() if line.strip()]
+    return [lines[i % len(lines)] for i in range(sentence_count)]
+
+def measure(threads: int, interop_threads: int, workers: int) -> dict:
+    # the thread counts are set before torch is used by the pipeline
+    thread_counts = configure_threads(threads, interop_threads, workers=workers)
+
+    from camel_tools.utils.charmap import CharMapper
+    from src.data_preparation import disambiguate_sentences
+    from src.dependency_parser.biaff_parser import load_parser, parse_text_tuples
+    from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+    from src.utils.model_downloader import get_model_name
+    from src.utils.text_cleaner import clean_lines
+    from src.utils.workers import run_forked_workers
+
+    model_path = Path(__file__).parent/"models"
+    parse_model_path = str(model_path/get_model_name(arguments['--model'], model_path=model_path))
+    arclean = CharMapper.builtin_mapper("arclean")
+    disambiguator = get_disambiguator('bert', arguments['--morphology_db_type'])
+    load_parser(parse_model_path)
+    lines = read_sentences(arguments['--input'], int(arguments['--sentences']))
+
+    def process_lines(chunk_lines):
+        token_lines = [token_line for token_line in clean_lines(chunk_lines, arclean) if token_line]
+        start_time = time.perf_counter()
+        disambiguate_sentences(disambiguator, token_lines)
+        disambiguation_time = time.perf_counter() - start_time
+
+        sentence_tuples = [[(0, token, '_', 'UNK', '_', '_', '_', '_', '_', '_') for token in token_line] for token_line in token_lines]
+        start_time = time.perf_counter()
+        parse_text_tuples(sentence_tuples, parse_model_path)
+        return disambiguation_time, time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    if workers == 1:
+        stage_times = [process_lines(lines)]
+    else:
+        stage_times, _ = run_forked_workers(process_lines, [(lines[i::workers],) for i in range(workers)], workers)
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        **thread_counts,
+        'workers': workers,
+        'sentences/s': len(lines) / wall_time,
+        # per worker, each worker processes 1/workers of the sentences
+        'disambiguation s': max(disambiguation_time for disambiguation_time, _ in stage_times),
+        'parsing s': max(parsing_time for _, parsing_time in stage_times),
+    }
+
+def run_measurement(threads: int, interop_threads: int, workers: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, '--measure', f'--threads={threads}', f'--interop_threads={interop_threads}',
+         f'--workers={workers}', f"--input={arguments['--input']}", f"--sentences={arguments['--sentences']}",
+         f"--model={arguments['--model']}", f"--morphology_db_type={arguments['--morphology_db_type']}"],
+        cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    if arguments['--measure']:
+        print(json.dumps(measure(int(arguments['--threads']), int(arguments['--interop_threads']), int(arguments['--workers']))))
+        return
+
+    cpu_count = os.cpu_count() or 1
+    thread_counts = [int(count) for count in arguments['--threads'].split(',')] if arguments['--threads'] else get_default_counts(cpu_count)
+    interop_counts = [int(count) for count in arguments['--interop_threads'].split(',')]
+    worker_counts = [int(count) for count in arguments['--workers'].split(',')] if arguments['--workers'] else get_default_counts(cpu_count)
+
+    rows = []
+    for workers in worker_counts:
+        for threads in thread_counts:
+            if threads * workers > cpu_count:
+                continue
+            for interop_threads in interop_counts:
+                row = run_measurement(threads, interop_threads, workers)
+                print(f"workers {workers}, threads {threads}, interop threads {interop_threads}: {row['sentences/s']:.1f} sentences/s", file=sys.stderr)
+                rows.append(row)
+    assert rows, f'No configuration with threads x workers <= {cpu_count} cores'
+
+    rows.sort(key=lambda row: row['sentences/s'], reverse=True)
+    print('workers\tthreads\tinterop\tsentences/s\tdisambiguation s\tparsing s')
+    for row in rows:
+        print(f"{row['workers']}\t{row['threads']}\t{row['interop_threads']}\t{row['sentences/s']:.1f}\t"
+              f"{row['disambiguation s']:.2f}\t{row['parsing s']:.2f}")
+
+    best = rows[0]
+    if not arguments['--no_save']:
+        save_thread_config({key: best[key] for key in ['threads', 'interop_threads', 'workers', 'sentences/s']})
+        print(f"saved workers {best['workers']}, threads {best['threads']}, interop threads {best['interop_threads']} to {THREAD_CONFIG_PATH}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare BERT disambiguation with the batches of camel_tools (32 sentences, sorted by word count)
+and with length-sorted batches under token budgets (--token_budget, see
+src/initialize_disambiguator/bert_disambiguator.py), on CPU, on a synthetic corpus of mixed
+sentence lengths. Reports the padded subword tokens of each batching and checks that all give
+the same analyses.
+
+Usage:
+    python -m benchmarks.bert_batching [-n <sentences> | --sentences=<sentences>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--budgets=<budgets>] [--sigma=<sigma>] [--runs=<runs>]
+    python -m benchmarks.bert_batching (-h | --help)
+
+Options:
+    -n <sentences> --sentences=<sentences>
+        The number of sentences [default: 2000]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database used by the disambiguator [default: r13]
+    --budgets=<budgets>
+        Comma-separated token budgets to measure [default: 1024,2048,4096,8192]
+    --sigma=<sigma>
+        The sigma of the lognormal sentence lengths; larger values mix lengths more [default: 0.8]
+    --runs=<runs>
+        The number of timed runs of each batching [default: 2]
+    -h --help
+        Show this screen.
+"""
+
+import random
+import time
+
+from docopt import docopt
+
+from benchmarks.synthetic_corpus import generate_sentences, get_length_sampler, get_zipf_sampler, read_sample_words
+from src.initialize_disambiguator.bert_disambiguator import get_subword_lengths, plan_batches
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+
+# the batch size of camel_tools' BERT disambiguator
+DEFAULT_BATCH_SIZE = 32
+
+
+def get_padded_tokens(lengths, batches):
+    return sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+
+def get_default_batches(token_lines):
+    # camel_tools sorts the sentences by word count, and batches them by DEFAULT_BATCH_SIZE
+    order = sorted(range(len(token_lines)), key=lambda i: len(token_lines[i]))
+    return [order[start:start + DEFAULT_BATCH_SIZE] for start in range(0, len(order), DEFAULT_BATCH_SIZE)]
+
+def get_top_analyses(disambiguated_sentences):
+    return [[word.analyses[0].analysis if word.analyses else None for word in sentence] for sentence in disambiguated_sentences]
+
+def main():
+    arguments = docopt(__doc__)
+    budgets = [int(budget) for budget in arguments['--budgets'].split(',')]
+
+    rng = random.Random(0)
+    sample_sentences = read_sample_words('preprocessed_text')
+    vocab = list(dict.fromkeys(word for sentence in sample_sentences for word in sentence))
+    token_lines = generate_sentences(
+        int(arguments['--sentences']),
+        get_zipf_sampler(vocab, 1.1, rng),
+        get_length_sampler('lognormal', [], mean_length=20, sigma=float(arguments['--sigma']), rng=rng),
+        duplication=0, rng=rng
+    )
+    disambiguator = get_disambiguator('bert', arguments['--morphology_db_type'])
+    # measured on CPU, even if a GPU is available
+    disambiguator.disambiguator._model['unfactored']._use_gpu = False
+    lengths = get_subword_lengths(disambiguator.tokenizer.tokenize, token_lines)
+    print(f'{len(token_lines)} sentences, {sum(len(token_line) for token_line in token_lines)} words, {sum(lengths)} subword tokens')
+
+    batchings = [('default', None, get_default_batches(token_lines))]
+    batchings += [(f'budget {budget}', budget, plan_batches(lengths, budget)) for budget in budgets]
+    default_time = None
+    default_analyses = None
+    print('batching\tbatches\tpadded tokens\tseconds\tsentences/s\tspeedup')
+    for name, token_budget, batches in batchings:
+        disambiguator.token_budget = token_budget
+        times = []
+        for _ in range(int(arguments['--runs'])):
+            start_time = time.perf_counter()
+            analyses = get_top_analyses(disambiguator.disambiguate_sentences(token_lines))
+            times.append(time.perf_counter() - start_time)
+        best_time = min(times)
+        if default_analyses is None:
+            default_time, default_analyses = best_time, analyses
+        assert analyses == default_analyses, f'The analyses of {name} differ from those of the default batches'
+        print(f'{name}\t{len(batches)}\t{get_padded_tokens(lengths, batches)}\t{best_time:.2f}'
+              f'\t{len(token_lines) / best_time:.0f}\t{default_time / best_time:.2f}')
+    print('identical analyses')
+
+if __name__ == '__main__':
+    main()
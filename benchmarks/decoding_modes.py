@@ -0,0 +1,106 @@
+"""
+Compare the parser decoding algorithms on a gold CoNLL file.
+Reports UAS, LAS, the share of well-formed trees and the parse time per sentence
+for each decoding mode and sentence length bucket.
+
+Usage:
+    python -m benchmarks.decoding_modes (-i <input> | --input=<input>)
+        [-m <model> | --model=<model>]
+        [--modes=<modes>]
+        [--buckets=<buckets>]
+    python -m benchmarks.decoding_modes (-h | --help)
+
+Options:
+    -i <input> --input=<input>
+        A gold CoNLL file
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    --modes=<modes>
+        Comma-separated decoding modes to compare [default: proj,mst,greedy]
+    --buckets=<buckets>
+        Comma-separated upper bounds (in tokens) of the sentence length buckets [default: 10,20,40,80]
+    -h --help
+        Show this screen.
+"""
+
+import time
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+from docopt import docopt
+from transformers.utils import logging
+
+from src.dependency_parser.biaff_parser import load_parser, parse_text_tuples
+from src.utils.conll_reader import read_conll
+from src.utils.model_downloader import get_model_name
+from src.utils.tracing import get_length_bucket
+
+logging.set_verbosity_error()
+
+
+def is_tree(heads: List[int]) -> bool:
+    """Check that the heads form a single rooted tree with no cycles."""
+    if sum(head == 0 for head in heads) != 1:
+        return False
+    for i in range(1, len(heads) + 1):
+        visited = set()
+        node = i
+        while node != 0:
+            if node in visited:
+                return False
+            visited.add(node)
+            node = heads[node - 1]
+    return True
+
+def evaluate_bucket(gold_trees: List[List[tuple]], parsed_trees: List[List[tuple]]) -> dict:
+    tokens = heads_correct = labels_correct = trees = 0
+    for gold_tree, parsed_tree in zip(gold_trees, parsed_trees):
+        parsed_heads = [int(token_tuple[6]) for token_tuple in parsed_tree]
+        trees += is_tree(parsed_heads)
+        for gold_tuple, parsed_tuple in zip(gold_tree, parsed_tree):
+            tokens += 1
+            if int(gold_tuple[6]) == int(parsed_tuple[6]):
+                heads_correct += 1
+                labels_correct += gold_tuple[7] == parsed_tuple[7]
+    return {
+        'tokens': tokens,
+        'UAS': round(100 * heads_correct / tokens, 2),
+        'LAS': round(100 * labels_correct / tokens, 2),
+        'trees %': round(100 * trees / len(gold_trees), 2),
+    }
+
+def main():
+    arguments = docopt(__doc__)
+    root_dir = Path(__file__).parents[1]
+    model_path = root_dir/"models"
+    parse_model = str(model_path/get_model_name(arguments['--model'], model_path=model_path))
+    modes = arguments['--modes'].split(',')
+    bounds = [int(bound) for bound in arguments['--buckets'].split(',')]
+
+    _, gold_trees = read_conll(arguments['--input'])
+    buckets = {}
+    for tree in gold_trees:
+        buckets.setdefault(get_length_bucket(len(tree), bounds), []).append(tree)
+
+    # load the model before timing, so only parsing is measured
+    load_parser(parse_model)
+
+    rows = []
+    for mode in modes:
+        for bucket_name, bucket_trees in sorted(buckets.items(), key=lambda item: int(item[0].split('-')[0].rstrip('+'))):
+            start_time = time.perf_counter()
+            parsed_trees = parse_text_tuples(bucket_trees, parse_model, decoding=mode)
+            elapsed = time.perf_counter() - start_time
+            rows.append({
+                'mode': mode,
+                'length': bucket_name,
+                'sentences': len(bucket_trees),
+                **evaluate_bucket(bucket_trees, parsed_trees),
+                'ms/sentence': round(1000 * elapsed / len(bucket_trees), 2),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure how feature extraction scales with the number of feature workers
+(--feature_workers, see src/parse_disambiguation/feature_workers.py), on the MLE analyses
+of a synthetic corpus, and check that every worker count gives the same token tuples.
+
+Usage:
+    python -m benchmarks.feature_workers [-n <sentences> | --sentences=<sentences>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--workers=<workers>] [--tagsets=<tagsets>]
+    python -m benchmarks.feature_workers (-h | --help)
+
+Options:
+    -n <sentences> --sentences=<sentences>
+        The number of sentences [default: 5000]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database used to disambiguate the corpus [default: r13]
+    --workers=<workers>
+        Comma-separated worker counts to measure. Defaults to powers of 2 up to the number of cores
+    --tagsets=<tagsets>
+        Comma-separated tagsets to extract [default: catib6]
+    -h --help
+        Show this screen.
+"""
+
+import os
+import random
+import time
+from pathlib import Path
+
+import pandas as pd
+from docopt import docopt
+
+from benchmarks.synthetic_corpus import generate_sentences, get_length_sampler, get_zipf_sampler, read_sample_words
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+from src.parse_disambiguation.disambiguation_analysis import to_sentence_analysis_list
+from src.parse_disambiguation.feature_workers import to_conll_fields_lists_parallel
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+def main():
+    arguments = docopt(__doc__)
+    cpu_count = os.cpu_count() or 1
+    if arguments['--workers']:
+        worker_counts = [int(count) for count in arguments['--workers'].split(',')]
+    else:
+        worker_counts = [2 ** i for i in range(cpu_count.bit_length()) if 2 ** i <= cpu_count]
+    tagsets = arguments['--tagsets'].split(',')
+
+    rng = random.Random(0)
+    sample_sentences = read_sample_words('preprocessed_text')
+    vocab = list(dict.fromkeys(word for sentence in sample_sentences for word in sentence))
+    token_lines = generate_sentences(
+        int(arguments['--sentences']),
+        get_zipf_sampler(vocab, 1.1, rng),
+        get_length_sampler('lognormal', [], mean_length=20, sigma=0.6, rng=rng),
+        duplication=0, rng=rng
+    )
+    disambiguator = get_disambiguator('mle', arguments['--morphology_db_type'])
+    sentence_analysis_list = to_sentence_analysis_list(disambiguator.disambiguate_sentences(token_lines), token_lines)
+    clitic_feats_df = pd.read_csv(ROOT_DIR/'data/clitic_feats.csv').astype(str).astype(object)
+    print(f'{len(token_lines)} sentences, {sum(len(token_line) for token_line in token_lines)} words, {cpu_count} cores')
+
+    serial_time = None
+    serial_tuples = None
+    print('workers\tseconds\tsentences/s\tspeedup')
+    for workers in [1] + [count for count in worker_counts if count != 1]:
+        start_time = time.perf_counter()
+        text_tuples_by_tagset = to_conll_fields_lists_parallel(sentence_analysis_list, clitic_feats_df, tagsets, workers)
+        elapsed = time.perf_counter() - start_time
+        if serial_tuples is None:
+            serial_time, serial_tuples = elapsed, text_tuples_by_tagset
+        assert text_tuples_by_tagset == serial_tuples, f'The token tuples of {workers} workers differ from those of a single process'
+        print(f'{workers}\t{elapsed:.2f}\t{len(token_lines) / elapsed:.0f}\t{serial_time / elapsed:.2f}')
+    print('identical token tuples')
+
+if __name__ == '__main__':
+    main()
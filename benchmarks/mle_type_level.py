@@ -0,0 +1,65 @@
+"""
+Compare MLE disambiguation sentence by sentence and type by type (-d mle vs -d mle_type)
+on a synthetic corpus with Zipfian word frequencies, and check that both give the same analyses.
+
+Usage:
+    python -m benchmarks.mle_type_level [-n <sentences> | --sentences=<sentences>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--zipf=<zipf>] [--runs=<runs>]
+    python -m benchmarks.mle_type_level (-h | --help)
+
+Options:
+    -n <sentences> --sentences=<sentences>
+        The number of sentences [default: 20000]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database; its stems extend the vocabulary of the sample inputs [default: r13]
+    --zipf=<zipf>
+        The exponent of the Zipfian word distribution [default: 1.1]
+    --runs=<runs>
+        The number of timed runs of each mode; each run uses a new disambiguator, so its caches start empty [default: 3]
+    -h --help
+        Show this screen.
+"""
+
+import random
+import time
+
+from docopt import docopt
+
+from benchmarks.synthetic_corpus import generate_sentences, get_length_sampler, get_zipf_sampler, read_db_vocab, read_sample_words
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+
+
+def main():
+    arguments = docopt(__doc__)
+    morphology_db_type = arguments['--morphology_db_type']
+
+    rng = random.Random(0)
+    sample_sentences = read_sample_words('preprocessed_text')
+    vocab = list(dict.fromkeys([word for sentence in sample_sentences for word in sentence] + read_db_vocab(morphology_db_type)))
+    token_lines = generate_sentences(
+        int(arguments['--sentences']),
+        get_zipf_sampler(vocab, float(arguments['--zipf']), rng),
+        get_length_sampler('lognormal', [], mean_length=20, sigma=0.6, rng=rng),
+        duplication=0, rng=rng
+    )
+    token_count = sum(len(token_line) for token_line in token_lines)
+    type_count = len({word for token_line in token_lines for word in token_line})
+    print(f'{len(token_lines)} sentences, {token_count} tokens, {type_count} word types')
+
+    results = {}
+    for mode in ['mle', 'mle_type']:
+        times = []
+        for _ in range(int(arguments['--runs'])):
+            disambiguator = get_disambiguator(mode, morphology_db_type)
+            start_time = time.perf_counter()
+            results[mode] = disambiguator.disambiguate_sentences(token_lines)
+            times.append(time.perf_counter() - start_time)
+        best_time = min(times)
+        print(f'{mode}: {best_time:.2f}s ({token_count / best_time:.0f} tokens/s)')
+
+    assert results['mle'] == results['mle_type'], 'The type-level analyses differ from the sentence-level analyses'
+    print('identical analyses')
+
+if __name__ == '__main__':
+    main()
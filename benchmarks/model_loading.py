@@ -0,0 +1,92 @@
+"""
+Compare the start time and memory of loading a parser checkpoint with Parser.load
+and with the memory-mapped loader. Every load runs in a fresh process.
+
+Usage:
+    python -m benchmarks.model_loading [-m <model> | --model=<model>]
+        [-i <input> | --input=<input>]
+        [--runs=<runs>]
+    python -m benchmarks.model_loading --measure=<loader> --model_file=<model_file> --input=<input>
+    python -m benchmarks.model_loading (-h | --help)
+
+Options:
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    -i <input> --input=<input>
+        Tokenized sentences parsed after loading [default: data/samples/input_tokenized.txt]
+    --runs=<runs>
+        The number of runs of each loader [default: 3]
+    --measure=<loader>
+        Measure a single load in this process, either checkpoint or mmap (used by the benchmark itself)
+    --model_file=<model_file>
+        The path of the model checkpoint, with --measure
+    -h --help
+        Show this screen.
+"""
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from docopt import docopt
+from supar import Parser
+
+from src.dependency_parser.mmap_checkpoint import convert_checkpoint, has_mmap_checkpoint, load_mmap_parser
+from src.utils.memory import get_peak_rss_mb, get_rss_mb
+from src.utils.model_downloader import get_model_name
+
+LOADERS = {
+    'checkpoint': Parser.load,
+    'mmap': load_mmap_parser,
+}
+
+
+def measure(loader: str, model_file: str, input_path: str) -> dict:
+    with open(input_path, 'r') as f:
+        sentences = [line.split() for line in f.readlines() if line.strip()]
+
+    start_rss = get_rss_mb()
+    start_time = time.perf_counter()
+    parser = LOADERS[loader](model_file)
+    load_time = time.perf_counter() - start_time
+    loaded_rss = get_rss_mb()
+
+    parser.predict(sentences, verbose=False, tree=True, proj=True)
+    return {
+        'loader': loader,
+        'load s': round(load_time, 2),
+        'rss after load MB': round(loaded_rss - start_rss),
+        'rss after parse MB': round(get_rss_mb() - start_rss),
+        'peak rss MB': round(get_peak_rss_mb()),
+    }
+
+def main():
+    arguments = docopt(__doc__)
+    if arguments['--measure']:
+        print(json.dumps(measure(arguments['--measure'], arguments['--model_file'], arguments['--input'])))
+        return
+
+    root_dir = Path(__file__).parents[1]
+    model_path = root_dir/"models"
+    model_file = str(model_path/get_model_name(arguments['--model'], model_path=model_path))
+    if not has_mmap_checkpoint(model_file):
+        convert_checkpoint(model_file)
+
+    rows = []
+    for _ in range(int(arguments['--runs'])):
+        for loader in LOADERS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.model_loading', f'--measure={loader}',
+                 f'--model_file={model_file}', f"--input={arguments['--input']}"],
+                cwd=root_dir, capture_output=True, text=True, check=True
+            ).stdout
+            rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    # memory is measured from the start of loading, so the cost of the imports is left out
+    print(pd.DataFrame(rows).groupby('loader', sort=False).median().to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Measure how the pipeline scales with corpus size. For each file type, synthetic corpora
+of increasing sizes are generated (see benchmarks/synthetic_corpus.py) and parsed in a
+fresh process, recording the wall time, the peak RSS and the time spent in each stage.
+
+The report gives, for the total and for each stage, the scaling exponent k of
+time ~ sentences^k (a least squares fit on a log-log scale). Stages with k above
+1 + tolerance are flagged as superlinear.
+
+Usage:
+    python -m benchmarks.scaling [--file_types=<file_types>]
+        [--sizes=<sizes>]
+        [-m <model> | --model=<model>]
+        [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--lengths=<lengths>] [--duplication=<duplication>] [--db_vocab]
+        [--tolerance=<tolerance>]
+        [--corpus_dir=<corpus_dir>]
+        [--output=<output>]
+    python -m benchmarks.scaling --measure=<file_type> --input=<input> [-m <model> | --model=<model>]
+        [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+    python -m benchmarks.scaling (-h | --help)
+
+Options:
+    --file_types=<file_types>
+        Comma-separated file types to measure [default: text,preprocessed_text,tokenized,tokenized_tagged,conll]
+    --sizes=<sizes>
+        Comma-separated corpus sizes, in sentences [default: 1000,10000,100000]
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    -d <disambiguator> --disambiguator=<disambiguator>
+        The disambiguation technique, either 'mle', 'mle_type' or 'bert' [default: bert]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database to use [default: r13]
+    --lengths=<lengths>
+        The sentence length distribution of the corpora, samples or lognormal [default: lognormal]
+    --duplication=<duplication>
+        The share of duplicated sentences in the corpora [default: 0.05]
+    --db_vocab
+        Add the stems of the morphology database to the vocabulary of the text corpora
+    --tolerance=<tolerance>
+        Stages with a scaling exponent above 1 + tolerance are flagged as superlinear [default: 0.15]
+    --corpus_dir=<corpus_dir>
+        Where the corpora are written; corpora that already exist are reused [default: benchmarks/corpora]
+    --output=<output>
+        Also save the measurements to this CSV file
+    --measure=<file_type>
+        Parse a single corpus in this process, and print the measurements (used by the benchmark itself)
+    --input=<input>
+        The corpus parsed with --measure
+    -h --help
+        Show this screen.
+"""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import pandas as pd
+from docopt import docopt
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.utils import stages
+from src.utils.memory import get_peak_rss_mb
+from src.utils.tracing import StageTimer
+
+ROOT_DIR = Path(__file__).parents[1]
+CORPUS_SUFFIXES = {'conll': 'conllx'}
+
+
+def measure(file_type: str, input_path: str, parse_model: str, disambiguator_type: str, morphology_db_type: str) -> dict:
+    # imported here, so the parent process does not load the pipeline
+    from camel_tools.utils.charmap import CharMapper
+
+    from src.conll_output import text_tuples_to_string
+    from src.data_preparation import get_file_type_params, get_tagset, parse_text
+    from src.dependency_parser.biaff_parser import load_parser
+    from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+    from src.utils.model_downloader import get_model_name
+
+    model_path = ROOT_DIR/'models'
+    model_file = model_path/get_model_name(parse_model, model_path=model_path)
+    clitic_feats_df = pd.read_csv(ROOT_DIR/'data/clitic_feats.csv').astype(str).astype(object)
+    with open(input_path, 'r') as f:
+        lines = [line for line in f.readlines() if line.strip()]
+
+    start_time = time.perf_counter()
+    if file_type in ['text', 'preprocessed_text']:
+        disambiguator = get_disambiguator(disambiguator_type, morphology_db_type)
+    else:
+        disambiguator = disambiguator_type
+    load_parser(str(model_file))
+    load_time = time.perf_counter() - start_time
+
+    stage_timer = StageTimer()
+    stages.add_stage_observer(stage_timer)
+    start_time = time.perf_counter()
+    file_type_params = get_file_type_params(lines, file_type, input_path, model_file, CharMapper.builtin_mapper('arclean'),
+        disambiguator, clitic_feats_df, get_tagset(parse_model), morphology_db_type)
+    parsed_text_tuples = parse_text(file_type, file_type_params)
+    with stages.stage(stages.OUTPUT):
+        text_tuples_to_string(parsed_text_tuples, file_type, sentences=lines)
+    wall_time = time.perf_counter() - start_time
+    stages.remove_stage_observer(stage_timer)
+
+    return {
+        'sentences': len(parsed_text_tuples),
+        'tokens': sum(len(sentence_tuples) for sentence_tuples in parsed_text_tuples),
+        'load s': load_time,
+        'wall s': wall_time,
+        'peak rss MB': get_peak_rss_mb(),
+        **{f'{name} s': stage_timer.totals[name] for name in stages.STAGES if name in stage_timer.totals},
+    }
+
+def get_scaling_exponent(sizes: Sequence[float], values: Sequence[float]) -> float:
+    """The slope of log(values) over log(sizes), by least squares. NaN if there are fewer than two positive values."""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if value > 0]
+    if len(points) < 2:
+        return math.nan
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return math.nan
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+def scaling_report(measurements: pd.DataFrame, tolerance: float) -> str:
+    report_lines = []
+    for file_type, file_type_measurements in measurements.groupby('file_type', sort=False):
+        file_type_measurements = file_type_measurements.drop(columns='file_type').set_index('size').dropna(axis=1, how='all')
+        report_lines.extend([f'## {file_type}', file_type_measurements.round(2).to_string(), '', 'scaling exponents:'])
+
+        time_columns = [column for column in file_type_measurements.columns if column.endswith(' s') and column != 'load s']
+        for column in time_columns:
+            exponent = get_scaling_exponent(file_type_measurements.index, file_type_measurements[column].fillna(0))
+            flag = '\tSUPERLINEAR' if exponent > 1 + tolerance else ''
+            report_lines.append(f'\t{column[:-2]}: {exponent:.2f}{flag}')
+        # the peak RSS includes the models, so it is far from linear even when the data is
+        report_lines.append(f"\tpeak rss: {get_scaling_exponent(file_type_measurements.index, file_type_measurements['peak rss MB']):.2f}")
+        report_lines.append('')
+    return '\n'.join(report_lines)
+
+def run_measurement(file_type: str, corpus_path: Path, arguments: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.scaling', f'--measure={file_type}', f'--input={corpus_path}',
+         f"--model={arguments['--model']}", f"--disambiguator={arguments['--disambiguator']}",
+         f"--morphology_db_type={arguments['--morphology_db_type']}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    arguments = docopt(__doc__)
+    if arguments['--measure']:
+        print(json.dumps(measure(arguments['--measure'], arguments['--input'], arguments['--model'],
+            arguments['--disambiguator'], arguments['--morphology_db_type'])))
+        return
+
+    file_types: List[str] = arguments['--file_types'].split(',')
+    sizes = [int(size) for size in arguments['--sizes'].split(',')]
+    corpus_dir = Path(arguments['--corpus_dir'])
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    rows = []
+    for file_type in file_types:
+        for size in sizes:
+            corpus_path = corpus_dir / f"{file_type}.{size}.{CORPUS_SUFFIXES.get(file_type, 'txt')}"
+            if not corpus_path.exists():
+                generate_corpus(corpus_path, size, file_type=file_type, lengths=arguments['--lengths'],
+                    duplication=float(arguments['--duplication']),
+                    db_vocab=arguments['--morphology_db_type'] if arguments['--db_vocab'] else None)
+            measurement = run_measurement(file_type, corpus_path.resolve(), arguments)
+            rows.append({'file_type': file_type, 'size': size, **measurement})
+            print(f"{file_type} {size}: {measurement['wall s']:.1f}s", file=sys.stderr)
+
+    measurements = pd.DataFrame(rows)
+    if arguments['--output']:
+        measurements.to_csv(arguments['--output'], index=False)
+    print(scaling_report(measurements, float(arguments['--tolerance'])))
+
+if __name__ == '__main__':
+    main()
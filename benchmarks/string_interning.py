@@ -0,0 +1,163 @@
+"""
+Measure the memory held by the trees parse_text returns for a million tokens of text,
+with and without sharing repeated strings (see src/utils/interning.py).
+
+A synthetic text corpus (see benchmarks/synthetic_corpus.py) is parsed by the text pipeline
+in a fresh process for each run, and the trees returned are measured once parsing is done:
+    baseline: the pipeline without interning; the interning of the token tuples is turned off,
+        and the FEATS strings are joined with json.dumps for every token, as before the change
+    interned: the pipeline as it is
+The memory held counts each object reachable from the trees once, so a string shared
+by many tokens is counted once.
+
+Usage:
+    python -m benchmarks.string_interning [--tokens=<tokens>]
+        [-m <model> | --model=<model>]
+        [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [--corpus_dir=<corpus_dir>]
+    python -m benchmarks.string_interning --measure=<run> --input=<input> [-m <model> | --model=<model>]
+        [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+    python -m benchmarks.string_interning (-h | --help)
+
+Options:
+    --tokens=<tokens>
+        The number of tokens parsed, about; the corpus has one sentence per 20 words [default: 1000000]
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    -d <disambiguator> --disambiguator=<disambiguator>
+        The disambiguation technique, either 'mle', 'mle_type' or 'bert' [default: bert]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database to use [default: r13]
+    --corpus_dir=<corpus_dir>
+        Where the corpus is written; a corpus that already exists is reused [default: benchmarks/corpora]
+    --measure=<run>
+        Parse the corpus in this process, either baseline or interned, and print the measurements
+        (used by the benchmark itself)
+    --input=<input>
+        The corpus parsed with --measure
+    -h --help
+        Show this screen.
+"""
+
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+from docopt import docopt
+
+from benchmarks.synthetic_corpus import generate_corpus
+
+ROOT_DIR = Path(__file__).parents[1]
+RUNS = ['baseline', 'interned']
+MEAN_LENGTH = 20
+
+
+def fresh_feats_dict_to_string(feats_dict: dict) -> str:
+    # feats_dict_to_string before the FEATS strings were cached and interned
+    feats_str = json.dumps(feats_dict)
+    return feats_str.replace('", "', "|").replace('": "', "=").replace('{"', '').replace('"}', '')
+
+def fresh_fields(fields, interned_fields=None) -> tuple:
+    return tuple(fields)
+
+def disable_interning() -> None:
+    """Turn off the interning of the pipeline, in the modules that use it."""
+    from src.dependency_parser import biaff_parser
+    from src.parse_disambiguation import feature_extraction, feature_workers
+
+    feature_extraction.intern_string = lambda value: value
+    feature_extraction.feats_dict_to_string = fresh_feats_dict_to_string
+    biaff_parser.intern_fields = fresh_fields
+    feature_workers.intern_fields = fresh_fields
+
+def get_held_memory(parsed_text_tuples: List[List[tuple]]) -> dict:
+    """The size of the objects reachable from the trees, each counted once."""
+    seen = set()
+    size = 0
+    string_count = 0
+    objects = [parsed_text_tuples]
+    while objects:
+        value = objects.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, (list, tuple)):
+            objects.extend(value)
+        elif isinstance(value, str):
+            string_count += 1
+    return {'MB held': size / 2**20, 'distinct strings': string_count}
+
+def measure(run: str, input_path: str, parse_model: str, disambiguator_type: str, morphology_db_type: str) -> dict:
+    # imported here, so the parent process does not load the pipeline
+    from camel_tools.utils.charmap import CharMapper
+
+    from src.data_preparation import get_file_type_params, get_tagset, parse_text
+    from src.dependency_parser.biaff_parser import load_parser
+    from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+    from src.utils.model_downloader import get_model_name
+
+    if run == 'baseline':
+        disable_interning()
+
+    model_path = ROOT_DIR/'models'
+    model_file = model_path/get_model_name(parse_model, model_path=model_path)
+    clitic_feats_df = pd.read_csv(ROOT_DIR/'data/clitic_feats.csv').astype(str).astype(object)
+    with open(input_path, 'r') as f:
+        lines = [line for line in f.readlines() if line.strip()]
+    disambiguator = get_disambiguator(disambiguator_type, morphology_db_type)
+    load_parser(str(model_file))
+
+    start_time = time.perf_counter()
+    file_type_params = get_file_type_params(lines, 'text', input_path, model_file, CharMapper.builtin_mapper('arclean'),
+        disambiguator, clitic_feats_df, get_tagset(parse_model), morphology_db_type)
+    parsed_text_tuples = parse_text('text', file_type_params)
+    wall_time = time.perf_counter() - start_time
+    gc.collect()
+
+    return {
+        'tokens': sum(len(sentence_tuples) for sentence_tuples in parsed_text_tuples),
+        **get_held_memory(parsed_text_tuples),
+        'wall s': wall_time,
+    }
+
+def run_measurement(run: str, corpus_path: Path, arguments: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.string_interning', f'--measure={run}', f'--input={corpus_path}',
+         f"--model={arguments['--model']}", f"--disambiguator={arguments['--disambiguator']}",
+         f"--morphology_db_type={arguments['--morphology_db_type']}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    arguments = docopt(__doc__)
+    if arguments['--measure']:
+        assert arguments['--measure'] in RUNS, f"Invalid run {arguments['--measure']}, should be one of {', '.join(RUNS)}"
+        print(json.dumps(measure(arguments['--measure'], arguments['--input'], arguments['--model'],
+            arguments['--disambiguator'], arguments['--morphology_db_type'])))
+        return
+
+    sentence_count = int(arguments['--tokens']) // MEAN_LENGTH
+    corpus_dir = Path(arguments['--corpus_dir'])
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpus_path = corpus_dir / f'text.{sentence_count}.interning.txt'
+    if not corpus_path.exists():
+        generate_corpus(corpus_path, sentence_count, file_type='text', lengths='lognormal', mean_length=MEAN_LENGTH)
+
+    rows = {}
+    for run in RUNS:
+        rows[run] = run_measurement(run, corpus_path.resolve(), arguments)
+        print(f"{run}: {rows[run]['wall s']:.1f}s", file=sys.stderr)
+    print(pd.DataFrame(rows).T.round(2).to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Generate a synthetic Arabic corpus of any size, in the input format of a file type.
+
+Words are drawn with Zipfian frequencies from the vocabulary of the sample inputs
+(most frequent first), optionally extended with the stems of the morphology database,
+so that large corpora have a realistic share of rare words. Sentence lengths follow
+the sample inputs or a log-normal distribution, and a share of the sentences are
+exact duplicates of earlier ones, as in scraped corpora.
+
+Usage:
+    python -m benchmarks.synthetic_corpus (-o <output> | --output=<output>)
+        (-n <sentences> | --sentences=<sentences>)
+        [-f <file_type> | --file_type=<file_type>]
+        [--lengths=<lengths>] [--mean_length=<mean_length>] [--sigma=<sigma>]
+        [--duplication=<duplication>]
+        [--zipf=<zipf>]
+        [--db_vocab=<morphology_db_type>]
+        [--seed=<seed>]
+    python -m benchmarks.synthetic_corpus (-h | --help)
+
+Options:
+    -o <output> --output=<output>
+        The output file
+    -n <sentences> --sentences=<sentences>
+        The number of sentences
+    -f <file_type> --file_type=<file_type>
+        The input format, one of text, preprocessed_text, tokenized, tokenized_tagged or conll [default: text]
+    --lengths=<lengths>
+        The sentence length distribution [default: samples]
+            samples: the lengths of the sample sentences
+            lognormal: log-normal with the given mean length and sigma
+    --mean_length=<mean_length>
+        The mean sentence length in words, with --lengths=lognormal [default: 20]
+    --sigma=<sigma>
+        The sigma of the log-normal distribution; larger values give more very long sentences [default: 0.6]
+    --duplication=<duplication>
+        The share of sentences that repeat an earlier sentence [default: 0.05]
+    --zipf=<zipf>
+        The exponent of the Zipfian word distribution [default: 1.1]
+    --db_vocab=<morphology_db_type>
+        Add the stems of this morphology database (e.g. r13) to the vocabulary
+    --seed=<seed>
+        The random seed [default: 0]
+    -h --help
+        Show this screen.
+"""
+
+import bisect
+import itertools
+import math
+import random
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Sequence, Union
+
+from docopt import docopt
+
+from src.utils.conll_reader import read_conll
+
+SAMPLES_DIR = Path(__file__).parents[1] / 'data/samples'
+FILE_TYPES = ['text', 'preprocessed_text', 'tokenized', 'tokenized_tagged', 'conll']
+ARABIC_WORD = re.compile(r'^[ء-ي]+$')
+
+Word = Union[str, tuple]
+
+
+def read_sample_words(file_type: str) -> List[List[Word]]:
+    """The sentences of the sample inputs matching the file type, as lists of words
+    (words for text types and tokenized, (token, tag) pairs for tokenized_tagged and conll)."""
+    if file_type in ['text', 'preprocessed_text']:
+        with open(SAMPLES_DIR / 'input_text.txt', 'r') as f:
+            return [line.split() for line in f if line.strip()]
+    if file_type == 'tokenized':
+        with open(SAMPLES_DIR / 'input_tokenized.txt', 'r') as f:
+            return [line.split() for line in f if line.strip()]
+
+    # token and tag pairs, from the sample trees that were tagged
+    sentences = []
+    for conll_file in sorted(SAMPLES_DIR.glob('*.conllx')):
+        _, trees = read_conll(conll_file)
+        sentences.extend(
+            [(token_tuple[1], token_tuple[3]) for token_tuple in tree]
+            for tree in trees if any(token_tuple[3] != 'UNK' for token_tuple in tree)
+        )
+    return sentences
+
+def read_db_vocab(morphology_db_type: str) -> List[str]:
+    # imported here, camel_tools is only needed for the database vocabulary
+    from src.initialize_disambiguator.db_snapshot import build_morphology_db
+    db = build_morphology_db(morphology_db_type)
+    return sorted(stem for stem in db.stem_hash if ARABIC_WORD.match(stem))
+
+def get_zipf_sampler(vocab: Sequence[Word], exponent: float, rng: random.Random) -> Callable[[], Word]:
+    """Sample words of the vocabulary (ordered from most to least frequent) with P(rank) ~ 1 / rank^exponent."""
+    cumulative_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, len(vocab) + 1)))
+    total = cumulative_weights[-1]
+    return lambda: vocab[bisect.bisect(cumulative_weights, rng.random() * total)]
+
+def get_length_sampler(lengths: str, sample_lengths: List[int], mean_length: float, sigma: float,
+                       rng: random.Random) -> Callable[[], int]:
+    if lengths == 'samples':
+        return lambda: rng.choice(sample_lengths)
+    if lengths == 'lognormal':
+        # the mean of a log-normal distribution is exp(mu + sigma^2 / 2)
+        mu = math.log(mean_length) - sigma ** 2 / 2
+        return lambda: max(1, round(rng.lognormvariate(mu, sigma)))
+    raise ValueError(f"Invalid length distribution '{lengths}', should be samples or lognormal")
+
+def generate_sentences(sentence_count: int, sample_word: Callable[[], Word], sample_length: Callable[[], int],
+                       duplication: float, rng: random.Random) -> List[List[Word]]:
+    sentences = []
+    for _ in range(sentence_count):
+        if sentences and rng.random() < duplication:
+            sentences.append(rng.choice(sentences))
+        else:
+            sentences.append([sample_word() for _ in range(sample_length())])
+    return sentences
+
+def format_sentence(sentence: List[Word], file_type: str) -> str:
+    if file_type in ['text', 'preprocessed_text', 'tokenized']:
+        return ' '.join(sentence) + '\n'
+    if file_type == 'tokenized_tagged':
+        return ' '.join(f'({token}, {tag})' for token, tag in sentence) + '\n'
+    if file_type == 'conll':
+        # a chain of heads, the trees are parsed again anyway
+        token_lines = [
+            f"{idx}\t{token}\t_\t{tag}\t_\t_\t{idx - 1}\t{'---' if idx == 1 else 'MOD'}\t_\t_\n"
+            for idx, (token, tag) in enumerate(sentence, 1)
+        ]
+        return ''.join(token_lines) + '\n'
+    raise ValueError(f"Invalid file type '{file_type}', should be one of {', '.join(FILE_TYPES)}")
+
+def generate_corpus(output_path, sentence_count: int, file_type: str='text', lengths: str='samples',
+                    mean_length: float=20, sigma: float=0.6, duplication: float=0.05, zipf: float=1.1,
+                    db_vocab: Union[str, None]=None, seed: int=0) -> None:
+    """Write a synthetic corpus of sentence_count sentences to output_path (see the module docstring)."""
+    rng = random.Random(seed)
+    sample_sentences = read_sample_words(file_type)
+
+    word_counts = Counter(word for sentence in sample_sentences for word in sentence)
+    vocab = [word for word, _ in word_counts.most_common()]
+    if db_vocab and file_type in ['text', 'preprocessed_text']:
+        known_words = set(vocab)
+        vocab += [word for word in read_db_vocab(db_vocab) if word not in known_words]
+
+    sample_word = get_zipf_sampler(vocab, zipf, rng)
+    sample_length = get_length_sampler(lengths, [len(sentence) for sentence in sample_sentences], mean_length, sigma, rng)
+    sentences = generate_sentences(sentence_count, sample_word, sample_length, duplication, rng)
+
+    with open(output_path, 'w', buffering=2**20) as f:
+        f.writelines(format_sentence(sentence, file_type) for sentence in sentences)
+
+def main():
+    arguments = docopt(__doc__)
+    generate_corpus(
+        arguments['--output'],
+        int(arguments['--sentences']),
+        file_type=arguments['--file_type'],
+        lengths=arguments['--lengths'],
+        mean_length=float(arguments['--mean_length']),
+        sigma=float(arguments['--sigma']),
+        duplication=float(arguments['--duplication']),
+        zipf=float(arguments['--zipf']),
+        db_vocab=arguments['--db_vocab'],
+        seed=int(arguments['--seed']),
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Parse requests read from stdin as JSON lines, writing one JSON result per request to stdout,
+with the models loaded once. Meant to be run as a subprocess of another program, which writes
+requests and reads results while the parser stays loaded. See src/utils/coprocess.py for the
+request and result fields.
+
+Requests waiting in stdin are parsed together, grouped by file type, model and decoding.
+The results are written in the order of the requests. Anything else the pipeline prints
+goes to stderr, so stdout only holds results. The process exits at the end of stdin.
+
+Usage:
+    coprocess [-m <models> | --models=<models>]
+        [-f <file_type> | --file_type=<file_type>]
+        [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [--db_snapshot]
+        [--token_budget=<tokens>]
+        [--decoding=<decoding>]
+        [--batch_lines=<batch_lines>]
+        [--subword_cache=<size>]
+        [--threads=<threads>] [--interop_threads=<interop_threads>]
+    coprocess (-h | --help)
+
+Options:
+    -m <models> --models=<models>
+        The comma-separated names of the models loaded (placed in the model directory). Requests choose one
+        with their model field; the first model is the default [default: catib]
+    -f <file_type> --file_type=<file_type>
+        The file type of the requests without a file_type field: text, preprocessed_text, tokenized
+        or tokenized_tagged (see text_to_conll_cli.py) [default: text]
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database to use; will use camel_tools built-in by default [default: r13]
+    -d <disambiguator> --disambiguator=<disambiguator>
+        The disambiguation technique used to tokenize the text lines, either 'mle', 'mle_type' or 'bert' [default: bert]
+    --db_snapshot
+        Load the morphology database from a binary snapshot in the models directory (see text_to_conll_cli.py).
+    --token_budget=<tokens>
+        Batch the sentences disambiguated by BERT by subword length, each batch holding up to this many subword
+        tokens, padding included, instead of 32 sentences. Less padding is computed on inputs of mixed lengths.
+    --decoding=<decoding>
+        The decoding of the requests without a decoding field: proj, mst or greedy (see text_to_conll_cli.py) [default: proj]
+    --batch_lines=<batch_lines>
+        The number of lines parsed together at most; the requests waiting are added to a batch until it
+        has this many lines [default: 2000]
+    --subword_cache=<size>
+        Cache the WordPiece tokenization of up to size words over all the requests, shared by the BERT disambiguator
+        and the parsers when their vocabularies match. The hit rate and the time saved are printed to stderr at exit.
+    --threads=<threads>
+        The number of torch intra-op threads used by disambiguation and parsing. Defaults to the configuration
+        saved by autotune_threads.py on this machine, or to torch's default (one per core).
+    --interop_threads=<interop_threads>
+        The number of torch inter-op threads. Defaults to the saved configuration, or to torch's default.
+    -h --help
+        Show this screen.
+"""
+
+import atexit
+import queue
+import sys
+import threading
+from pathlib import Path
+from camel_tools.utils.charmap import CharMapper
+from src.conll_output import text_tuples_to_string
+from src.data_preparation import get_file_type_params, get_tagset, parse_text
+from src.dependency_parser.biaff_parser import DECODING_MODES, load_parser
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+from src.utils.conll_reader import split_conll_blocks
+from src.utils.coprocess import FILE_TYPES, group_requests, read_requests, take_batch, write_response
+from src.utils.quarantine import Quarantine
+from src.utils.subword_cache import cache_subwords, format_cache_reports
+from src.utils.threads import configure_threads
+from src.utils.model_downloader import get_model_name
+from src.utils.watch_folder import split_batch
+from docopt import docopt
+from pandas import read_csv
+from transformers.utils import logging
+
+logging.set_verbosity_error()
+
+arguments = docopt(__doc__)
+
+def main():
+    root_dir = Path(__file__).parent
+    model_path = root_dir/"models"
+
+    # the results are written to the real stdout; anything printed by the pipeline goes to stderr
+    results_file = sys.stdout
+    sys.stdout = sys.stderr
+
+    # camel_tools import used to clean text
+    arclean = CharMapper.builtin_mapper("arclean")
+
+    #
+    ### Get clitic features
+    #
+    clitic_feats_df = read_csv(root_dir / 'data/clitic_feats.csv')
+    clitic_feats_df = clitic_feats_df.astype(str).astype(object) # so ints read are treated as string objects
+
+
+    #
+    ### cli user input ###
+    #
+    models = arguments['--models'].split(',')
+    morphology_db_type = arguments['--morphology_db_type']
+    snapshot_dir = model_path if arguments['--db_snapshot'] else None
+    token_budget = int(arguments['--token_budget']) if arguments['--token_budget'] else None
+    batch_lines = int(arguments['--batch_lines'])
+    defaults = {'file_type': arguments['--file_type'], 'model': models[0], 'decoding': arguments['--decoding']}
+    choices = {'model': models, 'decoding': list(DECODING_MODES)}
+    assert defaults['file_type'] in FILE_TYPES, f"Invalid file type {defaults['file_type']}"
+    assert defaults['decoding'] in DECODING_MODES, f"Invalid decoding {defaults['decoding']}"
+
+    configure_threads(
+        int(arguments['--threads']) if arguments['--threads'] else None,
+        int(arguments['--interop_threads']) if arguments['--interop_threads'] else None
+    )
+
+    #
+    ### Load the models once, before the first request
+    #
+    model_paths = {model: model_path/get_model_name(model, model_path=model_path) for model in models}
+    parsers = {model: load_parser(str(model_paths[model])) for model in models}
+    disambiguator = get_disambiguator(arguments['--disambiguator'], morphology_db_type, snapshot_dir, token_budget)
+    if arguments['--subword_cache']:
+        subword_caches = cache_subwords(disambiguator, parsers, int(arguments['--subword_cache']))
+        atexit.register(lambda: print(format_cache_reports(subword_caches), file=sys.stderr))
+
+    #
+    ### main code ###
+    #
+    def parse_group(requests, file_type, model, decoding):
+        """The result of each request, parsing the lines of all the requests together."""
+        lines = [line for request in requests for line in request['lines']]
+        if not lines:
+            return [{'id': request.get('id'), 'trees': []} for request in requests]
+        # each sentence is quarantined with the position of its request, so a failing sentence only fails its request
+        quarantine = Quarantine()
+        quarantine.start(lines, source=[position for position, request in enumerate(requests) for _ in request['lines']])
+        file_type_params = get_file_type_params(lines, file_type, None, model_paths[model],
+            arclean, disambiguator, clitic_feats_df, get_tagset(model), morphology_db_type)
+        parsed_text_tuples = parse_text(file_type, file_type_params, decoding=decoding, quarantine=quarantine)
+
+        failures = {}
+        for record in quarantine.records:
+            failures.setdefault(record['source'], record)
+        positions_by_request = split_batch(quarantine.sentence_indices, [len(request['lines']) for request in requests])
+        results = []
+        for position, (request, positions) in enumerate(zip(requests, positions_by_request)):
+            if position in failures:
+                record = failures[position]
+                results.append({'id': request.get('id'),
+                                'error': f"{record['stage']} failed on '{record['text']}': {record['error']}"})
+                continue
+            string_lines = text_tuples_to_string(
+                [parsed_text_tuples[i] for i in positions], file_type,
+                sentences=[lines[quarantine.sentence_indices[i]] for i in positions]
+            )
+            results.append({'id': request.get('id'), 'trees': split_conll_blocks(string_lines)})
+        return results
+
+    request_queue = queue.Queue()
+    reader = threading.Thread(target=read_requests, args=(sys.stdin, request_queue, defaults, choices), daemon=True)
+    reader.start()
+    ended = False
+    while not ended:
+        requests, ended = take_batch(request_queue, batch_lines)
+        results = [None] * len(requests)
+        for position, request in enumerate(requests):
+            if not isinstance(request, dict):
+                results[position] = {'id': request.request_id, 'error': str(request)}
+        for (file_type, model, decoding), positions in group_requests(requests).items():
+            try:
+                group_results = parse_group([requests[position] for position in positions], file_type, model, decoding)
+            except Exception as error:
+                # the error of a stage that does not set sentences aside fails the whole group, not the process
+                group_results = [{'id': requests[position].get('id'), 'error': f'{type(error).__name__}: {error}'}
+                                 for position in positions]
+            for position, result in zip(positions, group_results):
+                results[position] = result
+        for result in results:
+            write_response(results_file, result)
+
+if __name__ == '__main__':
+    main()
@@ -5,82 +5,81 @@ Usage:
     text_to_conll_cli (-i <input> | --input=<input>)
         (-o <output> | --output=<output>)
         [-m <model> | --model=<model>]
+        [--compress=<extension>]
+        [--memory_report]
+        [--profile=<prefix>]
+        [--threads=<threads>] [--interop_threads=<interop_threads>]
     text_to_conll_cli (-h | --help)
 
 Options:
     -i <input> --input=<input>
-        A directory of conll files
+        A directory of conll files (subdirectories included). Files ending with .gz, .bz2, .xz or .zst
+        (with the zstandard package) are decompressed as they are read.
     -o <output> --output=<output>
-        The directory to save the parsed CoNLL-X files
+        The directory to save the parsed CoNLL-X files, with the same subdirectories as the input.
+        The comments of every tree are kept.
     -m <model> --model=<model>
         The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    --compress=<extension>
+        Compress the CoNLL-X files as they are written, with gz, bz2, xz or zst (e.g. [name].conllx.gz)
+    --memory_report
+        Record the memory used by parsing and by writing the trees (Python allocation peaks with tracemalloc,
+        and RSS changes), over all the files, and print a table of it to stderr at exit.
+    --profile=<prefix>
+        Profile the run, and write <prefix>.pstats (cProfile, with one <prefix>.<stage>.pstats per stage)
+        and <prefix>.collapsed (sampled call stacks with the stage as root frame, for flame graphs).
+    --threads=<threads>
+        The number of torch intra-op threads used by disambiguation and parsing. Defaults to the configuration
+        saved by autotune_threads.py on this machine, or to torch's default (one per core).
+    --interop_threads=<interop_threads>
+        The number of torch inter-op threads. Defaults to the saved configuration, or to torch's default.
     -h --help
         Show this screen.
 """
 
+import atexit
 import os
+import sys
 from pathlib import Path
-import re
-from typing import List
-from src.classes import ConllParams
 from src.conll_output import save_to_file, text_tuples_to_string
-from src.data_preparation import parse_text
+from src.dependency_parser.biaff_parser import parse_conll_trees
+from src.utils import stages
+from src.utils.compressed_io import get_compression, strip_compression_suffix
+from src.utils.conll_reader import read_conll
+from src.utils.memory import StageMemoryRecorder
+from src.utils.profiling import profile_until_exit
+from src.utils.threads import configure_threads
 from src.utils.model_downloader import get_model_name
 from docopt import docopt
-from pandas import read_csv
 from transformers.utils import logging
 
 logging.set_verbosity_error()
 
 arguments = docopt(__doc__)
 
-def get_list_of_comments(conll_lines) -> List[List[str]]:
-    """Initializes the class variable comments as a list of lists of comments.
-    Within the comments list:
-    Each list represents the comments of the given tree.
-    
-    An empty list represents a tree with no comments.
-
-    Returns:
-        List[List[str]]: a list of lists of comments
-    """
-    # get lines starting with # and blank lines
-    # the blank lines represent the end of the tree/tree comments.
-    matcher = re.compile(r'^(# text.*)$', re.MULTILINE)
-    
-    # a flat list of all comments
-    lines: List[str] = matcher.findall(conll_lines)
-    
-    lines = [line[9:] for line in lines]
-    # # create a list of lists of comments
-    # final_list: List[List[str]] = []
-    # temp_list: List[str] = []
-    # for line in lines:
-    #     if line == '': # an empty string represents the end of comments of the given tree.
-    #         final_list.append(temp_list)
-    #         temp_list = []
-    #     else:
-    #         temp_list.append(line)
-    return lines
-
-
 def main():
     root_dir = Path(__file__).parent
     model_path = root_dir/"models"
 
-    #
-    ### Get clitic features
-    #
-    clitic_feats_df = read_csv(root_dir / 'data/clitic_feats.csv')
-    clitic_feats_df = clitic_feats_df.astype(str).astype(object) # so ints read are treated as string objects
-    
-
     #
     ### cli user input ###
     #
     input_path = arguments['--input']
     output_path = arguments['--output']
     parse_model = arguments['--model']
+    output_suffix = f".{arguments['--compress']}" if arguments['--compress'] else ''
+    assert not output_suffix or get_compression(f'output.conllx{output_suffix}'), f"Unknown compression {arguments['--compress']}"
+
+    if arguments['--memory_report']:
+        memory_recorder = StageMemoryRecorder()
+        memory_recorder.start()
+        atexit.register(lambda: print(memory_recorder.report(), file=sys.stderr))
+    if arguments['--profile']:
+        profile_until_exit(arguments['--profile'])
+    configure_threads(
+        int(arguments['--threads']) if arguments['--threads'] else None,
+        int(arguments['--interop_threads']) if arguments['--interop_threads'] else None
+    )
 
     #
     ### Set up parsing model 
@@ -90,24 +89,24 @@ def main():
     
     #
     ### main code ###
+    # each file is read once, parsed with its comments, and written once
+    # to the same relative path in the output directory
     #
     for root, _, files in os.walk(input_path):
-        for text_file in files:
-            print(f'processing {text_file}')
-            file_type_params = ConllParams(str(Path(input_path) / text_file), model_path/model_name)
-            parsed_text_tuples = parse_text("conll", file_type_params)
-
-            lines = []
-            with open(f'{root}/{text_file}', 'r') as f:
-                lines = [line for line in f.readlines() if line.strip()]
-            
-            lines = get_list_of_comments(''.join(lines))
+        output_dir = Path(output_path) / Path(root).relative_to(input_path)
+        os.makedirs(output_dir, exist_ok=True)
+        for conll_file in files:
+            print(f'processing {conll_file}')
+            comments, conll_trees = read_conll(Path(root) / conll_file)
+            with stages.stage(stages.PARSING):
+                parsed_text_tuples = parse_conll_trees(conll_trees, parse_model=str(model_path/model_name))
             
-            conll_name = f"{'.'.join(text_file.split('.')[:-1])}.conllx"
-            save_to_file(
-                text_tuples_to_string(parsed_text_tuples, file_type='conll', sentences=lines),
-                Path(output_path) / conll_name
-            )
+            conll_name = f"{'.'.join(strip_compression_suffix(conll_file).split('.')[:-1])}.conllx{output_suffix}"
+            with stages.stage(stages.OUTPUT):
+                save_to_file(
+                    text_tuples_to_string(parsed_text_tuples, file_type='conll', comments=comments),
+                    output_dir / conll_name
+                )
 
 if __name__ == '__main__':
     main()
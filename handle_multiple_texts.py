@@ -5,27 +5,83 @@ Usage:
     text_to_conll_cli (-i <input> | --input=<input>)
         (-o <output> | --output=<output>)
         [-m <model> | --model=<model>]
+        [--multi_scheme]
+        [--compress=<extension>]
+        [-w <workers> | --workers=<workers>]
+        [--feature_workers=<feature_workers>]
+        [--token_budget=<tokens>]
+        [--subword_cache=<size>]
+        [--quarantine=<quarantine_file>]
+        [--memory_report]
+        [--profile=<prefix>]
+        [--threads=<threads>] [--interop_threads=<interop_threads>]
     text_to_conll_cli (-h | --help)
 
 Options:
     -i <input> --input=<input>
-        A directory of text files
+        A directory of text files. Files ending with .gz, .bz2, .xz or .zst (with the zstandard package)
+        are decompressed as they are read.
     -o <output> --output=<output>
         The directory to save the parsed CoNLL-X files
     -m <model> --model=<model>
         The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    --multi_scheme
+        Parse with both the CATiB and the UD models, disambiguating each file only once.
+        Each file is saved as [name].catib.conllx and [name].ud.conllx (-m is ignored).
+    --compress=<extension>
+        Compress the CoNLL-X files as they are written, with gz, bz2, xz or zst (e.g. [name].conllx.gz)
+    -w <workers> --workers=<workers>
+        The number of worker processes. The models are loaded once and shared by all workers,
+        and a table of the memory used by each worker is printed at the end.
+        Defaults to the worker count saved by autotune_threads.py on this machine, or to 1
+    --feature_workers=<feature_workers>
+        The number of worker processes extracting the features of each file, in chunks of sentences.
+        Only with a single worker [default: 1]
+    --token_budget=<tokens>
+        Batch the sentences disambiguated by BERT by subword length, each batch holding up to this many subword
+        tokens, padding included, instead of 32 sentences. Less padding is computed on inputs of mixed lengths.
+    --subword_cache=<size>
+        Cache the WordPiece tokenization of up to size words over all the files, shared by the BERT disambiguator
+        and the parser when their vocabularies match. The hit rate and the time saved are printed to stderr at exit.
+        Only with a single worker.
+    --quarantine=<quarantine_file>
+        Set aside the sentences that fail instead of stopping: they are written to quarantine_file as JSON lines
+        with their file, index, text, stage and error, and left out of the output. The number of sentences
+        quarantined in each stage is printed to stderr at exit. Only with a single worker, and without --multi_scheme.
+    --memory_report
+        Record the memory used by each stage (Python allocation peaks with tracemalloc, and RSS changes),
+        over all the files, and print a table of it to stderr at exit. Only with a single worker.
+    --profile=<prefix>
+        Profile the run, and write <prefix>.pstats (cProfile, with one <prefix>.<stage>.pstats per stage)
+        and <prefix>.collapsed (sampled call stacks with the stage as root frame, for flame graphs). Only with a single worker.
+    --threads=<threads>
+        The number of torch intra-op threads used by disambiguation and parsing per worker. Defaults to the configuration
+        saved by autotune_threads.py on this machine, or to torch's default (one per core), divided between the workers.
+    --interop_threads=<interop_threads>
+        The number of torch inter-op threads per worker. Defaults to the saved configuration, or to torch's default.
     -h --help
         Show this screen.
 """
 
+import atexit
 import os
+import sys
 from pathlib import Path
 from camel_tools.utils.charmap import CharMapper
 from src.classes import TextParams
 from src.conll_output import save_to_file, text_tuples_to_string
-from src.data_preparation import get_tagset, parse_text
+from src.data_preparation import get_tagset, parse_text, parse_text_schemes
+from src.dependency_parser.biaff_parser import load_parser
 from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+from src.utils import stages
+from src.utils.compressed_io import get_compression, read_lines, strip_compression_suffix
+from src.utils.memory import StageMemoryRecorder, get_memory_usage
+from src.utils.profiling import profile_until_exit
+from src.utils.quarantine import Quarantine
+from src.utils.subword_cache import cache_subwords, format_cache_reports
+from src.utils.threads import configure_threads, load_thread_config
 from src.utils.model_downloader import get_model_name
+from src.utils.workers import format_memory_report, run_forked_workers
 from docopt import docopt
 from pandas import read_csv
 from transformers.utils import logging
@@ -54,7 +110,45 @@ def main():
     input_path = arguments['--input']
     output_path = arguments['--output']
     parse_model = arguments['--model']
+    multi_scheme = arguments['--multi_scheme']
+    output_suffix = f".{arguments['--compress']}" if arguments['--compress'] else ''
+    assert not output_suffix or get_compression(f'output.conllx{output_suffix}'), f"Unknown compression {arguments['--compress']}"
+    feature_workers = int(arguments['--feature_workers'])
+    token_budget = int(arguments['--token_budget']) if arguments['--token_budget'] else None
+    if arguments['--workers']:
+        workers = int(arguments['--workers'])
+    elif (arguments['--memory_report'] or arguments['--profile'] or arguments['--subword_cache'] or arguments['--quarantine']
+          or feature_workers > 1):
+        workers = 1 # the reports cover a single process, and the feature workers need one
+    else:
+        workers = load_thread_config().get('workers', 1)
+    assert not (arguments['--memory_report'] and workers > 1), 'The memory report is only available with a single worker'
+    assert not (arguments['--profile'] and workers > 1), 'Profiling is only available with a single worker'
+    # the file workers are daemon processes, which cannot start feature workers
+    assert not (feature_workers > 1 and workers > 1), 'Feature workers are only available with a single worker'
+    assert not (arguments['--subword_cache'] and workers > 1), 'The subword cache is only available with a single worker'
+    assert not (arguments['--quarantine'] and (workers > 1 or multi_scheme)), \
+        'Sentences can only be quarantined with a single worker, and without --multi_scheme'
 
+    quarantine = None
+    if arguments['--quarantine']:
+        quarantine = Quarantine(arguments['--quarantine'])
+        def report_quarantine():
+            quarantine.close()
+            print(quarantine.summary(), file=sys.stderr)
+        atexit.register(report_quarantine)
+
+    if arguments['--memory_report']:
+        memory_recorder = StageMemoryRecorder()
+        memory_recorder.start()
+        atexit.register(lambda: print(memory_recorder.report(), file=sys.stderr))
+    if arguments['--profile']:
+        profile_until_exit(arguments['--profile'])
+    configure_threads(
+        int(arguments['--threads']) if arguments['--threads'] else None,
+        int(arguments['--interop_threads']) if arguments['--interop_threads'] else None,
+        workers=workers
+    )
 
     #
     ### Set up parsing model 
@@ -67,26 +161,68 @@ def main():
     #
     tagset = get_tagset(parse_model)
     
-    disambiguator = get_disambiguator("bert", "r13")
+    scheme_models = ['catib', 'ud']
+    parse_model_paths = {
+        get_tagset(scheme_model): model_path/get_model_name(scheme_model, model_path=model_path)
+        for scheme_model in scheme_models
+    } if multi_scheme else {}
+    
+    disambiguator = get_disambiguator("bert", "r13", token_budget=token_budget)
+    if arguments['--subword_cache']:
+        cached_models = scheme_models if multi_scheme else [parse_model]
+        parsers = {
+            cached_model: load_parser(str(model_path/get_model_name(cached_model, model_path=model_path)))
+            for cached_model in cached_models
+        }
+        subword_caches = cache_subwords(disambiguator, parsers, int(arguments['--subword_cache']))
+        atexit.register(lambda: print(format_cache_reports(subword_caches), file=sys.stderr))
     
     #
     ### main code ###
     #
-    for root, _, files in os.walk(input_path):
-        for text_file in files:
-            print(f'processing {text_file}')
-            lines = []
-            with open(f'{root}/{text_file}', 'r') as f:
-                lines = [line for line in f.readlines() if line.strip()]
-            file_type_params = TextParams(lines, model_path/model_name, arclean, disambiguator, clitic_feats_df, tagset, "")
-            parsed_text_tuples = parse_text("text", file_type_params)
+    def parse_file(root, text_file):
+        print(f'processing {text_file}')
+        lines = read_lines(f'{root}/{text_file}')
+        base_name = '.'.join(strip_compression_suffix(text_file).split('.')[:-1])
+        file_type_params = TextParams(lines, model_path/model_name, arclean, disambiguator, clitic_feats_df, tagset, "")
+        
+        if multi_scheme:
+            parsed_text_tuples_by_tagset = parse_text_schemes("text", file_type_params, parse_model_paths, feature_workers=feature_workers)
+            for scheme_model in scheme_models:
+                with stages.stage(stages.OUTPUT):
+                    save_to_file(
+                        text_tuples_to_string(parsed_text_tuples_by_tagset[get_tagset(scheme_model)], file_type='text', sentences=lines),
+                        Path(output_path) / f'{base_name}.{scheme_model}.conllx{output_suffix}'
+                    )
+            return
+        
+        if quarantine:
+            quarantine.start(lines, source=f'{root}/{text_file}')
+        parsed_text_tuples = parse_text("text", file_type_params, feature_workers=feature_workers, quarantine=quarantine)
+        if quarantine:
+            # the quarantined sentences have no tree
+            lines = quarantine.filter_lines(lines)
 
-            new_name = '.'.join((text_file.split('.')[:-1])) + '.conllx'
-            
+        new_name = f'{base_name}.conllx{output_suffix}'
+        
+        with stages.stage(stages.OUTPUT):
             save_to_file(
                 text_tuples_to_string(parsed_text_tuples, file_type='text', sentences=lines),
                 Path(output_path) / new_name
             )
 
+    text_files = [(root, text_file) for root, _, files in os.walk(input_path) for text_file in files]
+    if workers == 1:
+        for root, text_file in text_files:
+            parse_file(root, text_file)
+        return
+
+    # load the parser models before forking, so the workers share them
+    for parse_model_path in (parse_model_paths.values() if multi_scheme else [model_path/model_name]):
+        load_parser(str(parse_model_path))
+    parent_memory_usage = get_memory_usage()
+    _, memory_by_worker = run_forked_workers(parse_file, text_files, workers)
+    print(format_memory_report(parent_memory_usage, memory_by_worker))
+
 if __name__ == '__main__':
     main()
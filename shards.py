@@ -0,0 +1,48 @@
+"""
+Shard one input file for parsing on several machines, and merge the parsed shards.
+
+    index: build the offset index of the input file, so each shard (text_to_conll_cli.py --shard i/N)
+        reads only its own byte range. Building the index reads the whole file once; without it,
+        every shard builds it on first use.
+    merge: check that the outputs of shards 0 to N-1 are all present, cover the whole input
+        and are complete, then write them in order to one file.
+
+Usage:
+    shards index (-i <input> | --input=<input>) [-f <file_type> | --file_type=<file_type>]
+    shards merge (-o <output> | --output=<output>) <shard_output>...
+    shards (-h | --help)
+
+Options:
+    -i <input> --input=<input>
+        The input file
+    -f <file_type> --file_type=<file_type>
+        The file type of the input, as passed to text_to_conll_cli.py [default: text]
+    -o <output> --output=<output>
+        The merged CoNLL file
+    -h --help
+        Show this screen.
+
+Example:
+    python shards.py index -i corpus.txt
+    python text_to_conll_cli.py -f text -i corpus.txt --shard 0/2 > corpus.0.conllx   # on one machine
+    python text_to_conll_cli.py -f text -i corpus.txt --shard 1/2 > corpus.1.conllx   # on another
+    python shards.py merge -o corpus.conllx corpus.0.conllx corpus.1.conllx
+"""
+
+from docopt import docopt
+from src.utils.sharding import get_record_kind, load_offset_index, merge_shards, save_offset_index
+
+arguments = docopt(__doc__)
+
+def main():
+    if arguments['index']:
+        record_kind = get_record_kind(arguments['--file_type'])
+        index_path = save_offset_index(arguments['--input'], record_kind)
+        offsets = load_offset_index(arguments['--input'], record_kind)
+        print(f'{len(offsets) - 1} {record_kind} indexed in {index_path}')
+    elif arguments['merge']:
+        tree_count = merge_shards(arguments['<shard_output>'], arguments['--output'])
+        print(f"{len(arguments['<shard_output>'])} shards, {tree_count} trees merged into {arguments['--output']}")
+
+if __name__ == '__main__':
+    main()
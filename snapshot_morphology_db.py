@@ -0,0 +1,63 @@
+"""
+Create a binary snapshot of a morphology database, and check that it loads faster
+and gives the same analyses as the database built from its text file.
+
+Usage:
+    snapshot_morphology_db [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
+        [-i <input> | --input=<input>]
+    snapshot_morphology_db (-h | --help)
+
+Options:
+    -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
+        The morphology database to use; will use camel_tools built-in by default [default: r13]
+    -i <input> --input=<input>
+        A text file whose words are analyzed with both databases [default: data/samples/input_text.txt]
+    -h --help
+        Show this screen.
+"""
+
+import os
+import time
+from pathlib import Path
+from camel_tools.utils.charmap import CharMapper
+from docopt import docopt
+from src.initialize_disambiguator.db_snapshot import build_morphology_db, get_snapshot_path, load_db_snapshot, save_db_snapshot
+from src.initialize_disambiguator.disambiguator_interface import create_analyzer
+from src.utils.text_cleaner import clean_lines
+
+arguments = docopt(__doc__)
+
+def main():
+    root_dir = Path(__file__).parent
+    model_path = root_dir/"models"
+    morphology_db_type = arguments['--morphology_db_type']
+    arclean = CharMapper.builtin_mapper("arclean")
+
+    start_time = time.perf_counter()
+    db = build_morphology_db(morphology_db_type)
+    build_time = time.perf_counter() - start_time
+
+    snapshot_path = get_snapshot_path(model_path, morphology_db_type)
+    os.makedirs(model_path, exist_ok=True)
+    save_db_snapshot(db, snapshot_path)
+
+    start_time = time.perf_counter()
+    snapshot_db = load_db_snapshot(snapshot_path)
+    load_time = time.perf_counter() - start_time
+
+    with open(arguments['--input'], 'r') as f:
+        lines = [line for line in f.readlines() if line.strip()]
+    words = sorted({word for token_line in clean_lines(lines, arclean) for word in token_line})
+
+    analyzer = create_analyzer(db)
+    snapshot_analyzer = create_analyzer(snapshot_db)
+    mismatches = [word for word in words if analyzer.analyze(word) != snapshot_analyzer.analyze(word)]
+
+    print(f'snapshot saved to {snapshot_path} ({os.path.getsize(snapshot_path) / 2**20:.1f} MB)')
+    print(f'building the database: {build_time:.2f}s')
+    print(f'loading the snapshot: {load_time:.2f}s ({build_time / load_time:.1f}x faster)')
+    print(f'analyses compared for {len(words)} words: {len(mismatches)} mismatches')
+    assert not mismatches, f'analyses differ for: {" ".join(mismatches)}'
+
+if __name__ == '__main__':
+    main()
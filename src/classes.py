@@ -2,10 +2,11 @@ from dataclasses import dataclass
 from typing import List, Union
 from dataclasses import astuple, dataclass
 import pandas as pd
-from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
-from camel_tools.disambig.mle import MLEDisambiguator
 from camel_tools.utils.charmap import CharMapper
 
+from .initialize_disambiguator.bert_disambiguator import BertDisambiguatorAdapter
+from .initialize_disambiguator.mle_disambiguator import MLEDisambiguatorAdapter
+
 def get_conll_tree_header_list():
     return ["ID", "FORM", "LEMMA", "UPOS", "XPOS", "FEATS", "HEAD", "DEPREL", "DEPS", "MISC"]
 
@@ -22,7 +23,7 @@ class TextParams:
     lines: List[str]
     parse_model_path: str
     arclean: CharMapper
-    disambiguator_param: Union[BERTUnfactoredDisambiguator, MLEDisambiguator, str]
+    disambiguator_param: Union[BertDisambiguatorAdapter, MLEDisambiguatorAdapter, str]
     clitic_feats_df: pd.DataFrame
     tagset: str
     morphology_db_type: str
@@ -34,7 +35,7 @@ class TextParams:
 class PreprocessedTextParams:
     lines: List[str]
     parse_model_path: str
-    disambiguator: Union[BERTUnfactoredDisambiguator, MLEDisambiguator, str]
+    disambiguator: Union[BertDisambiguatorAdapter, MLEDisambiguatorAdapter, str]
     clitic_feats_df: pd.DataFrame
     tagset: str
     morphology_db_type: str
@@ -52,6 +53,12 @@ class TokenizedTaggedParams:
     lines: List[str]
     parse_model_path: str
 
+@dataclass
+class FeaturizedParams:
+    lines: List[str]
+    parse_model_path: str
+    text_tuples: List[List[tuple]]
+
 @dataclass
 class Token:
     ID: int = -1
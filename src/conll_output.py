@@ -5,21 +5,25 @@ import re
 from typing import List, Union
 
 from .classes import Token
+from .utils.compressed_io import open_output
 
 
-def print_to_conll(string_lines):
+def print_to_conll(string_lines, file=None):
+    # file defaults to stdout
     for line in string_lines:
-        print(line)
+        print(line, file=file)
 
 def save_to_file(string_lines: List[str], file_path: Path):
-    with open(file_path, 'w') as f:
-        [f.write(f'{line}\n') for line in string_lines]
+    # compressed if the file name ends with a compression extension (see src/utils/compressed_io.py)
+    with open_output(file_path) as f:
+        f.writelines(f'{line}\n' for line in string_lines)
 
 def text_tuples_to_string(
         text_tuples: List[List[tuple]], 
         file_type,
         annotations: Union[List[str], None]=None, 
-        sentences: Union[List[str], None]=None
+        sentences: Union[List[str], None]=None,
+        comments: Union[List[List[str]], None]=None
     ):
     if sentences is not None and file_type != 'conll': 
         # filter out empty lines
@@ -29,8 +33,9 @@ def text_tuples_to_string(
 
     string_lines: List[str] = []
     for i, sentence_tuples in enumerate(text_tuples):
-        if file_type == 'conll': # dont add comments to preexisting conll files
-            pass
+        if file_type == 'conll': # dont add comments to preexisting conll files, only keep their own comments
+            if comments:
+                string_lines.extend(comments[i])
         elif sentences:
             string_lines.extend(
                 (
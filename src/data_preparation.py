@@ -1,21 +1,27 @@
 
 import os
 import re
-from typing import List, Union
+from typing import Dict, List, Union
 import pandas as pd
 from camel_tools.disambig.common import DisambiguatedWord
 
 from src.utils.conll_fixes import adjust_eof_newlines
-from .classes import ConllParams, TextParams, PreprocessedTextParams, TokenizedParams, TokenizedTaggedParams
-from .dependency_parser.biaff_parser import parse_conll, parse_text_tuples
+from .classes import ConllParams, FeaturizedParams, TextParams, PreprocessedTextParams, TokenizedParams, TokenizedTaggedParams
+from .dependency_parser.biaff_parser import parse_conll, parse_conll_trees, parse_text_tuples
 from .initialize_disambiguator.disambiguator_interface import get_disambiguator
 from .parse_disambiguation.disambiguation_analysis import to_sentence_analysis_list
-from .parse_disambiguation.feature_extraction import to_conll_fields_list
+from .parse_disambiguation.feature_workers import to_conll_fields_lists_parallel
+from .utils import stages
+from .utils.compressed_io import get_compression
+from .utils.conll_reader import read_conll
+from .utils.featurized_file import save_featurized
+from .utils.quarantine import Quarantine, run_isolated
+from .utils.segmentation import segment_lines, segment_sentence_tuples, stitch_segments
 from .utils.text_cleaner import clean_lines, clean_mad, split_lines_words
 from .logger import log
 
 
-FileTypeParams = Union[ConllParams, TextParams, PreprocessedTextParams, TokenizedParams, TokenizedTaggedParams]
+FileTypeParams = Union[ConllParams, TextParams, PreprocessedTextParams, TokenizedParams, TokenizedTaggedParams, FeaturizedParams]
 
 
 def get_feats_from_text_tuples(text_tuples: List[List[tuple]]) -> List[List[str]]:
@@ -90,30 +96,59 @@ def get_tree_tokens(tok_pos_tuples):
         sentences.append(sentence)
     return sentences
 
-def handle_conll(file_type_params):
+def handle_conll(file_type_params, decoding: str='proj'):
     file_path, parse_model_path = file_type_params
+    if get_compression(file_path):
+        # the parser reads plain files only, so compressed files are decompressed as they are read
+        _, conll_trees = read_conll(file_path)
+        return parse_conll_trees(conll_trees, parse_model=str(parse_model_path), decoding=decoding)
     # pass the path to the text file and the model path and name, and get the tuples
-    return parse_conll(file_path, parse_model=parse_model_path)
+    return parse_conll(file_path, parse_model=str(parse_model_path), decoding=decoding)
 
 @log
 def disambiguate_sentences(disambiguator, token_lines):
     # moved to own function to add to logger
     return disambiguator.disambiguate_sentences(token_lines)
 
-def handle_text_types(file_type_params, text_type: str):
+def featurize_text_types(
+        file_type_params,
+        text_type: str,
+        tagsets: List[str],
+        max_length: Union[int, None]=None,
+        feature_workers: int=1,
+        quarantine: Union[Quarantine, None]=None
+    ) -> Dict[str, List[List[tuple]]]:
+    """Clean, disambiguate and extract the features of text or preprocessed_text lines.
+    The lines are disambiguated and featurized once, and the token tuples are built for each tagset.
+    With several feature_workers, the features are extracted in forked worker processes
+    (see src/parse_disambiguation/feature_workers.py). With a quarantine, the sentences that fail
+    a stage are set aside, and the token tuples of the other sentences are returned
+    (see src/utils/quarantine.py).
+
+    Returns:
+        Dict[str, List[List[tuple]]]: the token tuples of each sentence, by tagset
+    """
     if text_type == 'preprocessed_text':
         lines, _, disambiguator_param, clitic_feats_df, tagset, morphology_db_type = file_type_params
 
-        token_lines = split_lines_words(lines)
-        token_lines = clean_mad(token_lines)
+        with stages.stage(stages.CLEANING):
+            token_lines, _ = run_isolated(quarantine, stages.CLEANING, lambda batch: clean_mad(split_lines_words(batch)), lines)
     elif text_type == 'text':
         lines, _, arclean, disambiguator_param, clitic_feats_df, tagset, morphology_db_type = file_type_params
         # clean lines
-        token_lines = clean_lines(lines, arclean)
+        with stages.stage(stages.CLEANING):
+            token_lines, _ = run_isolated(quarantine, stages.CLEANING, lambda batch: clean_lines(batch, arclean), lines)
     else:
         assert False, f'Invalid type to process: {text_type}'
 
+    assert not (quarantine and max_length), 'Sentences cannot be quarantined when long lines are segmented'
+    if quarantine is not None:
+        # lines that are empty after cleaning are left out, without being failures
+        quarantine.keep([position for position, token_line in enumerate(token_lines) if token_line])
     token_lines = [token_line for token_line in token_lines if token_line]
+    if max_length:
+        # over-long lines are disambiguated as separate segments
+        token_lines, segment_counts = segment_lines(token_lines, max_length)
     
     # if str passed, we should create the disambiguator using disambiguator_param and morphology_db_type
     if type(disambiguator_param) == str:
@@ -122,20 +157,54 @@ def handle_text_types(file_type_params, text_type: str):
         disambiguator = disambiguator_param
     
     # run the disambiguator on the sentence list to get an analysis for all sentences
-    disambiguated_sentences: List[List[DisambiguatedWord]] = disambiguate_sentences(disambiguator, token_lines)
+    with stages.stage(stages.DISAMBIGUATION):
+        disambiguated_sentences: List[List[DisambiguatedWord]]
+        disambiguated_sentences, kept = run_isolated(quarantine, stages.DISAMBIGUATION,
+            lambda batch: disambiguate_sentences(disambiguator, batch), token_lines)
+    if kept is not None:
+        token_lines = [token_lines[position] for position in kept]
     # get a single analysis for each word (top or tok_match, match not implemented yet)
     # sentence_analysis_list: List[List[dict]] = to_sentence_analysis_list(disambiguated_sentences, selection, selection_criteria)
-    sentence_analysis_list: List[List[dict]] = to_sentence_analysis_list(disambiguated_sentences, token_lines)
+    with stages.stage(stages.ANALYSIS_SELECTION):
+        sentence_analysis_list: List[List[dict]]
+        sentence_analysis_list, _ = run_isolated(quarantine, stages.ANALYSIS_SELECTION,
+            lambda batch: to_sentence_analysis_list([sentence for sentence, _ in batch], [token_line for _, token_line in batch]),
+            list(zip(disambiguated_sentences, token_lines)))
 
     # extract the relevant items from each analysis into conll fields
-    return to_conll_fields_list(sentence_analysis_list, clitic_feats_df, tagset)
+    with stages.stage(stages.FEATURE_EXTRACTION):
+        if quarantine is None:
+            text_tuples_by_tagset = to_conll_fields_lists_parallel(sentence_analysis_list, clitic_feats_df, tagsets, feature_workers)
+        else:
+            def featurize(batch):
+                batch_tuples_by_tagset = to_conll_fields_lists_parallel(batch, clitic_feats_df, tagsets, feature_workers)
+                return [{tagset: batch_tuples_by_tagset[tagset][i] for tagset in tagsets} for i in range(len(batch))]
+            sentence_tuples_by_tagset, _ = quarantine.run(stages.FEATURE_EXTRACTION, featurize, sentence_analysis_list)
+            text_tuples_by_tagset = {
+                tagset: [tuples_by_tagset[tagset] for tuples_by_tagset in sentence_tuples_by_tagset]
+                for tagset in tagsets
+            }
+        if max_length:
+            # join the segments back into one sentence per line
+            text_tuples_by_tagset = {
+                tagset: stitch_segments(text_tuples, segment_counts)
+                for tagset, text_tuples in text_tuples_by_tagset.items()
+            }
+    return text_tuples_by_tagset
+
+def handle_text_types(file_type_params, text_type: str, max_length: Union[int, None]=None, feature_workers: int=1,
+                      quarantine: Union[Quarantine, None]=None):
+    tagset = file_type_params.tagset
+    return featurize_text_types(file_type_params, text_type, [tagset], max_length, feature_workers, quarantine)[tagset]
     
 
-def handle_preprocessed_text(file_type_params):
-    return handle_text_types(file_type_params, 'preprocessed_text')
+def handle_preprocessed_text(file_type_params, max_length: Union[int, None]=None, feature_workers: int=1,
+                             quarantine: Union[Quarantine, None]=None):
+    return handle_text_types(file_type_params, 'preprocessed_text', max_length, feature_workers, quarantine)
 
-def handle_text(file_type_params):
-    return handle_text_types(file_type_params, 'text')
+def handle_text(file_type_params, max_length: Union[int, None]=None, feature_workers: int=1,
+                quarantine: Union[Quarantine, None]=None):
+    return handle_text_types(file_type_params, 'text', max_length, feature_workers, quarantine)
 
 def handle_tokenized(file_type_params):
     lines = file_type_params.lines
@@ -151,8 +220,12 @@ def handle_tokenized_tagged(file_type_params):
     # construct tuples before sending them to the parser
     return [[(0, tup[0],'_' ,tup[1], '_', '_', '_', '_', '_', '_') for tup in tok_pos_tuples] for tok_pos_tuples in tok_pos_tuples_list]
 
+def handle_featurized(file_type_params):
+    # the tuples were loaded from a featurized file, and already hold the features
+    return file_type_params.text_tuples
+
 def get_file_type_params(lines, file_type, file_path, parse_model_path,
-    arclean, disambiguator_type, clitic_feats_df, tagset, morphology_db_type):
+    arclean, disambiguator_type, clitic_feats_df, tagset, morphology_db_type, featurized_tuples=None):
     if file_type == 'conll':
         return ConllParams(file_path, parse_model_path)
     elif file_type == 'text':
@@ -163,33 +236,134 @@ def get_file_type_params(lines, file_type, file_path, parse_model_path,
         return TokenizedParams(lines, parse_model_path)
     elif file_type == 'tokenized_tagged':
         return TokenizedTaggedParams(lines, parse_model_path)
+    elif file_type == 'featurized':
+        return FeaturizedParams(lines, parse_model_path, featurized_tuples)
+
+def parse_sentence_tuples(
+        text_tuples: List[List[tuple]],
+        parse_model_path,
+        max_length: Union[int, None]=None,
+        decoding: str='proj'
+    ) -> List[List[tuple]]:
+    """Parse the text tuples. If max_length is given, sentences longer than max_length tokens
+    are parsed as separate segments and stitched back into one tree
+    (see src/utils/segmentation.py for the attachment rule).
+    """
+    if not max_length:
+        return parse_text_tuples(text_tuples, parse_model=str(parse_model_path), decoding=decoding)
+
+    segments, segment_counts = segment_sentence_tuples(text_tuples, max_length)
+    parsed_segments = parse_text_tuples(segments, parse_model=str(parse_model_path), decoding=decoding)
+    return stitch_segments(parsed_segments, segment_counts)
+
+def parse_text(
+        file_type: str,
+        file_type_params: FileTypeParams,
+        max_length: Union[int, None]=None,
+        decoding: str='proj',
+        featurized_path: Union[str, os.PathLike, None]=None,
+        feature_workers: int=1,
+        quarantine: Union[Quarantine, None]=None
+    ):
+    """Parse the lines (or conll file) in file_type_params.
+
+    Args:
+        file_type (str): one of conll, text, preprocessed_text, tokenized, tokenized_tagged, featurized
+        file_type_params (FileTypeParams): the params matching the file type
+        max_length (Union[int, None], optional): split lines longer than this many tokens
+            into segments that are disambiguated and parsed separately, then stitched
+            back into one tree per line. Not applied to conll files. Defaults to None.
+        decoding (str, optional): the parser decoding algorithm, one of proj, mst or greedy
+            (see DECODING_MODES in src/dependency_parser/biaff_parser.py). Defaults to 'proj'.
+        featurized_path (Union[str, os.PathLike, None], optional): for text and preprocessed_text,
+            save the featurized tuples to this file before parsing (see src/utils/featurized_file.py).
+            The file can be parsed again with the featurized file type. Defaults to None.
+        feature_workers (int, optional): for text and preprocessed_text, the number of worker processes
+            extracting the features (see src/parse_disambiguation/feature_workers.py). Defaults to 1.
+        quarantine (Union[Quarantine, None], optional): sets aside the sentences that fail a stage,
+            instead of failing the whole batch (see src/utils/quarantine.py). It should be started with
+            the lines; quarantine.filter_lines gives the lines of the sentences returned. Not available
+            for conll files or with max_length. Defaults to None.
 
-def parse_text(file_type: str, file_type_params: FileTypeParams):
+    Returns:
+        List[List[tuple]]: the parsed sentences
+    """
+    assert not (quarantine and file_type == 'conll'), 'Sentences cannot be quarantined in conll files'
     if file_type == 'conll':
         # handle_conll(file_path, parse_model_path)
-        adjust_eof_newlines(file_type_params.file_path)
-        parsed_text_tuples = handle_conll(file_type_params)
+        if not get_compression(file_type_params.file_path):
+            # compressed files cannot be appended to, and are not read by the parser
+            adjust_eof_newlines(file_type_params.file_path)
+        with stages.stage(stages.PARSING):
+            parsed_text_tuples = handle_conll(file_type_params, decoding)
     else:
         text_tuples: List[List[tuple]] = []
         if file_type == 'text':
-            text_tuples = handle_text(file_type_params)
+            text_tuples = handle_text(file_type_params, max_length, feature_workers, quarantine)
         elif file_type == 'preprocessed_text':
-            text_tuples = handle_preprocessed_text(file_type_params)
+            text_tuples = handle_preprocessed_text(file_type_params, max_length, feature_workers, quarantine)
         elif file_type == 'tokenized':
             text_tuples = handle_tokenized(file_type_params)
         elif file_type == 'tokenized_tagged':
             text_tuples = handle_tokenized_tagged(file_type_params)
+        elif file_type == 'featurized':
+            text_tuples = handle_featurized(file_type_params)
+
+        if featurized_path is not None:
+            assert file_type in ['text', 'preprocessed_text'], f'Only text can be saved as featurized, not {file_type}'
+            lines = quarantine.filter_lines(file_type_params.lines) if quarantine else file_type_params.lines
+            save_featurized(featurized_path, lines, text_tuples, file_type_params.tagset)
 
         # the text tuples created from the above processes is passed to the dependency parser
-        parsed_text_tuples = parse_text_tuples(text_tuples, parse_model=str(file_type_params.parse_model_path))
+        with stages.stage(stages.PARSING):
+            parsed_text_tuples, kept = run_isolated(quarantine, stages.PARSING,
+                lambda batch: parse_sentence_tuples(batch, file_type_params.parse_model_path, max_length, decoding), text_tuples)
+        if kept is not None:
+            text_tuples = [text_tuples[position] for position in kept]
         # for text/preprocessed_text, we want to extract the features to place in parsed_text_tuples
         # TODO: check if this step can be skipped by placing features in a step above
-        text_feats: List[List[str]] = get_feats_from_text_tuples(text_tuples)
-        # place features in FEATS column
-        parsed_text_tuples = add_feats(parsed_text_tuples, text_feats)
+        with stages.stage(stages.FEATS_MERGE):
+            text_feats: List[List[str]] = get_feats_from_text_tuples(text_tuples)
+            # place features in FEATS column
+            parsed_text_tuples = add_feats(parsed_text_tuples, text_feats)
 
     return parsed_text_tuples
 
+def parse_text_schemes(
+        file_type: str,
+        file_type_params: Union[TextParams, PreprocessedTextParams],
+        parse_model_paths: Dict[str, Union[str, os.PathLike]],
+        max_length: Union[int, None]=None,
+        decoding: str='proj',
+        feature_workers: int=1
+    ) -> Dict[str, List[List[tuple]]]:
+    """Parse text or preprocessed_text lines with several parser models (e.g. CATiB and UD).
+    The lines are disambiguated and featurized only once; each analysis holds the tags of all tagsets.
+    The parse model and tagset of file_type_params are not used.
+
+    Args:
+        file_type (str): text or preprocessed_text
+        file_type_params (Union[TextParams, PreprocessedTextParams]): the params matching the file type
+        parse_model_paths (Dict[str, Union[str, os.PathLike]]): the parse model path for each tagset,
+            e.g. {'catib6': 'models/CAMeLBERT-CATiB-biaffine.model', 'ud': 'models/CAMeLBERT-UD-biaffine.model'}
+        max_length (Union[int, None], optional): see parse_text. Defaults to None.
+        decoding (str, optional): see parse_text. Defaults to 'proj'.
+        feature_workers (int, optional): see parse_text. Defaults to 1.
+
+    Returns:
+        Dict[str, List[List[tuple]]]: the parsed sentences, by tagset
+    """
+    assert file_type in ['text', 'preprocessed_text'], f'Multiple schemes can only be parsed from text, not {file_type}'
+    text_tuples_by_tagset = featurize_text_types(file_type_params, file_type, list(parse_model_paths), max_length, feature_workers)
+
+    parsed_text_tuples_by_tagset = {}
+    for tagset, text_tuples in text_tuples_by_tagset.items():
+        with stages.stage(stages.PARSING):
+            parsed_text_tuples = parse_sentence_tuples(text_tuples, parse_model_paths[tagset], max_length, decoding)
+        with stages.stage(stages.FEATS_MERGE):
+            parsed_text_tuples_by_tagset[tagset] = add_feats(parsed_text_tuples, get_feats_from_text_tuples(text_tuples))
+    return parsed_text_tuples_by_tagset
+
 def get_tagset(parse_model):
     if parse_model == 'catib':
         return 'catib6'
@@ -1,3 +1,4 @@
+import functools
 from typing import List, Union, Dict
 
 from supar import Parser
@@ -6,6 +7,8 @@ from supar.utils import Dataset
 from camel_tools.utils.dediac import dediac_ar
 
 from ..logger import log
+from ..utils.interning import intern_fields
+from .mmap_checkpoint import has_mmap_checkpoint, load_mmap_parser
 
 """
 conll object from parser
@@ -16,12 +19,28 @@ create conll sentence of token row tuples
 
 """
 
+# decoding algorithms supported by the biaffine parser, mapped to the supar predict flags
+# proj: projective Eisner decoding, O(n^3)
+# mst: non-projective maximum spanning tree (Chu-Liu/Edmonds), O(n^2) to O(n^3)
+# greedy: highest scoring head for each token, O(n^2); the output might not be a well-formed tree
+DECODING_MODES = {
+    'proj': {'tree': True, 'proj': True},
+    'mst': {'tree': True, 'proj': False},
+    'greedy': {'tree': False, 'proj': False},
+}
+
+def get_decoding_flags(decoding: str) -> Dict[str, bool]:
+    if decoding not in DECODING_MODES:
+        raise ValueError(f"Invalid decoding '{decoding}', should be one of {', '.join(DECODING_MODES)}")
+    return DECODING_MODES[decoding]
+
 def parser_conll_to_conll_tuples(parser_conll: Dataset) -> List[List[tuple]]:
     conll_sentences = []
     for parser_sentence in parser_conll:
         sentence_tree_token_tuples = []
         for i in range(len(parser_sentence.values[0])):
-            token_tuple_row = tuple(column[i] for column in parser_sentence.values)
+            # the parser reads its input back from CoNLL lines, so every value is a new string
+            token_tuple_row = intern_fields(column[i] for column in parser_sentence.values)
             sentence_tree_token_tuples.append(token_tuple_row)
         conll_sentences.append(sentence_tree_token_tuples)
     return conll_sentences
@@ -31,20 +50,51 @@ def filter_tatweel(form):
         return form
     return form.replace("_", "").replace("\u0640","").replace("\u005F", "")
 
+@functools.lru_cache(maxsize=None)
+def load_parser(parse_model: str) -> Parser:
+    # loaded once per model, so repeated calls to parse in the same process reuse the model
+    # checkpoints converted with convert_checkpoint are memory-mapped instead of read into memory
+    if has_mmap_checkpoint(parse_model):
+        return load_mmap_parser(parse_model)
+    return Parser.load(parse_model)
+
 @log
-def parse(conll_path_or_parsed_tuples: Union[List[List[tuple]], str], parse_model:str) -> List[List[tuple]]:
-    parser = Parser.load(parse_model)
-    return parser.predict(conll_path_or_parsed_tuples, verbose=False, tree=True, proj=True)
+def parse(conll_path_or_parsed_tuples: Union[List[List[tuple]], str], parse_model:str, decoding: str='proj') -> List[List[tuple]]:
+    parser = load_parser(parse_model)
+    return parser.predict(conll_path_or_parsed_tuples, verbose=False, **get_decoding_flags(decoding))
 
 
-def parse_text_tuples(sentence_tuples: List[List[tuple]], parse_model) -> List[List[tuple]]:
+def parse_text_tuples(sentence_tuples: List[List[tuple]], parse_model, decoding: str='proj') -> List[List[tuple]]:
     sentence_tuples = [[val[1:4] for val in sent] for sent in sentence_tuples]
     form_lemma_pos_tuple = [[(filter_tatweel(dediac_ar(val[0])), filter_tatweel(dediac_ar(val[1])), val[2]) for val in sent] for sent in sentence_tuples]
-    conll = parse(form_lemma_pos_tuple, parse_model=parse_model)
+    conll = parse(form_lemma_pos_tuple, parse_model=parse_model, decoding=decoding)
+    return parser_conll_to_conll_tuples(conll)
+
+def parse_conll_trees(conll_trees: List[List[tuple]], parse_model, decoding: str='proj') -> List[List[tuple]]:
+    """Parse trees already read from a CoNLL file (see src/utils/conll_reader.py),
+    without the parser reading the file again.
+    The parser is given the FORM, LEMMA and UPOS of each token, as in parse_conll; the XPOS, FEATS and MISC
+    of the input are kept, and HEAD and DEPREL are predicted.
+
+    Args:
+        conll_trees (List[List[tuple]]): the 10 CoNLL fields of every token of every tree
+        parse_model: the path of the parser model
+        decoding (str, optional): see DECODING_MODES. Defaults to 'proj'.
+
+    Returns:
+        List[List[tuple]]: the parsed trees
+    """
+    # the parser only takes words, (word, tag) or (word, lemma, tag), and sets the other columns to _
+    form_lemma_pos_tuples = [[token_tuple[1:4] for token_tuple in tree] for tree in conll_trees]
+    conll = parse(form_lemma_pos_tuples, parse_model=parse_model, decoding=decoding)
+    for i, (sent, tree) in enumerate(zip(conll, conll_trees)):
+        conll[i].values[1] = [filter_tatweel(form) for form in sent.values[1]]
+        for column in (4, 5, 9):
+            conll[i].values[column] = [token_tuple[column] for token_tuple in tree]
     return parser_conll_to_conll_tuples(conll)
 
-def parse_conll(conll_path: str, parse_model) -> List[List[tuple]]:
-    conll = parse(conll_path, parse_model=parse_model)
+def parse_conll(conll_path: str, parse_model, decoding: str='proj') -> List[List[tuple]]:
+    conll = parse(conll_path, parse_model=parse_model, decoding=decoding)
     for i, sent in enumerate(conll):
         conll[i].values[1] = [filter_tatweel(form) for form in sent.values[1]]
     return parser_conll_to_conll_tuples(conll)
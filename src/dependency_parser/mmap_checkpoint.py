@@ -0,0 +1,102 @@
+"""Memory-mapped parser checkpoints.
+
+Parser.load reads the whole checkpoint into process memory. A converted checkpoint
+is a directory next to the model file (CAMeLBERT-CATiB-biaffine.model.mmap) with:
+    tensors.bin: the raw bytes of every tensor of the state dict
+    meta.pt: the rest of the checkpoint (args, transform, ...) and the offset, dtype and shape of each tensor
+
+Loading maps tensors.bin into memory and points the model parameters at it, so
+only the pages of weights that are actually used are read from disk, and
+processes that load the same model share those pages through the page cache.
+"""
+
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import supar
+import torch
+from supar import Parser
+from supar.utils import Config
+
+MMAP_SUFFIX = '.mmap'
+TENSORS_FILE = 'tensors.bin'
+META_FILE = 'meta.pt'
+# tensors start on 64 byte boundaries
+ALIGNMENT = 64
+
+
+def get_mmap_dir(parse_model: Union[str, Path]) -> Path:
+    return Path(f'{parse_model}{MMAP_SUFFIX}')
+
+def has_mmap_checkpoint(parse_model: Union[str, Path]) -> bool:
+    """Check that the checkpoint was converted, and was not modified since."""
+    meta_path = get_mmap_dir(parse_model) / META_FILE
+    if not meta_path.exists():
+        return False
+    return not os.path.exists(parse_model) or os.path.getmtime(meta_path) >= os.path.getmtime(parse_model)
+
+def convert_checkpoint(parse_model: Union[str, Path]) -> Path:
+    """Convert a parser checkpoint to the memory-mappable format.
+
+    Returns:
+        Path: the directory of the converted checkpoint
+    """
+    mmap_dir = get_mmap_dir(parse_model)
+    os.makedirs(mmap_dir, exist_ok=True)
+
+    state = torch.load(parse_model, map_location='cpu')
+    state_dict = state.pop('state_dict')
+
+    tensor_index = {}
+    with open(mmap_dir / TENSORS_FILE, 'wb') as f:
+        offset = 0
+        for name, tensor in state_dict.items():
+            array = tensor.detach().cpu().contiguous().numpy()
+            padding = -offset % ALIGNMENT
+            f.write(b'\0' * padding)
+            offset += padding
+            f.write(array.tobytes())
+            tensor_index[name] = (array.dtype.str, array.shape, offset)
+            offset += array.nbytes
+
+    state['tensor_index'] = tensor_index
+    # meta.pt is written last, it marks a complete conversion
+    torch.save(state, mmap_dir / META_FILE)
+    return mmap_dir
+
+def set_tensor(model: torch.nn.Module, name: str, tensor: torch.Tensor) -> None:
+    """Point a parameter or buffer of the model at the given tensor, without copying it."""
+    module_name, _, attribute = name.rpartition('.')
+    module = model.get_submodule(module_name) if module_name else model
+    if attribute in module._parameters and module._parameters[attribute] is not None:
+        module._parameters[attribute].data = tensor
+    elif attribute in module._buffers:
+        module._buffers[attribute] = tensor
+
+def load_mmap_parser(parse_model: Union[str, Path]) -> Parser:
+    """Load a parser from its converted checkpoint (see convert_checkpoint).
+    Follows Parser.load, except that the state dict is memory-mapped instead of copied.
+    """
+    mmap_dir = get_mmap_dir(parse_model)
+    state = torch.load(mmap_dir / META_FILE, map_location='cpu')
+    # copy-on-write mapping: the arrays are writable as torch expects, but the file is never modified
+    tensors_buffer = np.memmap(mmap_dir / TENSORS_FILE, dtype=np.uint8, mode='c')
+
+    cls = supar.PARSER[state['name']]
+    args = state['args'].update(Config(path=str(parse_model), reload=False, src='github', checkpoint=False))
+    model = cls.MODEL(**args)
+    model.load_pretrained(state['pretrained'])
+
+    model_state_names = set(model.state_dict())
+    for name, (dtype, shape, offset) in state['tensor_index'].items():
+        if name not in model_state_names:
+            continue # like load_state_dict(strict=False)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=tensors_buffer, offset=offset)
+        set_tensor(model, name, torch.from_numpy(array))
+
+    parser = cls(args, model, state['transform'])
+    parser.checkpoint_state_dict = None
+    parser.model.to(parser.device)
+    return parser
@@ -1,11 +1,94 @@
+from typing import Callable, Dict, List, Union
+from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
+from camel_tools.disambig.common import DisambiguatedWord
+from camel_tools.utils.dediac import dediac_ar
 
 
-# class BertDisambiguatorAdapter:
-#     pass
+class BertDisambiguatorAdapter():
+    def __init__(self, disambiguator: BERTUnfactoredDisambiguator, token_budget: Union[int, None]=None):
+        """
+        Args:
+            disambiguator (BERTUnfactoredDisambiguator): the camel_tools disambiguator
+            token_budget (Union[int, None], optional): the number of subword tokens of a batch, padding included
+                (see disambiguate_batches). Defaults to None (the batches of camel_tools, of a fixed number of sentences).
+        """
+        self.disambiguator = disambiguator
+        self.token_budget = token_budget
 
-from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
+    @property
+    def tokenizer(self):
+        """The WordPiece tokenizer of the BERT tagger."""
+        return self.disambiguator._model['unfactored']._tokenizer
+
+    def disambiguate(self, sentence: List[str]) -> List[DisambiguatedWord]:
+        return self.disambiguator.disambiguate(sentence)
+
+    def disambiguate_sentences(self, lines: List[List[str]]) -> List[List[DisambiguatedWord]]:
+        if self.token_budget:
+            return self.disambiguate_batches(lines)
+        return self.disambiguator.disambiguate_sentences(lines)
+
+    def disambiguate_batches(self, lines: List[List[str]]) -> List[List[DisambiguatedWord]]:
+        """Same as disambiguate_sentences, with sentences of similar subword lengths batched together.
+        camel_tools sorts the sentences by word count and runs batches of a fixed number of sentences, each padded
+        to its longest sentence; words of many subwords make batches of the same word count uneven, and batches of
+        long sentences large. Here the sentences are sorted by subword length, and each batch is filled until its
+        padded size (sentences times longest sentence) reaches token_budget. Each batch is run as one forward pass,
+        and the sentences are returned in their original order.
+        """
+        lengths = get_subword_lengths(self.tokenizer.tokenize, lines)
+        disambiguated_sentences: List[List[DisambiguatedWord]] = [None] * len(lines)
+        batch_size = self.disambiguator._batch_size
+        for batch in plan_batches(lengths, self.token_budget):
+            # one forward pass of the tagger for the whole batch: sentences over 510 subwords are split into
+            # segments of at least one subword, so the batch has fewer segments than subwords
+            self.disambiguator._batch_size = sum(lengths[i] for i in batch)
+            try:
+                batch_sentences = self.disambiguator.disambiguate_sentences([lines[i] for i in batch])
+            finally:
+                self.disambiguator._batch_size = batch_size
+            for i, disambiguated_sentence in zip(batch, batch_sentences):
+                disambiguated_sentences[i] = disambiguated_sentence
+        return disambiguated_sentences
+
+def get_subword_lengths(tokenize: Callable[[str], List[str]], lines: List[List[str]]) -> List[int]:
+    """The number of subword tokens of each sentence, with [CLS] and [SEP], as the BERT tagger sees it
+    (dediacritized words; words without pieces, e.g. a lone space, are left out by camel_tools)."""
+    piece_counts: Dict[str, int] = {}
+    lengths = []
+    for line in lines:
+        length = 2
+        for word in line:
+            if word not in piece_counts:
+                piece_counts[word] = len(tokenize(dediac_ar(word) or word))
+            length += piece_counts[word]
+        lengths.append(length)
+    return lengths
+
+def plan_batches(lengths: List[int], token_budget: int) -> List[List[int]]:
+    """Batches of sentences sorted by length, each filled while its padded size (sentences times the longest
+    sentence) is within token_budget. A sentence longer than token_budget is a batch on its own.
+
+    Args:
+        lengths (List[int]): the subword length of each sentence
+        token_budget (int): the padded size of a batch
+
+    Returns:
+        List[List[int]]: the indices of the sentences of each batch, from the shortest sentences to the longest
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        # sorted, so the sentence added is the longest of the batch
+        if batch and lengths[i] * (len(batch) + 1) > token_budget:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
 
-def create_bert_disambiguator(analyzer):
+def create_bert_disambiguator(analyzer, token_budget: Union[int, None]=None) -> BertDisambiguatorAdapter:
     model = BERTUnfactoredDisambiguator.pretrained("msa", top=1000, pretrained_cache=False)
     model._analyzer = analyzer
-    return model
+    return BertDisambiguatorAdapter(model, token_budget)
@@ -0,0 +1,72 @@
+"""Binary snapshots of an initialized morphology database.
+
+Building a MorphologyDB parses the text database file, which takes several
+seconds on every start. A snapshot stores the built database with pickle, and
+loading it skips the parsing. A snapshot is rebuilt when it was made by
+another camel_tools version, or with another snapshot format.
+"""
+
+import gc
+import os
+import pickle
+from pathlib import Path
+from typing import Union
+
+import camel_tools
+from camel_tools.morphology.database import MorphologyDB
+
+SNAPSHOT_VERSION = 1
+
+
+def get_snapshot_path(snapshot_dir: Union[str, Path], morphology_db: str) -> Path:
+    return Path(snapshot_dir) / f'morphology-db-{morphology_db}.snapshot'
+
+def build_morphology_db(morphology_db: str) -> MorphologyDB:
+    db_type = None if morphology_db == 'r13' else morphology_db
+    return MorphologyDB.builtin_db(db_name=db_type)
+
+def save_db_snapshot(db: MorphologyDB, snapshot_path: Union[str, Path]) -> None:
+    snapshot = {
+        'snapshot_version': SNAPSHOT_VERSION,
+        'camel_tools_version': camel_tools.__version__,
+        'db': db,
+    }
+    # written to a temporary file first, so concurrent processes never load a partial snapshot
+    temp_path = f'{snapshot_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, snapshot_path)
+
+def load_db_snapshot(snapshot_path: Union[str, Path]) -> Union[MorphologyDB, None]:
+    """Load a database snapshot. Returns None if there is no snapshot, or if it is out of date."""
+    if not os.path.exists(snapshot_path):
+        return None
+
+    # the snapshot is millions of small objects; the garbage collector would repeatedly scan them while loading
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    if snapshot.get('snapshot_version') != SNAPSHOT_VERSION or snapshot.get('camel_tools_version') != camel_tools.__version__:
+        return None
+    return snapshot['db']
+
+def get_morphology_db(morphology_db: str, snapshot_dir: Union[str, Path, None]=None) -> MorphologyDB:
+    """Get a morphology database, from its snapshot in snapshot_dir if there is one.
+    If snapshot_dir is given and there is no valid snapshot, the database is built and its snapshot is saved.
+    """
+    if snapshot_dir is None:
+        return build_morphology_db(morphology_db)
+
+    snapshot_path = get_snapshot_path(snapshot_dir, morphology_db)
+    db = load_db_snapshot(snapshot_path)
+    if db is None:
+        db = build_morphology_db(morphology_db)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        save_db_snapshot(db, snapshot_path)
+    return db
@@ -1,27 +1,39 @@
+from pathlib import Path
 from typing import Union
-from camel_tools.morphology.database import MorphologyDB
 from camel_tools.morphology.analyzer import Analyzer
-from camel_tools.disambig.bert import BERTUnfactoredDisambiguator
+from camel_tools.morphology.database import MorphologyDB
 
 from ..logger import log
-from .bert_disambiguator import create_bert_disambiguator
+from .bert_disambiguator import BertDisambiguatorAdapter, create_bert_disambiguator
+from .db_snapshot import get_morphology_db
 from .mle_disambiguator import MLEDisambiguatorAdapter
 
-def set_up_analyzer(morphology_db: str) -> Analyzer:
+def set_up_analyzer(morphology_db: str, snapshot_dir: Union[str, Path, None]=None) -> Analyzer:
     # used to initialize an Analyzer with ADD_PROP backoff 
     # db = MorphologyDB.builtin_db('calima-msa-s31')
-    db_type = None if morphology_db == 'r13' else morphology_db
-    db = MorphologyDB.builtin_db(db_name=db_type)
+    # if snapshot_dir is given, the db is loaded from (or saved to) a binary snapshot, see db_snapshot.py
+    db = get_morphology_db(morphology_db, snapshot_dir)
+    return create_analyzer(db)
+
+def create_analyzer(db: MorphologyDB) -> Analyzer:
     return Analyzer(db=db, backoff='ADD_PROP', cache_size=100000)
 
 @log
-def get_disambiguator(model_name: str, morphology_db: str) -> Union[MLEDisambiguatorAdapter, BERTUnfactoredDisambiguator]:
-    analyzer = set_up_analyzer(morphology_db)
+def get_disambiguator(
+        model_name: str,
+        morphology_db: str,
+        snapshot_dir: Union[str, Path, None]=None,
+        token_budget: Union[int, None]=None
+    ) -> Union[MLEDisambiguatorAdapter, BertDisambiguatorAdapter]:
+    # token_budget: for bert, batch the sentences by subword length (see BertDisambiguatorAdapter)
+    analyzer = set_up_analyzer(morphology_db, snapshot_dir)
     
     if model_name == 'mle':
         model = MLEDisambiguatorAdapter(analyzer)
+    elif model_name == 'mle_type':
+        model = MLEDisambiguatorAdapter(analyzer, type_level=True)
     elif model_name == 'bert':
-        model = create_bert_disambiguator(analyzer)
+        model = create_bert_disambiguator(analyzer, token_budget)
     else:
         raise ValueError('Invalid model')
     
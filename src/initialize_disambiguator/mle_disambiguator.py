@@ -4,8 +4,10 @@ from camel_tools.disambig.common import DisambiguatedWord
 from camel_tools.morphology.analyzer import Analyzer
 
 class MLEDisambiguatorAdapter():
-    def __init__(self, analyzer: Analyzer):
+    def __init__(self, analyzer: Analyzer, type_level: bool=False):
         self.disambiguator = MLEDisambiguator(analyzer=analyzer)
+        # disambiguate each word type of a batch once (see disambiguate_types)
+        self.type_level = type_level
     
     # def pretrained(self, analyzer):
     #     self.disambiguator = self.disambiguator
@@ -14,4 +16,14 @@ class MLEDisambiguatorAdapter():
         return self.disambiguator.disambiguate(sentence)
     
     def disambiguate_sentences(self, lines: List[List[str]]) -> List[List[DisambiguatedWord]]:
-        return [self.disambiguator.disambiguate(line) for line in lines]
\ No newline at end of file
+        if self.type_level:
+            return self.disambiguate_types(lines)
+        return [self.disambiguator.disambiguate(line) for line in lines]
+
+    def disambiguate_types(self, lines: List[List[str]]) -> List[List[DisambiguatedWord]]:
+        """Same as disambiguating sentence by sentence: the MLE disambiguator does not use context,
+        so each word type of the batch is disambiguated once, and the result is shared by all its tokens.
+        """
+        word_types = list(dict.fromkeys(word for line in lines for word in line))
+        disambiguated_types = dict(zip(word_types, self.disambiguator.disambiguate(word_types)))
+        return [[disambiguated_types[word] for word in line] for line in lines]
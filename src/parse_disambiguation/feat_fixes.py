@@ -0,0 +1,96 @@
+"""Corrections of the stem features used to find the features of clitics,
+for analyses of the morphology database that do not match a clitic in
+data/clitic_feats.csv (e.g. li coming from li>n, or lA_neg).
+
+The corrections are a rule table, data/clitic_feat_fixes.csv, with one rule per row:
+    token: the clitic the rule applies to, or * for any clitic
+    differs: empty if the stem features should equal the feature columns;
+        otherwise a feature that should differ from its column, while all other features are equal
+    feature columns (pos, prc3, ...): the stem features the rule matches
+    set_feat, set_value: the stem feature the rule sets, and its value
+    description: where the analysis comes from
+
+When several rules match, the first one in the table is applied. The table is
+compiled into hash tables keyed on the tuple of stem features, and the result
+for each (clitic, stem features) pair is cached, so a clitic costs one lookup.
+"""
+
+import csv
+import functools
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+FEAT_FIXES_PATH = Path(__file__).parents[2] / 'data/clitic_feat_fixes.csv'
+ANY_TOKEN = '*'
+RULE_COLUMNS = ['token', 'differs', 'set_feat', 'set_value', 'description']
+
+FeatFix = Tuple[str, str]
+
+
+class FeatFixTable:
+    def __init__(self, rules: List[Dict[str, str]], features: List[str]):
+        """
+        Args:
+            rules (List[Dict[str, str]]): the rows of the rule table, in order
+            features (List[str]): the stem features matched by the rules
+        """
+        self.features = features
+        self.fixes: List[FeatFix] = []
+        # (token, feature values) -> index of the first matching rule
+        self._exact_rules: Dict[tuple, int] = {}
+        # differing feature index -> (token, feature values without it) -> [(rule index, value it should differ from)]
+        self._differs_rules: Dict[int, Dict[tuple, List[Tuple[int, str]]]] = {}
+        self._cache: Dict[tuple, Union[FeatFix, None]] = {}
+
+        for rule_idx, rule in enumerate(rules):
+            values = tuple(rule[feature] for feature in features)
+            self.fixes.append((rule['set_feat'], rule['set_value']))
+            if not rule['differs']:
+                self._exact_rules.setdefault((rule['token'], values), rule_idx)
+            else:
+                feature_idx = features.index(rule['differs'])
+                masked_values = values[:feature_idx] + values[feature_idx + 1:]
+                self._differs_rules.setdefault(feature_idx, {}).setdefault((rule['token'], masked_values), []).append(
+                    (rule_idx, values[feature_idx])
+                )
+
+    @classmethod
+    def from_csv(cls, file_path: Union[str, Path]) -> 'FeatFixTable':
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            features = [column for column in reader.fieldnames if column not in RULE_COLUMNS]
+            rules = list(reader)
+        return cls(rules, features)
+
+    def _find_fix(self, token: str, values: tuple) -> Union[FeatFix, None]:
+        matching_rules = []
+        for rule_token in (token, ANY_TOKEN):
+            if (rule_token, values) in self._exact_rules:
+                matching_rules.append(self._exact_rules[(rule_token, values)])
+            for feature_idx, differs_rules in self._differs_rules.items():
+                masked_values = values[:feature_idx] + values[feature_idx + 1:]
+                for rule_idx, rule_value in differs_rules.get((rule_token, masked_values), []):
+                    if values[feature_idx] != rule_value:
+                        matching_rules.append(rule_idx)
+        return self.fixes[min(matching_rules)] if matching_rules else None
+
+    def lookup(self, token: str, stem_feats: dict) -> Union[FeatFix, None]:
+        """The (feature, value) set by the first rule matching the clitic and its stem features, if any."""
+        values = tuple([stem_feats[feature] for feature in self.features])
+        key = (token, values)
+        try:
+            return self._cache[key]
+        except KeyError:
+            fix = self._cache[key] = self._find_fix(token, values)
+            return fix
+
+    def apply(self, token: str, stem_feats: dict) -> None:
+        """Correct stem_feats in place."""
+        fix = self.lookup(token, stem_feats)
+        if fix is not None:
+            stem_feats[fix[0]] = fix[1]
+
+@functools.lru_cache(maxsize=None)
+def get_feat_fixes(file_path: Union[str, Path]=FEAT_FIXES_PATH) -> FeatFixTable:
+    # compiled once per table file and process
+    return FeatFixTable.from_csv(file_path)
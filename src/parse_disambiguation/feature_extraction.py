@@ -4,20 +4,30 @@ get features based on a given criteria.
 If no criteria is given, return atbtok and catib6
 """
 
+import functools
 import re
-from typing import List
+import sys
+from typing import Dict, List
 import json
 from camel_tools.utils.dediac import dediac_ar
 from camel_tools.utils.charmap import CharMapper
 from camel_tools.utils.transliterate import Transliterator
 import pandas as pd
 
+from src.parse_disambiguation.feat_fixes import get_feat_fixes
+from src.utils.interning import intern_string
+
 FEATURES_LIST = ["pos", "prc3", "prc2", "prc1", "prc0", "enc0", "asp", "vox", "mod", "gen", "num", "stt", "cas", "per", "rat"]
 
 def feats_dict_to_string(feats_dict):
     # prc3=na|prc2=na|prc1=na|prc0=na|per=na|asp=na|vox=na|mod=na|gen=na|num=na|stt=na|cas=na|enc0=na|rat=na
-    feats_str = json.dumps(feats_dict)
-    return feats_str.replace('", "', "|").replace('": "', "=").replace('{"', '').replace('"}', '')
+    return feats_items_to_string(tuple(feats_dict.items()))
+
+@functools.lru_cache(maxsize=2**16)
+def feats_items_to_string(feats_items):
+    # there are few distinct feature combinations, so each FEATS string is built once and shared by all its tokens
+    feats_str = json.dumps(dict(feats_items))
+    return sys.intern(feats_str.replace('", "', "|").replace('": "', "=").replace('{"', '').replace('"}', ''))
 
 def build_clitic_feats_dict(clitic_feat_list):
     assert len(clitic_feat_list) != 0, f'invalid clitic, {clitic_feat_list}'
@@ -61,34 +71,6 @@ def empty_clitic_feats_from_baseword(stem_feats):
     return stem_feats
     
 
-def r13_fixes(token, stem_feats):
-    # handling edge cases where li comes from variations of wa li>n (i.e. li>nhu, li>nanY)
-    li_feats = {'pos': 'conj_sub', 'prc3': '0', 'prc2': 'wa_conj', 'prc1': '0', 'prc0': 'na', 'enc0': '3ms_pron', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}
-    if {k for k, _ in stem_feats.items() ^ li_feats.items()} == {'enc0'}:
-        stem_feats['prc1'] = 'li_conj'
-    
-    # handling edge cases where li comes from variations of li>n (i.e. li>nhu, li>nanY)
-    li_feats = {'pos': 'conj_sub', 'prc3': '0', 'prc2': '0', 'prc1': '0', 'prc0': 'na', 'enc0': '0', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}
-    if {k for k, _ in stem_feats.items() ^ li_feats.items()} == {'enc0'}:
-        stem_feats['prc1'] = 'li_conj'
-        
-    # handling edge cases where li comes from li>n
-    if token == 'لِ+' and stem_feats == {'pos': 'conj_sub', 'prc3': '0', 'prc2': '0', 'prc1': '0', 'prc0': 'na', 'enc0': '0', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}:
-            stem_feats['prc1'] = 'li_conj'
-    
-    # handling edge cases where li comes from wa li>n
-    if token == 'لِ+' and stem_feats == {'pos': 'conj_sub', 'prc3': '0', 'prc2': 'wa_conj', 'prc1': '0', 'prc0': 'na', 'enc0': '3ms_pron', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}:
-            stem_feats['prc1'] = 'li_conj'
-    
-    # handling edge cases where mA comes from qlmA
-    if token == '+ما' and stem_feats == {'pos': 'conj', 'prc3': '0', 'prc2': '0', 'prc1': '0', 'prc0': 'na', 'enc0': '0', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'n'}:
-            stem_feats['enc0'] = 'mA_sub'
-    
-    # handling an edge case where li comes from likY
-    # added li_conj to clitic_feats.csv
-    if token == 'لِ+' and stem_feats == {'pos': 'conj', 'prc3': '0', 'prc2': '0', 'prc1': '0', 'prc0': 'na', 'enc0': '0', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}:
-        stem_feats['prc1'] = 'li_conj'
-
 def add_remaining_features(tokens_df, stem_feats, clitic_feats):
     existing_clitics = ['prc0']
 
@@ -102,15 +84,8 @@ def add_remaining_features(tokens_df, stem_feats, clitic_feats):
             clitic_feats_list.append(baseword_feats_dict)
         else:
             clitic_order = get_clitic_order(token)
-            # handling an edge case where lA is negative
-            if token == 'لِ+' and \
-                (stem_feats == {'pos': 'conj_sub', 'prc3': '0', 'prc2': '0', 'prc1': '0', 'prc0': 'na', 'enc0': 'lA_neg', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'}
-                or stem_feats == {'pos': 'conj_sub', 'prc3': '0', 'prc2': 'fa_conj', 'prc1': '0', 'prc0': 'na', 'enc0': 'lA_neg', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'} 
-                or stem_feats == {'pos': 'conj_sub', 'prc3': '0', 'prc2': 'wa_part', 'prc1': '0', 'prc0': 'na', 'enc0': 'lA_neg', 'asp': 'na', 'vox': 'na', 'mod': 'na', 'gen': 'na', 'num': 'na', 'stt': 'na', 'cas': 'na', 'per': 'na', 'rat': 'na'} 
-                ):
-                    stem_feats['prc1'] = 'li_prep'
-            
-            r13_fixes(token, stem_feats)
+            # edge cases of analyses whose clitics are not in clitic_feats (see data/clitic_feat_fixes.csv)
+            get_feat_fixes().apply(token, stem_feats)
             
             clitic_feats_list.append(get_clitic_feats(token.replace('+', ''), clitic_order, clitic_feats, stem_feats))
 
@@ -174,7 +149,8 @@ def join_feats(word_feats_df, tagset):
         'lemmas': list(word_feats_df['lemma']),
     }
     
-    word_feats_df.drop(['token', tagset, 'lemma'], axis=1, inplace=True)
+    # not in place, so the same word features can be joined for another tagset
+    word_feats_df = word_feats_df.drop(['token', tagset, 'lemma'], axis=1)
     feats = word_feats_df.to_dict('records')
     word_features['feats'] = [feats_dict_to_string(row) for row in feats]
 
@@ -190,23 +166,34 @@ def update_sentence_features(sentence_features, word_features):
 
 def build_token_list(sentence_features):
     return [
-        (idx, dediac_ar(token), lemma, pos_tag, '_', feats, '_', '_', '_', '_')
+        (idx, dediac_ar(token), intern_string(lemma), intern_string(pos_tag), '_', feats, '_', '_', '_', '_')
         for idx, (token, lemma, pos_tag, feats) in enumerate(
             zip(sentence_features['tokens'], sentence_features['lemmas'], sentence_features['pos_tags'], sentence_features['feats'])
         , 1)
     ]
 
-def to_conll_fields_list(sentence_analysis_list: List[List[dict]], clitic_feats, tagset):
-    sentence_features_list = []
+def to_conll_fields_lists(sentence_analysis_list: List[List[dict]], clitic_feats, tagsets: List[str]) -> Dict[str, List[List[tuple]]]:
+    """Extract the conll fields of every sentence once for each tagset.
+    The word features are extracted only once and shared by all tagsets.
+
+    Returns:
+        Dict[str, List[List[tuple]]]: the token tuples of each sentence, by tagset
+    """
+    sentence_features_lists = {tagset: [] for tagset in tagsets}
     
     for sentence_analysis in sentence_analysis_list:
-        sentence_features = {'tokens': [], 'lemmas': [], 'pos_tags': [], 'feats': []}
+        sentence_features = {tagset: {'tokens': [], 'lemmas': [], 'pos_tags': [], 'feats': []} for tagset in tagsets}
         for word_analysis in sentence_analysis:
             word_features_df = get_word_features_df(word_analysis, clitic_feats)
             
-            word_features = join_feats(word_features_df, tagset)
-            sentence_features = update_sentence_features(sentence_features, word_features)
-        token_list = build_token_list(sentence_features)
-        sentence_features_list.append(token_list)
+            for tagset in tagsets:
+                word_features = join_feats(word_features_df, tagset)
+                sentence_features[tagset] = update_sentence_features(sentence_features[tagset], word_features)
+        for tagset in tagsets:
+            token_list = build_token_list(sentence_features[tagset])
+            sentence_features_lists[tagset].append(token_list)
     
-    return sentence_features_list
+    return sentence_features_lists
+
+def to_conll_fields_list(sentence_analysis_list: List[List[dict]], clitic_feats, tagset):
+    return to_conll_fields_lists(sentence_analysis_list, clitic_feats, [tagset])[tagset]
@@ -0,0 +1,85 @@
+"""Extracting the conll fields of the sentences in worker processes.
+
+Feature extraction is pure Python and goes sentence by sentence, so on long inputs it keeps
+a single core busy while the models are idle. With several feature workers, the sentences
+are split into chunks that are featurized by forked worker processes.
+
+The analyses and the clitic table are set before the workers are forked, so they are
+inherited instead of being pickled: the clitic table is loaded once, and each worker builds
+its lookup tables once, before its first chunk. Workers only receive the bounds of their
+chunks, and send back the token tuples. The chunks are put back in order, so the output is
+the same as featurizing every sentence in this process.
+"""
+
+import gc
+import math
+import multiprocessing
+from typing import Dict, List, Union
+
+import pandas as pd
+
+from src.parse_disambiguation.feat_fixes import get_feat_fixes
+from src.parse_disambiguation.feature_extraction import to_conll_fields_lists
+from src.utils.interning import intern_fields
+
+# the number of chunks per worker, so a worker that gets long sentences does not hold the others up
+CHUNKS_PER_WORKER = 4
+
+# set before forking, inherited by the workers
+_featurize_task: dict = {}
+
+
+def _init_worker():
+    get_feat_fixes()
+
+def _featurize_chunk(bounds: tuple) -> Dict[str, List[List[tuple]]]:
+    start, end = bounds
+    return to_conll_fields_lists(_featurize_task['sentence_analysis_list'][start:end],
+        _featurize_task['clitic_feats'], _featurize_task['tagsets'])
+
+def to_conll_fields_lists_parallel(
+        sentence_analysis_list: List[List[dict]],
+        clitic_feats: pd.DataFrame,
+        tagsets: List[str],
+        workers: int,
+        chunk_size: Union[int, None]=None
+    ) -> Dict[str, List[List[tuple]]]:
+    """to_conll_fields_lists, with the sentences split into chunks featurized by forked worker processes.
+    Only available where processes can be forked (Linux, macOS).
+
+    Args:
+        sentence_analysis_list (List[List[dict]]): the analysis of each word of each sentence
+        clitic_feats (pd.DataFrame): the clitic features table
+        tagsets (List[str]): the tagsets to build the token tuples for
+        workers (int): the number of worker processes; 1 featurizes in this process
+        chunk_size (int, optional): the number of sentences per chunk. Defaults to CHUNKS_PER_WORKER chunks per worker.
+
+    Returns:
+        Dict[str, List[List[tuple]]]: the token tuples of each sentence, by tagset
+    """
+    if workers <= 1 or len(sentence_analysis_list) <= 1:
+        return to_conll_fields_lists(sentence_analysis_list, clitic_feats, tagsets)
+
+    if chunk_size is None:
+        chunk_size = math.ceil(len(sentence_analysis_list) / (workers * CHUNKS_PER_WORKER))
+    chunk_bounds = [(start, min(start + chunk_size, len(sentence_analysis_list)))
+                    for start in range(0, len(sentence_analysis_list), chunk_size)]
+
+    _featurize_task.update(sentence_analysis_list=sentence_analysis_list, clitic_feats=clitic_feats, tagsets=tagsets)
+    # the objects inherited by the workers are moved out of reach of their garbage collections (see src/utils/workers.py)
+    gc.collect()
+    gc.freeze()
+    text_tuples_by_tagset = {tagset: [] for tagset in tagsets}
+    try:
+        with multiprocessing.get_context('fork').Pool(min(workers, len(chunk_bounds)), initializer=_init_worker) as pool:
+            # imap returns the chunks in order
+            for chunk_tuples_by_tagset in pool.imap(_featurize_chunk, chunk_bounds):
+                for tagset, chunk_tuples in chunk_tuples_by_tagset.items():
+                    # the tuples were unpickled with new strings, which are interned again
+                    text_tuples_by_tagset[tagset].extend(
+                        [intern_fields(token_tuple) for token_tuple in sentence_tuples] for sentence_tuples in chunk_tuples
+                    )
+    finally:
+        gc.unfreeze()
+        _featurize_task.clear()
+    return text_tuples_by_tagset
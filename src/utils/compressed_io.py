@@ -0,0 +1,142 @@
+"""Reading and writing compressed files, chosen by file extension:
+    .gz (gzip), .bz2 (bzip2), .xz (lzma), and .zst (zstandard, if the zstandard package is installed).
+Other files are read and written as plain text.
+
+Compressed inputs are decompressed as they are read, so no uncompressed copy is made.
+Compressed outputs are encoded and compressed by a background thread (see BackgroundWriter),
+so compression overlaps with the rest of the pipeline instead of stalling it; the
+compressors release the GIL while they work.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+from typing import Iterable, List, Union
+
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bzip2', '.xz': 'lzma', '.zst': 'zstandard'}
+# the characters buffered before a chunk is handed to the writer thread
+WRITE_CHUNK_SIZE = 2**20
+# the chunks waiting to be written, so a slow disk bounds the memory held
+WRITE_QUEUE_SIZE = 16
+
+
+def get_compression(file_path: Union[str, os.PathLike]) -> Union[str, None]:
+    """The compression of the file, from its extension, or None for plain files."""
+    return COMPRESSIONS.get(os.path.splitext(str(file_path))[1].lower())
+
+def strip_compression_suffix(file_name: str) -> str:
+    """The file name without its compression extension (corpus.txt.gz -> corpus.txt)."""
+    return os.path.splitext(file_name)[0] if get_compression(file_name) else file_name
+
+def _open_binary(file_path: Union[str, os.PathLike], compression: str, mode: str):
+    if compression == 'gzip':
+        # level 6 is much faster than the default 9, for a slightly larger file
+        return gzip.open(file_path, mode, compresslevel=6) if 'w' in mode else gzip.open(file_path, mode)
+    if compression == 'bzip2':
+        return bz2.open(file_path, mode)
+    if compression == 'lzma':
+        return lzma.open(file_path, mode)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f'{file_path} is compressed with zstandard; install it with pip install zstandard')
+    return zstandard.open(file_path, mode)
+
+def open_input(file_path: Union[str, os.PathLike]) -> io.TextIOBase:
+    """Open a plain or compressed file for reading text (utf-8)."""
+    compression = get_compression(file_path)
+    if compression is None:
+        return open(file_path, 'r')
+    return io.TextIOWrapper(_open_binary(file_path, compression, 'rb'), encoding='utf-8')
+
+def read_lines(file_path: Union[str, os.PathLike]) -> List[str]:
+    """The non-empty lines of a plain or compressed file."""
+    with open_input(file_path) as f:
+        return [line for line in f if line.strip()]
+
+
+class BackgroundWriter:
+    def __init__(self, file_path: Union[str, os.PathLike], compression: str):
+        """A text file (utf-8) compressed and written by a background thread.
+        Writes are buffered into chunks, which the thread encodes, compresses and writes in order.
+        Errors of the thread are raised by the next write, or by close.
+
+        Args:
+            file_path (Union[str, os.PathLike]): the output file
+            compression (str): one of the values of COMPRESSIONS
+        """
+        self.file_path = file_path
+        self._file = _open_binary(file_path, compression, 'wb')
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._chunks: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_chunks, name='compressed-writer', daemon=True)
+        self._thread.start()
+
+    def _write_chunks(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            if self._error is None:
+                try:
+                    self._file.write(chunk.encode('utf-8'))
+                except BaseException as error:
+                    # raised in the writing thread; the remaining chunks are dropped
+                    self._error = error
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _flush_buffer(self) -> None:
+        self._raise_error()
+        if self._buffer:
+            self._chunks.put(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= WRITE_CHUNK_SIZE:
+            self._flush_buffer()
+        return len(text)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def close(self) -> None:
+        """Write what is left, wait for the thread, and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._flush_buffer()
+        finally:
+            self._chunks.put(None)
+            self._thread.join()
+            self._file.close()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_output(file_path: Union[str, os.PathLike]):
+    """Open a plain or compressed file for writing text (utf-8), by its extension.
+    Compressed files are written by a BackgroundWriter."""
+    compression = get_compression(file_path)
+    if compression is None:
+        # a large buffer, so a file is written in a few large writes
+        return open(file_path, 'w', buffering=2**20)
+    return BackgroundWriter(file_path, compression)
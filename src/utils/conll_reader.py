@@ -0,0 +1,65 @@
+"""Reading CoNLL-X/CoNLL-U trees into the token tuples used across the pipeline."""
+
+from typing import Iterable, List, Tuple
+
+from src.utils.compressed_io import open_input
+from src.utils.interning import intern_fields
+
+
+def split_conll_blocks(lines: Iterable[str]) -> List[List[str]]:
+    """Group CoNLL lines into one block of lines per tree (comments included).
+    Blank lines separate the trees; a missing blank line at the end of the file is fine.
+
+    Args:
+        lines (Iterable[str]): the lines of a CoNLL file
+
+    Returns:
+        List[List[str]]: the lines of each tree, without newlines
+    """
+    blocks = []
+    block = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.strip():
+            block.append(line)
+        elif block:
+            blocks.append(block)
+            block = []
+    if block:
+        blocks.append(block)
+    return blocks
+
+def block_to_tree(block: List[str]) -> Tuple[List[str], List[tuple]]:
+    """Split a block of CoNLL lines into its comments and its token tuples.
+    Multiword token ranges (1-2) and empty nodes (1.1) are skipped.
+    Repeated values (tags, relations, '_', ...) share one string, see src/utils/interning.py.
+
+    Returns:
+        Tuple[List[str], List[tuple]]: the comment lines, and a tuple of 10 fields per token
+    """
+    comments = []
+    token_tuples = []
+    for line in block:
+        if line.startswith('#'):
+            comments.append(line)
+            continue
+        fields = line.split('\t')
+        if '-' in fields[0] or '.' in fields[0]:
+            continue
+        token_tuples.append(intern_fields(fields + ['_'] * (10 - len(fields))))
+    return comments, token_tuples
+
+def read_conll_lines(lines: Iterable[str]) -> Tuple[List[List[str]], List[List[tuple]]]:
+    """Read the trees of CoNLL lines. Blocks without tokens (only comments) are skipped.
+
+    Returns:
+        Tuple[List[List[str]], List[List[tuple]]]: the comments and the token tuples of each tree
+    """
+    trees = [block_to_tree(block) for block in split_conll_blocks(lines)]
+    trees = [(comments, token_tuples) for comments, token_tuples in trees if token_tuples]
+    return [comments for comments, _ in trees], [token_tuples for _, token_tuples in trees]
+
+def read_conll(file_path) -> Tuple[List[List[str]], List[List[tuple]]]:
+    """Read a plain or compressed CoNLL file in a single pass (see read_conll_lines)."""
+    with open_input(file_path) as f:
+        return read_conll_lines(f)
@@ -0,0 +1,112 @@
+"""The JSON lines protocol of coprocess.py, which parses requests read from stdin with models kept loaded.
+
+Each line of stdin is a request:
+    {"id": ..., "text": "..."} or {"id": ..., "lines": ["...", ...]}
+with the optional fields file_type (text, preprocessed_text, tokenized or tokenized_tagged; defaults to text),
+model and decoding (default to the options of coprocess.py). Each non-empty line of text is a sentence.
+Each request gets one line on stdout, in the order of the requests:
+    {"id": ..., "trees": [["1\\t...", ...], ...]}
+with the CoNLL-X lines of the tree of each sentence, or
+    {"id": ..., "error": "..."}
+if the request is invalid or one of its sentences fails. The id is any JSON value, returned as it was given.
+
+Requests are read and checked by a thread into a queue while the previous batch is parsed. Each batch takes all the
+requests waiting in the queue (up to a number of lines), so requests arriving together are parsed in
+a few large batches instead of one at a time, and a lone request is parsed as soon as it arrives.
+"""
+
+import json
+import queue
+from collections import defaultdict
+from typing import Dict, IO, List, Sequence, Tuple, Union
+
+FILE_TYPES = ['text', 'preprocessed_text', 'tokenized', 'tokenized_tagged']
+
+
+class RequestError(ValueError):
+    def __init__(self, message: str, request_id=None):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def parse_request(line: str, defaults: Dict[str, str], choices: Dict[str, Sequence[str]]) -> dict:
+    """Read and check a request line, filling in the default options.
+
+    Args:
+        line (str): a JSON request
+        defaults (Dict[str, str]): the default file_type, model and decoding
+        choices (Dict[str, Sequence[str]]): the values allowed for the model and decoding (e.g. the models loaded)
+
+    Raises:
+        RequestError: if the request is not valid
+
+    Returns:
+        dict: the request, with its non-empty lines in lines
+    """
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise RequestError(f'Invalid JSON: {error}')
+    if not isinstance(request, dict):
+        raise RequestError('A request should be a JSON object')
+    request = {**defaults, **request}
+    request_id = request.get('id')
+    if 'text' in request:
+        if not isinstance(request['text'], str):
+            raise RequestError('text should be a string', request_id)
+        lines = request['text'].split('\n')
+    elif 'lines' in request:
+        if not (isinstance(request['lines'], list) and all(isinstance(line, str) for line in request['lines'])):
+            raise RequestError('lines should be a list of strings', request_id)
+        lines = request['lines']
+    else:
+        raise RequestError('A request should have text or lines', request_id)
+    for option, values in {'file_type': FILE_TYPES, **choices}.items():
+        if request[option] not in values:
+            raise RequestError(f"Invalid {option} '{request[option]}', should be one of {', '.join(values)}", request_id)
+    request['lines'] = [line for line in lines if line.strip()]
+    return request
+
+def read_requests(stream: IO[str], request_queue: queue.Queue, defaults: Dict[str, str], choices: Dict[str, Sequence[str]]) -> None:
+    """Read the requests of stream into the queue, and None at the end of the stream (run in a thread).
+    Invalid requests are put in the queue as their RequestError."""
+    for line in stream:
+        if line.strip():
+            try:
+                request_queue.put(parse_request(line, defaults, choices))
+            except RequestError as error:
+                request_queue.put(error)
+    request_queue.put(None)
+
+def take_batch(request_queue: queue.Queue, max_lines: int) -> Tuple[List[Union[dict, RequestError]], bool]:
+    """Wait for a request, then take the requests already waiting, until the batch has max_lines lines.
+
+    Returns:
+        Tuple[List[Union[dict, RequestError]], bool]: the requests of the batch, and whether the input has ended
+    """
+    requests = []
+    line_count = 0
+    request = request_queue.get()
+    while request is not None:
+        requests.append(request)
+        line_count += len(request['lines']) if isinstance(request, dict) else 1
+        if line_count >= max_lines:
+            break
+        try:
+            request = request_queue.get_nowait()
+        except queue.Empty:
+            break
+    return requests, request is None
+
+def group_requests(requests: List[Union[dict, RequestError]]) -> Dict[Tuple[str, str, str], List[int]]:
+    """The positions of the valid requests, by the (file_type, model, decoding) they are parsed with."""
+    groups: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+    for position, request in enumerate(requests):
+        if not isinstance(request, RequestError):
+            groups[request['file_type'], request['model'], request['decoding']].append(position)
+    return groups
+
+def write_response(stream: IO[str], response: dict) -> None:
+    stream.write(json.dumps(response, ensure_ascii=False) + '\n')
+    # flushed at once, so the caller gets the response without waiting for the next one
+    stream.flush()
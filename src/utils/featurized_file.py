@@ -0,0 +1,61 @@
+"""Saving and loading featurized text: the token tuples built from disambiguated
+text before parsing (ID, FORM, LEMMA, UPOS, XPOS and FEATS).
+
+The file is gzipped JSON lines. The first line holds the format and the tagset,
+and every other line holds one sentence:
+    {"text": "...", "tokens": [[FORM, LEMMA, UPOS, XPOS, FEATS], ...]}
+
+Loading a featurized file skips cleaning, disambiguation and feature extraction,
+so the same corpus can be re-parsed with different parser models at the cost of parsing only.
+"""
+
+import gzip
+import json
+from typing import List, Tuple
+
+from src.utils.interning import intern_fields
+
+FEATURIZED_FORMAT = 'camel_parser_featurized'
+FEATURIZED_VERSION = 1
+
+
+def save_featurized(file_path, lines: List[str], text_tuples: List[List[tuple]], tagset: str) -> None:
+    """Save the featurized token tuples of each sentence, with the sentence text.
+
+    Args:
+        file_path: the output file
+        lines (List[str]): the input lines, used for the text comments of the trees
+        text_tuples (List[List[tuple]]): the featurized token tuples of each sentence
+        tagset (str): the tagset of the UPOS column (catib6 or ud)
+    """
+    if len(lines) != len(text_tuples):
+        # lines that were empty after cleaning have no tuples; fall back to the tokens as the text
+        lines = [' '.join(token_tuple[1] for token_tuple in sentence_tuples) for sentence_tuples in text_tuples]
+
+    with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'format': FEATURIZED_FORMAT, 'version': FEATURIZED_VERSION, 'tagset': tagset}) + '\n')
+        for line, sentence_tuples in zip(lines, text_tuples):
+            sentence = {'text': line.strip(), 'tokens': [list(token_tuple[1:6]) for token_tuple in sentence_tuples]}
+            f.write(json.dumps(sentence, ensure_ascii=False) + '\n')
+
+def load_featurized(file_path) -> Tuple[List[str], List[List[tuple]], str]:
+    """Load a featurized file saved by save_featurized.
+
+    Returns:
+        Tuple[List[str], List[List[tuple]], str]: the sentence texts, the token tuples of each sentence, and the tagset
+    """
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        assert header.get('format') == FEATURIZED_FORMAT, f'{file_path} is not a featurized file'
+        assert header.get('version') == FEATURIZED_VERSION, f"unsupported featurized file version {header.get('version')}"
+
+        lines = []
+        text_tuples = []
+        for line in f:
+            sentence = json.loads(line)
+            lines.append(sentence['text'])
+            text_tuples.append([
+                intern_fields((idx, *token_fields, '_', '_', '_', '_'))
+                for idx, token_fields in enumerate(sentence['tokens'], 1)
+            ])
+    return lines, text_tuples, header['tagset']
@@ -0,0 +1,69 @@
+"""Re-parsing a new version of a document, given the previous version and its CoNLL output.
+
+The new input is diffed by line against the previous input. The lines that are unchanged
+keep their previous tree (copied verbatim, comments included), and only the inserted or
+changed lines are disambiguated and parsed. The trees are then written in the order of the
+new input, so the output is the same as parsing the whole new input, at a cost that grows
+with the size of the edit rather than the size of the document.
+
+Each line is parsed on its own, so a line's tree does not depend on the lines around it.
+"""
+
+import difflib
+from typing import List, Tuple, Union
+
+from src.utils.compressed_io import open_input, read_lines
+from src.utils.conll_reader import split_conll_blocks
+
+TEXT_COMMENT = '# text = '
+
+
+def read_previous_version(input_path: str, output_path: str) -> Tuple[List[str], List[List[str]]]:
+    """Read the previous input and the trees it was parsed into, checking that they belong together.
+
+    Returns:
+        Tuple[List[str], List[List[str]]]: the non-empty lines of the input, and the lines of each tree
+    """
+    lines = read_lines(input_path)
+    with open_input(output_path) as f:
+        trees = split_conll_blocks(f)
+    assert len(lines) == len(trees), \
+        f'{output_path} has {len(trees)} trees, but {input_path} has {len(lines)} lines; was it parsed from another input?'
+    for i, (line, tree) in enumerate(zip(lines, trees)):
+        text_comments = [comment for comment in tree if comment.startswith(TEXT_COMMENT)]
+        assert not text_comments or text_comments[0][len(TEXT_COMMENT):] == line.strip(), \
+            f'Tree {i + 1} of {output_path} is not the parse of line {i + 1} of {input_path}'
+    return lines, trees
+
+def match_previous_trees(lines: List[str], previous_lines: List[str], previous_trees: List[List[str]]) -> List[Union[List[str], None]]:
+    """The previous tree of each unchanged line of the new input, and None for the inserted or changed lines.
+
+    Args:
+        lines (List[str]): the non-empty lines of the new input
+        previous_lines (List[str]): the non-empty lines of the previous input
+        previous_trees (List[List[str]]): the tree of each previous line
+
+    Returns:
+        List[Union[List[str], None]]: a tree or None for each line of the new input
+    """
+    # whitespace around a line does not change its parse
+    matcher = difflib.SequenceMatcher(None, [line.strip() for line in previous_lines], [line.strip() for line in lines], autojunk=False)
+    matched_trees: List[Union[List[str], None]] = [None] * len(lines)
+    for previous_start, start, size in matcher.get_matching_blocks():
+        matched_trees[start:start + size] = previous_trees[previous_start:previous_start + size]
+    return matched_trees
+
+def merge_trees(matched_trees: List[Union[List[str], None]], parsed_trees: List[List[str]]) -> List[str]:
+    """Fill the lines without a previous tree with the new trees, in order.
+
+    Returns:
+        List[str]: the CoNLL lines of the new output, with an empty line after each tree
+    """
+    assert matched_trees.count(None) == len(parsed_trees), \
+        f'{matched_trees.count(None)} lines were parsed again, but {len(parsed_trees)} trees were produced'
+    parsed_trees_iter = iter(parsed_trees)
+    string_lines = []
+    for tree in matched_trees:
+        string_lines.extend(tree if tree is not None else next(parsed_trees_iter))
+        string_lines.append('')
+    return string_lines
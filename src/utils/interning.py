@@ -0,0 +1,33 @@
+"""Sharing one string object between the repeated values of token tuples.
+
+Tags, lemmas, FEATS, relations and the '_' placeholders take few distinct values,
+but a new string is created for every token when they are split from a line,
+decoded from JSON or joined from features. Interning them keeps a single copy of
+each value however many tokens are held in memory.
+"""
+
+import sys
+from typing import Sequence
+
+# LEMMA, UPOS, XPOS, FEATS, HEAD, DEPREL, DEPS and MISC; ID and FORM are left out
+INTERNED_FIELDS = (2, 3, 4, 5, 6, 7, 8, 9)
+
+
+def intern_string(value):
+    return sys.intern(value) if type(value) is str else value
+
+def intern_fields(fields: Sequence, interned_fields: Sequence[int]=INTERNED_FIELDS) -> tuple:
+    """Intern the given fields of a token tuple.
+
+    Args:
+        fields (Sequence): the fields of a token
+        interned_fields (Sequence[int], optional): the indices of the fields to intern. Defaults to INTERNED_FIELDS.
+
+    Returns:
+        tuple: the token tuple
+    """
+    fields = list(fields)
+    for i in interned_fields:
+        if i < len(fields):
+            fields[i] = intern_string(fields[i])
+    return tuple(fields)
@@ -0,0 +1,122 @@
+"""Process memory measurements (Linux /proc, with a getrusage fallback elsewhere),
+and the memory used by each stage of the pipeline (see StageMemoryRecorder).
+"""
+
+import os
+import resource
+import sys
+import tracemalloc
+from typing import Dict, List
+
+from .stages import STAGES, add_stage_observer, remove_stage_observer
+
+
+def get_peak_rss_mb() -> float:
+    """The peak resident set size of this process, in MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    return max_rss / 2**20 if sys.platform == 'darwin' else max_rss / 2**10
+
+def get_memory_usage(pid: int=None) -> Dict[str, float]:
+    """The memory usage of a process, in MB.
+    rss: resident memory, including pages shared with other processes
+    pss: rss with every shared page divided by the number of processes sharing it
+    private: pages used only by this process, i.e. what the process adds on top of the shared pages
+
+    Args:
+        pid (int, optional): the process id. Defaults to the current process.
+
+    Returns:
+        Dict[str, float]: rss, pss and private memory (pss and private are None without /proc)
+    """
+    smaps_path = f"/proc/{pid or 'self'}/smaps_rollup"
+    if not os.path.exists(smaps_path):
+        return {'rss': get_peak_rss_mb(), 'pss': None, 'private': None}
+
+    usage_kb = {}
+    with open(smaps_path, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 3 and fields[2] == 'kB':
+                usage_kb[fields[0].rstrip(':')] = int(fields[1])
+    return {
+        'rss': usage_kb.get('Rss', 0) / 2**10,
+        'pss': usage_kb.get('Pss', 0) / 2**10,
+        'private': (usage_kb.get('Private_Clean', 0) + usage_kb.get('Private_Dirty', 0)) / 2**10,
+    }
+
+def get_rss_mb() -> float:
+    """The current resident set size of this process, in MB."""
+    statm_path = '/proc/self/statm'
+    if not os.path.exists(statm_path):
+        return get_peak_rss_mb()
+    with open(statm_path, 'r') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+class StageMemoryRecorder:
+    """A stage observer (see src/utils/stages.py) that records the memory used by each stage:
+        python peak: the most Python memory allocated at once during the stage, above what was allocated at its start (tracemalloc)
+        python kept: the Python memory still allocated at the end of the stage, i.e. what the stage passes on
+        rss delta: the change of the process RSS over the stage
+        peak rss: the peak RSS of the process at the end of the stage
+    Stages run several times (one per file or per sentence) are reported with the largest peak and delta.
+
+    tracemalloc slows Python code down noticeably, so the recorder is opt-in.
+    """
+    def __init__(self):
+        self.records: Dict[str, dict] = {}
+        # [name, python memory at start, python peak of the stage so far, rss at start]
+        self._open_stages: List[list] = []
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        add_stage_observer(self)
+
+    def stop(self) -> None:
+        remove_stage_observer(self)
+        tracemalloc.stop()
+
+    def _fold_peak(self) -> None:
+        # reset_peak is global, so the peak so far is saved in the enclosing stage before resetting it
+        if self._open_stages:
+            _, peak = tracemalloc.get_traced_memory()
+            self._open_stages[-1][2] = max(self._open_stages[-1][2], peak)
+
+    def start_stage(self, name: str) -> None:
+        self._fold_peak()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        self._open_stages.append([name, current, current, get_rss_mb()])
+
+    def end_stage(self, name: str) -> None:
+        self._fold_peak()
+        stage_name, start_python, peak_python, start_rss = self._open_stages.pop()
+        current, _ = tracemalloc.get_traced_memory()
+        if self._open_stages:
+            # the peak of an inner stage is also a peak of the enclosing stage
+            self._open_stages[-1][2] = max(self._open_stages[-1][2], peak_python)
+
+        record = self.records.setdefault(stage_name, {
+            'calls': 0, 'python peak': 0, 'python kept': 0, 'rss delta': 0, 'peak rss': 0
+        })
+        record['calls'] += 1
+        record['python peak'] = max(record['python peak'], (peak_python - start_python) / 2**20)
+        record['python kept'] = max(record['python kept'], (current - start_python) / 2**20)
+        record['rss delta'] = max(record['rss delta'], get_rss_mb() - start_rss)
+        record['peak rss'] = max(record['peak rss'], get_peak_rss_mb())
+
+    def report(self) -> str:
+        """A table of the memory used by each stage, in MB, in pipeline order."""
+        if not self.records:
+            return 'No stages recorded.'
+
+        columns = ['calls', 'python peak', 'python kept', 'rss delta', 'peak rss']
+        report_lines = ['stage\t' + '\t'.join(f'{column} MB' if column != 'calls' else column for column in columns)]
+        stage_names = [name for name in STAGES if name in self.records] + [name for name in self.records if name not in STAGES]
+        for name in stage_names:
+            record = self.records[name]
+            report_lines.append('\t'.join([name, str(record['calls'])] + [f'{record[column]:.1f}' for column in columns[1:]]))
+        return '\n'.join(report_lines)
@@ -0,0 +1,147 @@
+"""CPU profiles of the pipeline, grouped by stage.
+
+The StageProfiler is a stage observer (see src/utils/stages.py) that profiles the
+main thread in two ways at once:
+    deterministic: a cProfile profiler per stage, saved as pstats files
+        (<prefix>.pstats for the whole run, and <prefix>.<stage>.pstats for each stage)
+    sampling: the call stack of the main thread, sampled at a fixed interval and saved
+        as collapsed stacks (<prefix>.collapsed), one "frame;frame;... count" line per stack.
+        The root frame of each stack is the stage it was sampled in, so flame graphs
+        (e.g. flamegraph.pl or speedscope) show the time of each stage side by side.
+
+The pstats files can be read with python -m pstats or snakeviz.
+"""
+
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from .stages import STAGES, add_stage_observer, remove_stage_observer
+
+# the stage of the code that runs outside of any stage (loading models, reading files, ...)
+NO_STAGE = 'no_stage'
+SAMPLE_INTERVAL = 0.005
+
+
+def format_frame(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+def get_stack(frame) -> List[str]:
+    """The frames of a call stack, from the outermost to the innermost call."""
+    stack = []
+    while frame is not None:
+        stack.append(format_frame(frame))
+        frame = frame.f_back
+    return stack[::-1]
+
+
+class StageProfiler:
+    def __init__(self, interval: float=SAMPLE_INTERVAL):
+        """
+        Args:
+            interval (float, optional): the seconds between two samples of the call stack. Defaults to SAMPLE_INTERVAL.
+        """
+        self.interval = interval
+        self.profilers: Dict[str, cProfile.Profile] = {}
+        self.stack_counts: Counter = Counter()
+        self._stage_stack: List[str] = [NO_STAGE]
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def _switch_profiler(self, from_stage: str, to_stage: str) -> None:
+        # cProfile does not nest, so only the profiler of the innermost stage runs
+        self.profilers[from_stage].disable()
+        self.profilers.setdefault(to_stage, cProfile.Profile()).enable()
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self.profilers.setdefault(NO_STAGE, cProfile.Profile()).enable()
+        add_stage_observer(self)
+        self._sampler = threading.Thread(target=self._sample, name='stage-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._sampler.join()
+        remove_stage_observer(self)
+        self.profilers[self._stage_stack[-1]].disable()
+
+    def start_stage(self, name: str) -> None:
+        self._stage_stack.append(name)
+        self._switch_profiler(self._stage_stack[-2], name)
+
+    def end_stage(self, name: str) -> None:
+        self._stage_stack.pop()
+        self._switch_profiler(name, self._stage_stack[-1])
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stage = self._stage_stack[-1]
+            self.stack_counts[';'.join([stage] + get_stack(frame))] += 1
+
+    def write(self, prefix: str) -> List[str]:
+        """Write the pstats and collapsed stack files.
+
+        Returns:
+            List[str]: the paths of the files written
+        """
+        paths = []
+        profiled_stages = [name for name in [NO_STAGE] + STAGES if name in self.profilers]
+        profiled_stages += [name for name in self.profilers if name not in profiled_stages]
+
+        run_stats = None
+        for name in profiled_stages:
+            stage_stats = pstats.Stats(self.profilers[name])
+            stage_stats.dump_stats(f'{prefix}.{name}.pstats')
+            paths.append(f'{prefix}.{name}.pstats')
+            if run_stats is None:
+                run_stats = pstats.Stats(self.profilers[name])
+            else:
+                run_stats.add(self.profilers[name])
+        run_stats.dump_stats(f'{prefix}.pstats')
+        paths.insert(0, f'{prefix}.pstats')
+
+        with open(f'{prefix}.collapsed', 'w') as f:
+            for stack, count in sorted(self.stack_counts.items()):
+                f.write(f'{stack} {count}\n')
+        paths.append(f'{prefix}.collapsed')
+        return paths
+
+    def summary(self) -> str:
+        """The share of the samples taken in each stage."""
+        stage_counts = Counter()
+        for stack, count in self.stack_counts.items():
+            stage_counts[stack.split(';', 1)[0]] += count
+        total = sum(stage_counts.values())
+        if not total:
+            return 'No samples taken.'
+
+        summary_lines = ['stage\tsamples\tshare']
+        for name, count in stage_counts.most_common():
+            summary_lines.append(f'{name}\t{count}\t{100 * count / total:.1f}%')
+        return '\n'.join(summary_lines)
+
+def profile_until_exit(prefix: str) -> StageProfiler:
+    """Profile the rest of the run. At exit (even after an error), the profiles are written
+    to files starting with prefix, and the share of each stage is printed to stderr."""
+    profiler = StageProfiler()
+    profiler.start()
+
+    def write_profiles():
+        profiler.stop()
+        paths = profiler.write(prefix)
+        print(profiler.summary(), file=sys.stderr)
+        print(f"profiles saved to {', '.join(paths)}", file=sys.stderr)
+
+    atexit.register(write_profiles)
+    return profiler
@@ -0,0 +1,135 @@
+"""Setting aside the sentences that fail a stage of the pipeline, so the rest of the batch goes on.
+
+Without a quarantine, an error in any sentence (e.g. a clitic missing from the clitic table,
+or a word without analyses) aborts the whole batch. With a quarantine, each stage runs on the
+whole batch first. If it fails, the batch is split in halves that are run again, down to the
+sentences that fail on their own; these are written to the quarantine file with the stage and
+the error, and the other sentences go on to the next stage. A batch without errors costs the
+same as without a quarantine, and each failing sentence costs about log2(batch size) retries.
+
+The quarantine file is JSON lines, one failed sentence per line:
+    {"source": ..., "index": ..., "text": ..., "stage": ..., "error": ..., "location": ...}
+where index is the position of the sentence in the lines passed to parse_text (from 0).
+"""
+
+import json
+import os
+import traceback
+from collections import Counter
+from typing import Callable, List, Sequence, Tuple, Union
+
+
+def get_error_location(error: BaseException) -> str:
+    """The file and line where the error was raised."""
+    frames = traceback.extract_tb(error.__traceback__)
+    if not frames:
+        return ''
+    return f'{os.path.basename(frames[-1].filename)}:{frames[-1].lineno} ({frames[-1].name})'
+
+
+class Quarantine:
+    def __init__(self, file_path: Union[str, os.PathLike, None]=None):
+        """
+        Args:
+            file_path (Union[str, os.PathLike, None], optional): the quarantine file, written as sentences fail.
+                Defaults to None (the failures are only kept in records).
+        """
+        self.records: List[dict] = []
+        self.sentence_count = 0
+        # the sentences of the current batch that did not fail, as indices in its lines
+        self.sentence_indices: List[int] = []
+        self._texts: List[str] = []
+        self._first_index = 0
+        self._sources: List[Union[str, None]] = []
+        self._file = open(file_path, 'w') if file_path is not None else None
+
+    def start(self, texts: Sequence[str], first_index: int=0, source: Union[str, Sequence[str], None]=None) -> None:
+        """Start a batch.
+
+        Args:
+            texts (Sequence[str]): the input line of each sentence of the batch
+            first_index (int, optional): the index of the first sentence, when a file is parsed in several batches. Defaults to 0.
+            source (Union[str, Sequence[str], None], optional): the name of the input, e.g. its file name,
+                or the name of the input of each sentence when several inputs are parsed together. Defaults to None.
+        """
+        self.sentence_count += len(texts)
+        self.sentence_indices = list(range(first_index, first_index + len(texts)))
+        self._texts = [text.strip() for text in texts]
+        self._first_index = first_index
+        self._sources = [source] * len(texts) if source is None or isinstance(source, str) else list(source)
+
+    def keep(self, positions: Sequence[int]) -> None:
+        """Keep only the sentences at these positions of the current batch (e.g. dropping lines that are empty after cleaning)."""
+        self.sentence_indices = [self.sentence_indices[position] for position in positions]
+        self._texts = [self._texts[position] for position in positions]
+        self._sources = [self._sources[position] for position in positions]
+
+    def add(self, position: int, stage: str, error: BaseException) -> None:
+        record = {
+            'source': self._sources[position],
+            'index': self.sentence_indices[position],
+            'text': self._texts[position],
+            'stage': stage,
+            'error': f'{type(error).__name__}: {error}',
+            'location': get_error_location(error),
+        }
+        self.records.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # written at once, so the failures are kept even if the run is killed later
+            self._file.flush()
+
+    def _run_halves(self, stage: str, process_batch: Callable[[list], list], items: list, first_position: int) -> Tuple[list, List[int]]:
+        if not items:
+            return [], []
+        try:
+            return list(process_batch(items)), list(range(first_position, first_position + len(items)))
+        except Exception as error:
+            if len(items) == 1:
+                self.add(first_position, stage, error)
+                return [], []
+        middle = len(items) // 2
+        first_results, first_kept = self._run_halves(stage, process_batch, items[:middle], first_position)
+        second_results, second_kept = self._run_halves(stage, process_batch, items[middle:], first_position + middle)
+        return first_results + second_results, first_kept + second_kept
+
+    def run(self, stage: str, process_batch: Callable[[list], list], items: list) -> Tuple[list, List[int]]:
+        """Run a stage on the items of the current batch (one per sentence), quarantining the sentences that fail.
+
+        Args:
+            stage (str): the name of the stage (see src/utils/stages.py)
+            process_batch (Callable[[list], list]): processes a list of items, and returns one result per item
+            items (list): the items of the sentences of the batch that did not fail yet
+
+        Returns:
+            Tuple[list, List[int]]: the results of the sentences that did not fail, and their positions in items
+        """
+        results, kept = self._run_halves(stage, process_batch, list(items), 0)
+        if len(kept) < len(items):
+            self.keep(kept)
+        return results, kept
+
+    def filter_lines(self, lines: Sequence[str]) -> List[str]:
+        """The lines of the current batch (as passed to start) that did not fail."""
+        return [lines[index - self._first_index] for index in self.sentence_indices]
+
+    def summary(self) -> str:
+        stage_counts = Counter(record['stage'] for record in self.records)
+        by_stage = ', '.join(f'{stage}: {count}' for stage, count in stage_counts.most_common())
+        return (f'{len(self.records)} of {self.sentence_count} sentences quarantined'
+                + (f' ({by_stage})' if by_stage else ''))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def run_isolated(quarantine: Union[Quarantine, None], stage: str, process_batch: Callable[[list], list], items: list) -> Tuple[list, Union[List[int], None]]:
+    """process_batch(items), with the failing sentences set aside if there is a quarantine.
+
+    Returns:
+        Tuple[list, Union[List[int], None]]: the results, and the positions of the items kept (None without a quarantine)
+    """
+    if quarantine is None:
+        return process_batch(items), None
+    return quarantine.run(stage, process_batch, items)
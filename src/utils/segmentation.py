@@ -0,0 +1,134 @@
+"""Splitting of over-long lines into segments that are parsed separately,
+and stitching of the parsed segments back into one tree per line.
+
+The biaffine scorer is quadratic and projective decoding is cubic in
+sentence length, so a paragraph-long line dominates the run time and memory
+of its batch. Capping the segment length at max_length bounds both per line.
+
+Segments end after the last boundary punctuation that keeps them within
+max_length tokens. If a window has no boundary punctuation, the segment is
+cut at exactly max_length tokens.
+
+Attachment rule used when stitching:
+    the root of every segment after the first is attached to the root of the
+    first segment of the line. Its relation is replaced by MOD (CATiB), or by
+    parataxis when the parser produced UD trees (root relation 'root').
+    All other arcs are kept as parsed, with IDs and heads shifted by the
+    number of tokens in the preceding segments.
+"""
+
+from typing import List, Tuple
+
+BOUNDARY_PUNCTUATION = {'.', '!', '?', '؟', '،', ',', '؛', ';', ':', '...'}
+
+UD_ROOT_DEPREL = 'root'
+STITCH_DEPRELS = {'catib6': 'MOD', 'ud': 'parataxis'}
+
+
+def split_long_line(tokens: List[str], max_length: int) -> List[List[str]]:
+    """Split a token list into segments of at most max_length tokens,
+    preferring to split after boundary punctuation.
+
+    Args:
+        tokens (List[str]): tokens of a single line
+        max_length (int): the maximum number of tokens in a segment
+
+    Returns:
+        List[List[str]]: the segments, in order
+    """
+    assert max_length > 0, f'invalid maximum segment length, {max_length}'
+    segments = []
+    start = 0
+    while len(tokens) - start > max_length:
+        end = start + max_length
+        # the last boundary in the window, so segments are as long as possible
+        for i in range(end - 1, start, -1):
+            if tokens[i] in BOUNDARY_PUNCTUATION:
+                end = i + 1
+                break
+        segments.append(tokens[start:end])
+        start = end
+    segments.append(tokens[start:])
+    return segments
+
+def segment_lines(lines: List[list], max_length: int, get_token=lambda token: token) -> Tuple[List[list], List[int]]:
+    """Split every line longer than max_length into segments.
+
+    Args:
+        lines (List[list]): lines of tokens (or of token tuples, see get_token)
+        max_length (int): the maximum number of tokens in a segment
+        get_token (callable): returns the token string of a line item
+
+    Returns:
+        Tuple[List[list], List[int]]: the flat list of segments,
+            and the number of segments each line was split into
+    """
+    segments = []
+    segment_counts = []
+    for line in lines:
+        if len(line) <= max_length:
+            line_segments = [line]
+        else:
+            forms = [get_token(item) for item in line]
+            line_segments = []
+            start = 0
+            for form_segment in split_long_line(forms, max_length):
+                line_segments.append(line[start:start + len(form_segment)])
+                start += len(form_segment)
+        segments.extend(line_segments)
+        segment_counts.append(len(line_segments))
+    return segments, segment_counts
+
+def segment_sentence_tuples(sentence_tuples: List[List[tuple]], max_length: int) -> Tuple[List[List[tuple]], List[int]]:
+    """Split sentences of token tuples (ID, FORM, ...) into segments and
+    renumber the IDs of every segment from 1."""
+    segments, segment_counts = segment_lines(sentence_tuples, max_length, get_token=lambda token_tuple: token_tuple[1])
+    segments = [
+        [(i, *token_tuple[1:]) for i, token_tuple in enumerate(segment, 1)]
+        for segment in segments
+    ]
+    return segments, segment_counts
+
+def get_stitch_deprel(root_deprel: str) -> str:
+    if root_deprel == UD_ROOT_DEPREL:
+        return STITCH_DEPRELS['ud']
+    return STITCH_DEPRELS['catib6']
+
+def stitch_segments(segments: List[List[tuple]], segment_counts: List[int]) -> List[List[tuple]]:
+    """Join segments back into one sentence per line, following the
+    attachment rule described at the top of this module.
+    Unparsed segments (HEAD is '_') are only concatenated and renumbered.
+
+    Args:
+        segments (List[List[tuple]]): segments of token tuples, in order
+        segment_counts (List[int]): the number of segments of each line
+
+    Returns:
+        List[List[tuple]]: one list of token tuples per line
+    """
+    sentences = []
+    segment_idx = 0
+    for segment_count in segment_counts:
+        line_segments = segments[segment_idx:segment_idx + segment_count]
+        segment_idx += segment_count
+        if segment_count == 1:
+            sentences.append(line_segments[0])
+            continue
+
+        sentence = []
+        line_root = None
+        for segment in line_segments:
+            offset = len(sentence)
+            for token_tuple in segment:
+                token_id, form, lemma, upos, xpos, feats, head, deprel = token_tuple[:8]
+                if head != '_':
+                    head = int(head)
+                    if head != 0:
+                        head += offset
+                    elif line_root is None:
+                        line_root = int(token_id) + offset
+                    else:
+                        head, deprel = line_root, get_stitch_deprel(deprel)
+                sentence.append((int(token_id) + offset, form, lemma, upos, xpos, feats, head, deprel, *token_tuple[8:]))
+        sentences.append(sentence)
+    return sentences
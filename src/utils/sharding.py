@@ -0,0 +1,162 @@
+"""Splitting one input file into shards that are parsed separately (e.g. on several machines),
+and merging the parsed shards back in order.
+
+An offset index holds the byte offset of every record of the input file (a non-empty
+line for text inputs, a tree for CoNLL inputs), followed by the size of the file.
+It is saved next to the input (input.txt.lines.idx.npy or input.conllx.trees.idx.npy)
+and memory-mapped when loaded, so a shard only reads the index entries it needs and
+its own byte range of the input.
+
+Shard i of N covers the records starting in the i-th Nth of the file's bytes.
+Its output starts with a header comment:
+    # shard = i/N bytes=start-end of size trees=count
+which the merge uses to check that every shard is present, that the byte ranges
+cover the whole input, and that no shard output was truncated.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from src.utils.compressed_io import open_input, open_output
+
+INDEX_SUFFIXES = {'lines': '.lines.idx.npy', 'trees': '.trees.idx.npy'}
+SHARD_HEADER = re.compile(r'^# shard = (\d+)/(\d+) bytes=(\d+)-(\d+) of (\d+) trees=(\d+)$')
+
+
+def get_record_kind(file_type: str) -> str:
+    return 'trees' if file_type == 'conll' else 'lines'
+
+def get_index_path(input_path: Union[str, Path], record_kind: str) -> Path:
+    return Path(f'{input_path}{INDEX_SUFFIXES[record_kind]}')
+
+def build_offset_index(input_path: Union[str, Path], record_kind: str) -> np.ndarray:
+    """The start offset of every record of the file, followed by the file size.
+
+    Args:
+        input_path (Union[str, Path]): the input file
+        record_kind (str): lines (non-empty lines) or trees (blocks of lines separated by empty lines)
+
+    Returns:
+        np.ndarray: the int64 offsets
+    """
+    offsets = []
+    offset = 0
+    in_tree = False
+    with open(input_path, 'rb') as f:
+        for line in f:
+            is_empty = not line.strip()
+            if record_kind == 'lines' and not is_empty:
+                offsets.append(offset)
+            elif record_kind == 'trees':
+                if not is_empty and not in_tree:
+                    offsets.append(offset)
+                in_tree = not is_empty
+            offset += len(line)
+    offsets.append(offset)
+    return np.array(offsets, dtype=np.int64)
+
+def save_offset_index(input_path: Union[str, Path], record_kind: str) -> Path:
+    index_path = get_index_path(input_path, record_kind)
+    # written to a temporary file first, so a shard never maps a partial index
+    temp_path = f'{index_path}.{os.getpid()}.tmp.npy'
+    np.save(temp_path, build_offset_index(input_path, record_kind))
+    os.replace(temp_path, index_path)
+    return index_path
+
+def load_offset_index(input_path: Union[str, Path], record_kind: str) -> np.ndarray:
+    """Memory-map the offset index of the file, building it first if it is missing or out of date."""
+    index_path = get_index_path(input_path, record_kind)
+    if not index_path.exists() or os.path.getmtime(index_path) < os.path.getmtime(input_path):
+        save_offset_index(input_path, record_kind)
+    offsets = np.load(index_path, mmap_mode='r')
+    if offsets[-1] != os.path.getsize(input_path):
+        save_offset_index(input_path, record_kind)
+        offsets = np.load(index_path, mmap_mode='r')
+    return offsets
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parse 'i/N' (shard i of N, counted from 0)."""
+    match = re.fullmatch(r'(\d+)/(\d+)', shard.strip())
+    assert match, f"Invalid shard '{shard}', should be i/N (e.g. 0/4)"
+    shard_idx, shard_count = int(match.group(1)), int(match.group(2))
+    assert 0 <= shard_idx < shard_count, f'Invalid shard {shard}, i should be between 0 and {shard_count - 1}'
+    return shard_idx, shard_count
+
+def get_shard_range(offsets: np.ndarray, shard_idx: int, shard_count: int) -> Tuple[int, int]:
+    """The byte range of the shard: the records that start in its share of the file's bytes.
+
+    Returns:
+        Tuple[int, int]: the start and end offsets (the end is the start of the next shard)
+    """
+    record_offsets, file_size = offsets[:-1], int(offsets[-1])
+    def get_boundary(idx):
+        if idx == shard_count:
+            return file_size
+        record_idx = int(np.searchsorted(record_offsets, file_size * idx // shard_count, side='left'))
+        return int(record_offsets[record_idx]) if record_idx < len(record_offsets) else file_size
+    # the first shard also covers any leading empty lines
+    start = 0 if shard_idx == 0 else get_boundary(shard_idx)
+    return start, get_boundary(shard_idx + 1)
+
+def read_shard_lines(input_path: Union[str, Path], start: int, end: int) -> List[str]:
+    """The lines of the byte range of the file, without reading the rest of it."""
+    with open(input_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return data.decode('utf-8').splitlines(keepends=True)
+
+def format_shard_header(shard_idx: int, shard_count: int, start: int, end: int, file_size: int, tree_count: int) -> str:
+    return f'# shard = {shard_idx}/{shard_count} bytes={start}-{end} of {file_size} trees={tree_count}'
+
+def merge_shards(shard_paths: List[Union[str, Path]], output_path: Union[str, Path]) -> int:
+    """Check that the shard outputs are complete, and write them in order, without their headers.
+    Shard outputs and the merged output may be compressed (see src/utils/compressed_io.py).
+
+    Returns:
+        int: the number of trees written
+    """
+    shards = []
+    for shard_path in shard_paths:
+        with open_input(shard_path) as f:
+            header = f.readline().rstrip('\n')
+        match = SHARD_HEADER.match(header)
+        assert match, f'{shard_path} does not start with a shard header'
+        shards.append((tuple(int(value) for value in match.groups()), shard_path))
+    shards.sort()
+
+    shard_count, file_size = shards[0][0][1], shards[0][0][4]
+    assert all(header[1] == shard_count and header[4] == file_size for header, _ in shards), \
+        'The shards were not made from the same input, or with the same number of shards'
+    found = [header[0] for header, _ in shards]
+    assert found == list(range(shard_count)), \
+        f'Missing or duplicate shards: expected 0 to {shard_count - 1}, found {", ".join(map(str, found))}'
+    expected_start = 0
+    for (shard_idx, _, start, end, _, _), _ in shards:
+        assert start == expected_start, f'Shard {shard_idx} starts at byte {start}, expected {expected_start}'
+        expected_start = end
+    assert expected_start == file_size, f'The shards end at byte {expected_start}, the input has {file_size} bytes'
+
+    tree_count = 0
+    # written to a temporary file first, so an incomplete merge never looks finished
+    # with the extension of the output, so it is compressed the same way
+    output_base, output_extension = os.path.splitext(str(output_path))
+    temp_path = f'{output_base}.{os.getpid()}.tmp{output_extension}'
+    with open_output(temp_path) as output_file:
+        for (shard_idx, _, _, _, _, shard_trees), shard_path in shards:
+            trees = 0
+            in_tree = False
+            with open_input(shard_path) as f:
+                f.readline()
+                for line in f:
+                    is_empty = not line.strip()
+                    trees += not is_empty and not in_tree
+                    in_tree = not is_empty
+                    output_file.write(line)
+            assert trees == shard_trees, f'Shard {shard_idx} ({shard_path}) has {trees} trees, its header says {shard_trees}'
+            tree_count += trees
+    os.replace(temp_path, output_path)
+    return tree_count
@@ -0,0 +1,42 @@
+"""Named stages of the pipeline (cleaning, disambiguation, parsing, ...).
+
+parse_text marks its stages with the stage context manager. Tools that measure
+the pipeline (tracing, memory and profiling) register as stage observers, and
+are told when each stage starts and ends. When no observer is registered,
+marking a stage costs next to nothing.
+
+An observer is any object with start_stage(name) and end_stage(name) methods.
+"""
+
+import contextlib
+from typing import List
+
+CLEANING = 'cleaning'
+DISAMBIGUATION = 'disambiguation'
+ANALYSIS_SELECTION = 'analysis_selection'
+FEATURE_EXTRACTION = 'feature_extraction'
+PARSING = 'parsing'
+FEATS_MERGE = 'feats_merge'
+OUTPUT = 'output'
+
+STAGES = [CLEANING, DISAMBIGUATION, ANALYSIS_SELECTION, FEATURE_EXTRACTION, PARSING, FEATS_MERGE, OUTPUT]
+
+_stage_observers: List[object] = []
+
+
+def add_stage_observer(observer) -> None:
+    _stage_observers.append(observer)
+
+def remove_stage_observer(observer) -> None:
+    _stage_observers.remove(observer)
+
+@contextlib.contextmanager
+def stage(name: str):
+    observers = list(_stage_observers)
+    for observer in observers:
+        observer.start_stage(name)
+    try:
+        yield
+    finally:
+        for observer in reversed(observers):
+            observer.end_stage(name)
@@ -0,0 +1,143 @@
+"""A cache of the subword pieces of words, shared by the BERT disambiguator and the parsers.
+
+In text mode every word goes through a WordPiece tokenizer at least twice: once in the
+BERT disambiguator, and once in the BERT encoder of the parser, again for every occurrence
+of the word. With a subword cache, each tokenizer looks words up in a bounded LRU cache of
+their pieces first, across batches and files. Tokenizers with the same vocabulary and
+settings share one cache, so a word tokenized by the disambiguator is not tokenized again
+by the parser.
+
+The pieces are cached rather than their ids: the disambiguator and the parser both ask
+their tokenizer for pieces, and map them to ids themselves with a dictionary lookup.
+"""
+
+import functools
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List
+
+# the tokenizer settings that change the pieces of a word, besides the vocabulary
+TOKENIZER_SETTINGS = ['do_lower_case', 'strip_accents', 'tokenize_chinese_chars', 'do_basic_tokenize']
+DEFAULT_CACHE_SIZE = 2**18
+
+
+class SubwordCache:
+    def __init__(self, max_size: int=DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            max_size (int, optional): the number of words kept; the least recently used word is dropped first.
+                Defaults to DEFAULT_CACHE_SIZE.
+        """
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # the time spent tokenizing the words that were not cached
+        self.miss_time = 0.0
+        self.users: List[str] = []
+
+    def tokenize(self, tokenize: Callable[[str], List[str]], word: str) -> List[str]:
+        pieces = self.entries.get(word)
+        if pieces is not None:
+            self.entries.move_to_end(word)
+            self.hits += 1
+            # a new list, so callers can change it without changing the cache
+            return list(pieces)
+
+        start_time = time.perf_counter()
+        pieces = tokenize(word)
+        self.miss_time += time.perf_counter() - start_time
+        self.misses += 1
+        self.entries[word] = tuple(pieces)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return pieces
+
+    def wrap(self, tokenize: Callable[[str], List[str]]) -> Callable[[str], List[str]]:
+        cached_tokenize = functools.partial(self.tokenize, tokenize)
+        cached_tokenize.subword_cache = self
+        return cached_tokenize
+
+    def get_time_saved(self) -> float:
+        """The time the hits would have taken to tokenize, at the mean tokenization time of the misses."""
+        return self.hits * self.miss_time / self.misses if self.misses else 0.0
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0.0
+        return (f"subword cache ({', '.join(self.users)}): {lookups} lookups, {hit_rate:.1f}% hits, "
+                f"{len(self.entries)} words cached, {self.miss_time:.2f}s tokenizing, ~{self.get_time_saved():.2f}s saved")
+
+# by vocabulary fingerprint
+_subword_caches: Dict[str, SubwordCache] = {}
+
+
+def get_vocab_fingerprint(tokenizer) -> str:
+    """A digest of the vocabulary and settings of a tokenizer. Two tokenizers with the same fingerprint
+    give the same pieces for every word (the fast and slow versions of a tokenizer are not told apart)."""
+    digest = hashlib.sha1(re.sub(r'Fast$', '', type(tokenizer).__name__).encode('utf-8'))
+    for setting in TOKENIZER_SETTINGS:
+        digest.update(f'{setting}={getattr(tokenizer, setting, None)}\n'.encode('utf-8'))
+    for piece, piece_id in sorted(tokenizer.get_vocab().items(), key=lambda item: item[1]):
+        digest.update(f'{piece_id}\t{piece}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+def cache_tokenize(owner, tokenizer, user: str, max_size: int=DEFAULT_CACHE_SIZE) -> SubwordCache:
+    """Make owner.tokenize (a tokenizer, or a field holding its tokenize method) go through
+    the subword cache of the tokenizer's vocabulary.
+
+    Args:
+        owner: the object whose tokenize attribute is replaced
+        tokenizer: the tokenizer, used for its vocabulary
+        user (str): the name of the model using the tokenizer, for the report
+        max_size (int, optional): the size of the cache, if it is created. Defaults to DEFAULT_CACHE_SIZE.
+
+    Returns:
+        SubwordCache: the cache
+    """
+    existing_cache = getattr(owner.tokenize, 'subword_cache', None)
+    if existing_cache is not None:
+        return existing_cache
+    cache = _subword_caches.setdefault(get_vocab_fingerprint(tokenizer), SubwordCache(max_size))
+    owner.tokenize = cache.wrap(owner.tokenize)
+    cache.users.append(user)
+    return cache
+
+def get_disambiguator_tokenizer(disambiguator):
+    """The WordPiece tokenizer of a BERT disambiguator, or None for other disambiguators.
+    camel_tools' BERTUnfactoredDisambiguator keeps it on its BERT tagger, which tokenizes every word with it."""
+    # adapters (e.g. MLEDisambiguatorAdapter) hold the camel_tools disambiguator
+    disambiguator = getattr(disambiguator, 'disambiguator', disambiguator)
+    model = getattr(disambiguator, '_model', None)
+    tagger = model.get('unfactored') if isinstance(model, dict) else None
+    return getattr(tagger, '_tokenizer', None)
+
+def cache_subwords(disambiguator, parsers: Dict[str, object], max_size: int=DEFAULT_CACHE_SIZE) -> List[SubwordCache]:
+    """Cache the subwords of the BERT disambiguator (if disambiguator is one) and of the BERT fields of the parsers.
+
+    Args:
+        disambiguator: the disambiguator (or disambiguator name) used
+        parsers (Dict[str, object]): the loaded supar parsers, by name
+        max_size (int, optional): the size of each cache. Defaults to DEFAULT_CACHE_SIZE.
+
+    Returns:
+        List[SubwordCache]: the caches in use, one per vocabulary
+    """
+    caches = []
+    tokenizer = get_disambiguator_tokenizer(disambiguator)
+    if tokenizer is not None:
+        caches.append(cache_tokenize(tokenizer, tokenizer, 'disambiguator', max_size))
+    for name, parser in parsers.items():
+        for field in parser.transform.flattened_fields:
+            # the subword fields of BERT encoders tokenize with the bound method of a transformers tokenizer
+            tokenize = getattr(field, 'tokenize', None)
+            if getattr(tokenize, 'subword_cache', None) is not None:
+                caches.append(tokenize.subword_cache)
+            elif hasattr(getattr(tokenize, '__self__', None), 'get_vocab'):
+                caches.append(cache_tokenize(field, tokenize.__self__, f'{name} parser', max_size))
+    return list({id(cache): cache for cache in caches}.values())
+
+def format_cache_reports(caches: Iterable[SubwordCache]) -> str:
+    return '\n'.join(cache.report() for cache in caches) or 'No subword tokenizer to cache.'
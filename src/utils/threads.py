@@ -0,0 +1,71 @@
+"""CPU thread settings of torch (BERT disambiguation and parsing).
+
+By default torch uses one intra-op thread per core in every process, so several
+processes (or forked workers) on one machine oversubscribe the CPU. The thread
+counts can be set on every entry point, or measured once on a machine with
+autotune_threads.py, which saves the fastest configuration to models/thread_config.json.
+Later runs on the same machine use the saved configuration unless told otherwise.
+"""
+
+import json
+import os
+import platform
+from pathlib import Path
+from typing import Dict, Union
+
+import torch
+
+THREAD_CONFIG_PATH = Path(__file__).parents[2] / 'models/thread_config.json'
+
+
+def get_machine() -> Dict[str, Union[str, int]]:
+    """What a thread configuration depends on; a configuration measured on another machine is ignored."""
+    return {'cpu_count': os.cpu_count(), 'processor': platform.machine()}
+
+def save_thread_config(config: dict, config_path: Union[str, Path]=THREAD_CONFIG_PATH) -> None:
+    os.makedirs(Path(config_path).parent, exist_ok=True)
+    with open(config_path, 'w') as f:
+        json.dump({**config, 'machine': get_machine()}, f, indent=2)
+
+def load_thread_config(config_path: Union[str, Path]=THREAD_CONFIG_PATH) -> dict:
+    """The saved thread configuration (threads, interop_threads and workers), if it was measured on this machine."""
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    if config.get('machine') != get_machine():
+        return {}
+    return config
+
+def configure_threads(threads: Union[int, None]=None, interop_threads: Union[int, None]=None,
+                      workers: int=1, config_path: Union[str, Path]=THREAD_CONFIG_PATH) -> Dict[str, int]:
+    """Set the torch thread counts of this process (inherited by forked workers).
+    Counts that are not given come from the saved configuration. Without one, the
+    intra-op threads are split evenly between the workers, and torch's defaults are
+    kept for a single process.
+
+    Should be called before the models are loaded; the inter-op thread count can
+    only be set before torch runs its first parallel operation.
+
+    Args:
+        threads (Union[int, None], optional): intra-op threads per process. Defaults to None.
+        interop_threads (Union[int, None], optional): inter-op threads per process. Defaults to None.
+        workers (int, optional): the number of worker processes sharing the machine. Defaults to 1.
+        config_path (Union[str, Path], optional): the saved configuration. Defaults to THREAD_CONFIG_PATH.
+
+    Returns:
+        Dict[str, int]: the thread counts in use
+    """
+    config = load_thread_config(config_path)
+    if threads is None and config.get('workers') == workers:
+        threads = config.get('threads')
+    if interop_threads is None and config.get('workers') == workers:
+        interop_threads = config.get('interop_threads')
+    if threads is None and workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+    if threads is not None:
+        torch.set_num_threads(threads)
+    if interop_threads is not None and interop_threads != torch.get_num_interop_threads():
+        torch.set_num_interop_threads(interop_threads)
+    return {'threads': torch.get_num_threads(), 'interop_threads': torch.get_num_interop_threads()}
@@ -0,0 +1,96 @@
+"""Per-sentence latency tracing, and stage times of whole runs.
+
+The SentenceTracer is a stage observer (see src/utils/stages.py) that records the
+time each sentence spends in each stage. For the times to be attributable,
+sentences have to be processed one at a time, which is slower than batch mode.
+The StageTimer only totals the time spent in each stage, so it can observe batch runs.
+"""
+
+import json
+import math
+import time
+from typing import Dict, List, Sequence
+
+from .stages import STAGES
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def get_length_bucket(length: int, bounds: Sequence[int]) -> str:
+    lower = 1
+    for bound in bounds:
+        if length <= bound:
+            return f'{lower}-{bound}'
+        lower = bound + 1
+    return f'{lower}+'
+
+
+class SentenceTracer:
+    def __init__(self):
+        self.records: List[dict] = []
+        self._sentence = None
+        self._stage_starts: Dict[str, float] = {}
+
+    def start_sentence(self, text: str) -> None:
+        self._sentence = {'index': len(self.records), 'text': text.strip(), 'tokens': 0, 'stages': {}}
+
+    def end_sentence(self, token_count: int) -> None:
+        self._sentence['tokens'] = token_count
+        self._sentence['total'] = sum(self._sentence['stages'].values())
+        self.records.append(self._sentence)
+        self._sentence = None
+
+    def start_stage(self, name: str) -> None:
+        self._stage_starts[name] = time.perf_counter()
+
+    def end_stage(self, name: str) -> None:
+        if self._sentence is None:
+            return
+        elapsed = time.perf_counter() - self._stage_starts.pop(name)
+        self._sentence['stages'][name] = self._sentence['stages'].get(name, 0) + elapsed
+
+    def write(self, trace_path) -> None:
+        """Write one JSON line per sentence: index, text, token count, and seconds per stage."""
+        with open(trace_path, 'w') as f:
+            for record in self.records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def summary(self, slowest: int=10, bounds: Sequence[int]=(10, 20, 40, 80, 160)) -> str:
+        """Latency percentiles (ms) per length bucket (in tokens), and the slowest sentences."""
+        if not self.records:
+            return 'No sentences traced.'
+
+        buckets: Dict[str, List[float]] = {}
+        for record in sorted(self.records, key=lambda record: record['tokens']):
+            buckets.setdefault(get_length_bucket(record['tokens'], bounds), []).append(1000 * record['total'])
+
+        summary_lines = ['tokens\tsentences\tp50 ms\tp90 ms\tp99 ms\tmax ms']
+        for bucket_name, latencies in buckets.items():
+            latencies.sort()
+            percentiles = [percentile(latencies, q) for q in (50, 90, 99)] + [latencies[-1]]
+            summary_lines.append('\t'.join([bucket_name, str(len(latencies))] + [f'{value:.1f}' for value in percentiles]))
+
+        summary_lines.extend(['', f'{slowest} slowest sentences:'])
+        for record in sorted(self.records, key=lambda record: record['total'], reverse=True)[:slowest]:
+            stage_times = ', '.join(
+                f"{name} {1000 * record['stages'][name]:.1f}" for name in STAGES if name in record['stages']
+            )
+            summary_lines.append(f"#{record['index']}\t{record['tokens']} tokens\t{1000 * record['total']:.1f} ms ({stage_times})")
+            summary_lines.append(f"\t{record['text']}")
+        return '\n'.join(summary_lines)
+
+
+class StageTimer:
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._stage_starts: Dict[str, float] = {}
+
+    def start_stage(self, name: str) -> None:
+        self._stage_starts[name] = time.perf_counter()
+
+    def end_stage(self, name: str) -> None:
+        elapsed = time.perf_counter() - self._stage_starts.pop(name)
+        self.totals[name] = self.totals.get(name, 0) + elapsed
@@ -0,0 +1,144 @@
+"""Watching a directory for new text files, for the watch_folder.py daemon.
+
+The directory is polled rather than watched with inotify, so it works the same on every platform
+and on network file systems, without another dependency; listing a directory of a few thousand
+files takes about a millisecond. A file is ready when its size and modification time have not
+changed between two polls, so files that are still being copied are not read half-written.
+
+The ready files are parsed together in batches (see group_batches), so many small files are
+disambiguated and parsed in a few large batches, and the trees are split back into one output
+per file (see split_batch). Outputs are written to a temporary file that is then renamed
+(see write_atomic), so a reader of the output directory never sees a partial file.
+"""
+
+import bisect
+import itertools
+import os
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+from src.conll_output import save_to_file
+
+
+class FolderWatcher:
+    def __init__(self, input_dir: Union[str, os.PathLike]):
+        """Polls the files directly in input_dir (subdirectories and hidden files are ignored).
+
+        Args:
+            input_dir (Union[str, os.PathLike]): the directory watched
+        """
+        self.input_dir = Path(input_dir)
+        # the size and modification time of each file at the previous poll
+        self._last_seen: Dict[str, Tuple[int, int]] = {}
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        seen = {}
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # removed since it was listed
+                    continue
+                seen[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return seen
+
+    def poll(self) -> List[str]:
+        """The names of the files that have not changed since the previous poll, sorted.
+
+        A ready file is returned by every poll until it is moved out of the directory."""
+        seen = self._scan()
+        ready = sorted(name for name, stat in seen.items() if self._last_seen.get(name) == stat)
+        self._last_seen = seen
+        return ready
+
+    def has_files(self) -> bool:
+        """Whether there were files in the directory at the previous poll."""
+        return bool(self._last_seen)
+
+def group_batches(line_counts: Sequence[int], batch_lines: int) -> List[List[int]]:
+    """Group files into batches of about batch_lines lines, in order.
+    A batch is closed once it has batch_lines lines or more; files are never split between batches.
+
+    Args:
+        line_counts (Sequence[int]): the number of lines of each file
+        batch_lines (int): the number of lines a batch is filled to
+
+    Returns:
+        List[List[int]]: the positions in line_counts of the files of each batch
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_line_count = 0
+    for position, line_count in enumerate(line_counts):
+        batch.append(position)
+        batch_line_count += line_count
+        if batch_line_count >= batch_lines:
+            batches.append(batch)
+            batch, batch_line_count = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+def split_batch(sentence_indices: Sequence[int], line_counts: Sequence[int]) -> List[List[int]]:
+    """Split the sentences parsed from a batch between its files.
+
+    Args:
+        sentence_indices (Sequence[int]): the index in the lines of the batch of each sentence parsed (sorted);
+            sentences that failed or were empty have no index
+        line_counts (Sequence[int]): the number of lines of each file of the batch, in order
+
+    Returns:
+        List[List[int]]: the positions in sentence_indices of the sentences of each file
+    """
+    file_starts = list(itertools.accumulate(line_counts, initial=0))
+    positions_by_file: List[List[int]] = [[] for _ in line_counts]
+    for position, index in enumerate(sentence_indices):
+        # the last file starting at or before the sentence (empty files start where the next file starts)
+        positions_by_file[bisect.bisect_right(file_starts, index) - 1].append(position)
+    return positions_by_file
+
+def get_output_path(output_dir: Union[str, os.PathLike], base_name: str, suffix: str) -> Path:
+    """The path of a new output in output_dir: [base_name][suffix], or [base_name].1[suffix], ... if an
+    output of that name is already there (e.g. the output of a.txt for a.conllx, or of an earlier a.txt).
+
+    Returns:
+        Path: a path that does not exist yet
+    """
+    output_dir = Path(output_dir)
+    output_path = output_dir / f'{base_name}{suffix}'
+    for i in itertools.count(1):
+        if not output_path.exists():
+            break
+        output_path = output_dir / f'{base_name}.{i}{suffix}'
+    return output_path
+
+def write_atomic(string_lines: List[str], file_path: Union[str, os.PathLike]) -> None:
+    """Write the lines to a hidden temporary file next to file_path, then rename it to file_path.
+    Compressed if the file name ends with a compression extension (see src/utils/compressed_io.py)."""
+    file_path = Path(file_path)
+    temporary_path = file_path.with_name(f'.{file_path.name}')
+    try:
+        save_to_file(string_lines, temporary_path)
+        os.replace(temporary_path, file_path)
+    finally:
+        if temporary_path.exists():
+            temporary_path.unlink()
+
+def move_aside(file_path: Union[str, os.PathLike], directory: Union[str, os.PathLike]) -> Path:
+    """Move a file into directory, adding a number to its name if a file of that name is already there.
+
+    Returns:
+        Path: the new path of the file
+    """
+    file_path, directory = Path(file_path), Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    new_path = directory / file_path.name
+    for i in itertools.count(1):
+        if not new_path.exists():
+            break
+        new_path = directory / f'{file_path.name}.{i}'
+    os.replace(file_path, new_path)
+    return new_path
@@ -0,0 +1,73 @@
+"""Running tasks in worker processes that share the models loaded by the parent.
+
+Workers are forked after the models are loaded, so the model weights and the
+morphology database are shared copy-on-write instead of being loaded once per
+worker. Tensor storage is never written during inference, so its pages stay
+shared. The objects that exist at fork time are moved out of the garbage
+collector's reach (gc.freeze), so collections in the workers do not write to
+their headers and copy the pages that hold them.
+"""
+
+import gc
+import multiprocessing
+import os
+from typing import Callable, Dict, Iterable, List
+
+from .memory import get_memory_usage
+
+# set before forking, inherited by the workers (functions run in workers are not pickled)
+_worker_task: Dict[str, Callable] = {}
+
+
+def _run_task(task_args: tuple):
+    result = _worker_task['function'](*task_args)
+    return os.getpid(), result, get_memory_usage()
+
+def run_forked_workers(function: Callable, tasks: Iterable[tuple], workers: int):
+    """Run function(*task_args) for every task in forked worker processes.
+    Only available where processes can be forked (Linux, macOS).
+
+    Args:
+        function (Callable): the task function; it can use anything loaded in the parent
+        tasks (Iterable[tuple]): the arguments of every task
+        workers (int): the number of worker processes
+
+    Returns:
+        Tuple[List, Dict[int, Dict[str, float]]]: the results of the tasks (in completion order),
+            and the last memory usage reported by each worker, by pid
+    """
+    _worker_task['function'] = function
+    gc.collect()
+    gc.freeze()
+
+    results: List = []
+    memory_by_worker: Dict[int, Dict[str, float]] = {}
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for pid, result, memory_usage in pool.imap_unordered(_run_task, tasks):
+                results.append(result)
+                memory_by_worker[pid] = memory_usage
+    finally:
+        gc.unfreeze()
+        _worker_task.clear()
+    return results, memory_by_worker
+
+def format_memory_report(parent_usage: Dict[str, float], memory_by_worker: Dict[int, Dict[str, float]]) -> str:
+    """A table of the memory used by the parent (after loading the models) and by every worker.
+    The private column of a worker is its incremental cost: the memory it does not share with the others.
+    """
+    def format_mb(value):
+        return '-' if value is None else f'{value:.0f}'
+
+    report_lines = ['process\trss MB\tpss MB\tprivate MB']
+    report_lines.append('\t'.join(['parent'] + [format_mb(parent_usage[key]) for key in ['rss', 'pss', 'private']]))
+    for pid, usage in sorted(memory_by_worker.items()):
+        report_lines.append('\t'.join([f'worker {pid}'] + [format_mb(usage[key]) for key in ['rss', 'pss', 'private']]))
+
+    private_usages = [usage['private'] for usage in memory_by_worker.values() if usage['private'] is not None]
+    if private_usages:
+        report_lines.append(
+            f"mean incremental memory per worker: {sum(private_usages) / len(private_usages):.0f} MB "
+            f"(vs. {parent_usage['rss']:.0f} MB for a process that loads its own models)"
+        )
+    return '\n'.join(report_lines)
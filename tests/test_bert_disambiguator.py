@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from src.initialize_disambiguator.bert_disambiguator import BertDisambiguatorAdapter, get_subword_lengths, plan_batches
+
+
+class FakeBertDisambiguator:
+    def __init__(self, tokenizer):
+        self._model = {'unfactored': SimpleNamespace(_tokenizer=tokenizer)}
+        self._batch_size = 32
+        self.batches = []
+
+    def disambiguate_sentences(self, sentences):
+        self.batches.append((len(sentences), self._batch_size))
+        return [[word.upper() for word in sentence] for sentence in sentences]
+
+def test_plan_batches():
+    lengths = [10, 3, 7, 3, 30, 4]
+    # the sentence of 30 tokens is over the budget, and gets a batch of its own
+    assert plan_batches(lengths, 14) == [[1, 3, 5], [2], [0], [4]]
+    assert plan_batches(lengths, 1000) == [[1, 3, 5, 2, 0, 4]]
+
+def test_token_budget_keeps_order():
+    # one piece per 2 characters
+    tokenizer = SimpleNamespace(tokenize=lambda word: [word[i:i + 2] for i in range(0, len(word), 2)])
+    lines = [['abcdef', 'gh'], ['a'], ['abcd', 'ef', 'gh', 'ij'], ['b', 'c']]
+    assert get_subword_lengths(tokenizer.tokenize, lines) == [6, 3, 7, 4]
+    # camel_tools leaves out the words without pieces
+    assert get_subword_lengths(lambda word: [] if word == ' ' else [word], [['a', ' ', 'b']]) == [4]
+
+    disambiguator = BertDisambiguatorAdapter(FakeBertDisambiguator(tokenizer), token_budget=8)
+    assert disambiguator.disambiguate_sentences(lines) == [[word.upper() for word in line] for line in lines]
+    assert [batch_size for batch_size, _ in disambiguator.disambiguator.batches] == [2, 1, 1]
+    assert disambiguator.disambiguator._batch_size == 32
+
+    disambiguator.token_budget = None
+    disambiguator.disambiguate_sentences(lines)
+    assert disambiguator.disambiguator.batches[-1] == (4, 32)
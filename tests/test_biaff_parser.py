@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from supar.utils.transform import CoNLL
+
+from src.dependency_parser import biaff_parser
+
+
+class FakeParser:
+    """Checks its input as supar does, and attaches every token to the first one."""
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, sentences, verbose=False, **flags):
+        self.inputs.extend(sentences)
+        parsed = []
+        for sentence in sentences:
+            # raises RuntimeError for anything but words, (word, tag) or (word, lemma, tag)
+            rows = [line.split('\t') for line in CoNLL.toconll(sentence).strip().split('\n')]
+            values = [list(column) for column in zip(*rows)]
+            values[6] = [0] + [1] * (len(rows) - 1)
+            values[7] = ['---'] + ['MOD'] * (len(rows) - 1)
+            parsed.append(SimpleNamespace(values=values))
+        return parsed
+
+def test_parse_conll_trees(monkeypatch):
+    parser = FakeParser()
+    monkeypatch.setattr(biaff_parser, 'load_parser', lambda parse_model: parser)
+    tree = [
+        ('1', 'كتـاب', 'كتاب', 'NOM', 'NOUN', 'gen=m|num=s', '_', '_', '_', 'SpaceAfter=No'),
+        ('2', 'جديد', 'جديد', 'NOM', 'ADJ', 'gen=m|num=s', '_', '_', '_', '_'),
+    ]
+
+    parsed_trees = biaff_parser.parse_conll_trees([tree], parse_model='catib')
+
+    assert parser.inputs == [[('كتـاب', 'كتاب', 'NOM'), ('جديد', 'جديد', 'NOM')]]
+    assert [token_tuple[1:6] for token_tuple in parsed_trees[0]] == [
+        ('كتاب', 'كتاب', 'NOM', 'NOUN', 'gen=m|num=s'), ('جديد', 'جديد', 'NOM', 'ADJ', 'gen=m|num=s')
+    ]
+    assert [token_tuple[6:8] for token_tuple in parsed_trees[0]] == [(0, '---'), (1, 'MOD')]
+    assert [token_tuple[9] for token_tuple in parsed_trees[0]] == ['SpaceAfter=No', '_']
+
+def test_parse_text_tuples_shares_lemmas(monkeypatch):
+    monkeypatch.setattr(biaff_parser, 'load_parser', lambda parse_model: FakeParser())
+    # the dediacritized lemmas are new strings, and so are the values the parser reads back
+    sentence_tuples = [[
+        (1, 'كتاب', 'كِتاب', 'NOM', '_', 'gen=m|num=s', '_', '_', '_', '_'),
+        (2, 'كتاب', 'كِتاب', 'NOM', '_', 'gen=m|num=s', '_', '_', '_', '_'),
+    ]]
+
+    parsed_trees = biaff_parser.parse_text_tuples(sentence_tuples, parse_model='catib')
+
+    lemmas = [token_tuple[2] for token_tuple in parsed_trees[0]]
+    assert lemmas == ['كتاب', 'كتاب']
+    assert lemmas[0] is lemmas[1]
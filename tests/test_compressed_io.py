@@ -0,0 +1,20 @@
+import pytest
+
+from src.utils import compressed_io
+from src.utils.compressed_io import BackgroundWriter, open_output, read_lines, strip_compression_suffix
+
+
+@pytest.mark.parametrize('suffix', ['', '.gz', '.bz2', '.xz'])
+def test_compressed_round_trip(tmp_path, monkeypatch, suffix):
+    # small chunks, so the writer thread writes several of them
+    monkeypatch.setattr(compressed_io, 'WRITE_CHUNK_SIZE', 100)
+    file_path = tmp_path / f'trees.conllx{suffix}'
+    lines = [f'{i}\tكلمة\t_\n' for i in range(1000)]
+    with open_output(file_path) as f:
+        assert isinstance(f, BackgroundWriter) == bool(suffix)
+        f.writelines(lines[:500])
+        for line in lines[500:]:
+            f.write(line)
+
+    assert read_lines(file_path) == lines
+    assert strip_compression_suffix(file_path.name) == 'trees.conllx'
@@ -0,0 +1,22 @@
+from src.utils.conll_reader import block_to_tree, split_conll_blocks
+
+
+def test_split_conll_blocks():
+    lines = ['# text = a b\n', '1\ta\n', '2\tb\n', '\n', '\n', '1\tc\n']
+    assert split_conll_blocks(lines) == [['# text = a b', '1\ta', '2\tb'], ['1\tc']]
+
+def test_block_to_tree():
+    block = ['# text = ab c', '1-2\tab', '1\ta\t_\tNOM\t_\t_\t2\tIDF\t_\t_', '2\tb\t_\tNOM\t_\t_\t0\t---\t_\t_', '2.1\tc']
+    comments, token_tuples = block_to_tree(block)
+    assert comments == ['# text = ab c']
+    assert [token_tuple[:2] for token_tuple in token_tuples] == [('1', 'a'), ('2', 'b')]
+    assert all(len(token_tuple) == 10 for token_tuple in token_tuples)
+
+def test_block_to_tree_shares_repeated_values():
+    # built at runtime, so the two lines do not start out sharing one FEATS string
+    feats = '|'.join(f'{name}={value}' for name, value in [('gen', 'm'), ('num', 's')])
+    block = [f'1\ta\t_\tNOM\t_\t{feats}\t2\tIDF\t_\t_', f'2\tb\t_\tNOM\t_\t{feats}\t0\t---\t_\t_']
+    _, token_tuples = block_to_tree(block)
+    assert token_tuples[0][3] is token_tuples[1][3]
+    assert token_tuples[0][5] == 'gen=m|num=s'
+    assert token_tuples[0][5] is token_tuples[1][5]
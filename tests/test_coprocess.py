@@ -0,0 +1,40 @@
+import io
+import json
+import queue
+
+import pytest
+
+from src.utils.coprocess import RequestError, group_requests, parse_request, read_requests, take_batch, write_response
+
+DEFAULTS = {'file_type': 'text', 'model': 'catib', 'decoding': 'proj'}
+CHOICES = {'model': ['catib', 'ud'], 'decoding': ['proj', 'mst', 'greedy']}
+
+
+def test_parse_request():
+    request = parse_request('{"id": 1, "text": "a b\\n\\nc"}', DEFAULTS, CHOICES)
+    assert request['lines'] == ['a b', 'c']
+    assert (request['file_type'], request['model'], request['decoding']) == ('text', 'catib', 'proj')
+    request = parse_request('{"id": "x", "lines": ["a", " "], "file_type": "tokenized", "model": "ud"}', DEFAULTS, CHOICES)
+    assert request['lines'] == ['a']
+    assert (request['file_type'], request['model']) == ('tokenized', 'ud')
+
+    with pytest.raises(RequestError):
+        parse_request('not json', DEFAULTS, CHOICES)
+    with pytest.raises(RequestError) as error:
+        parse_request('{"id": 2, "text": "a", "model": "other"}', DEFAULTS, CHOICES)
+    assert error.value.request_id == 2
+
+def test_batches():
+    request_queue = queue.Queue()
+    lines = ['{"id": 1, "lines": ["a", "b"]}', '{"id": 2, "text": "c", "model": "ud"}', '[]', '{"id": 3, "text": "d"}']
+    read_requests(io.StringIO('\n'.join(lines) + '\n'), request_queue, DEFAULTS, CHOICES)
+
+    requests, ended = take_batch(request_queue, 3)
+    assert [request['id'] for request in requests] == [1, 2] and not ended
+    requests, ended = take_batch(request_queue, 3)
+    assert isinstance(requests[0], RequestError) and requests[1]['id'] == 3 and ended
+    assert dict(group_requests(requests)) == {('text', 'catib', 'proj'): [1]}
+
+    stream = io.StringIO()
+    write_response(stream, {'id': 3, 'trees': [['1\tد']]})
+    assert json.loads(stream.getvalue()) == {'id': 3, 'trees': [['1\tد']]}
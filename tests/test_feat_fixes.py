@@ -0,0 +1,32 @@
+import csv
+
+from src.parse_disambiguation.feat_fixes import FeatFixTable, get_feat_fixes
+
+
+def read_cases():
+    # stem features, and the fix applied by the hand-written rules the table replaced
+    with open('tests/test_feat_fixes.tsv', 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, delimiter='\t'))
+
+def test_feat_fixes_match_rules():
+    feat_fixes = get_feat_fixes()
+    for case in read_cases():
+        token, fix = case.pop('token'), case.pop('fix')
+        stem_feats = dict(case)
+        feat_fixes.apply(token, stem_feats)
+        expected = dict(case)
+        if fix != '_':
+            feat, value = fix.split('=')
+            expected[feat] = value
+        assert stem_feats == expected, (token, case)
+
+def test_first_matching_rule_wins():
+    features = ['pos', 'enc0']
+    rules = [
+        {'token': 'a', 'differs': '', 'pos': 'x', 'enc0': '1', 'set_feat': 'pos', 'set_value': 'first'},
+        {'token': '*', 'differs': 'enc0', 'pos': 'x', 'enc0': '0', 'set_feat': 'pos', 'set_value': 'second'},
+    ]
+    feat_fixes = FeatFixTable(rules, features)
+    assert feat_fixes.lookup('a', {'pos': 'x', 'enc0': '1'}) == ('pos', 'first')
+    assert feat_fixes.lookup('b', {'pos': 'x', 'enc0': '1'}) == ('pos', 'second')
+    assert feat_fixes.lookup('b', {'pos': 'x', 'enc0': '0'}) is None
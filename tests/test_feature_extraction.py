@@ -1,7 +1,8 @@
 import pytest
 from pandas import read_csv
 
-from src.parse_disambiguation.feature_extraction import get_word_features_df, join_feats
+from src.parse_disambiguation.feature_extraction import feats_dict_to_string, feats_items_to_string, get_word_features_df, join_feats, to_conll_fields_lists
+from src.parse_disambiguation.feature_workers import to_conll_fields_lists_parallel
 
 @pytest.fixture
 def word_analysis():
@@ -52,4 +53,32 @@ def test_join_feats_ud(word_feats):
     assert word_feats['tokens'] == ['بِ+', 'اِسْمِ']
     assert word_feats['pos_tags'] == ['ADP', 'NOUN']
     assert word_feats['lemmas'] == ['بِ+', 'ٱِسْم']
-    assert word_feats['feats'] == ['catib6=PRT|prc3=0|prc2=0|prc1=0|prc0=na|per=na|asp=na|vox=na|mod=na|gen=na|num=na|stt=na|cas=na|enc0=0|rat=na', 'catib6=NOM|prc3=0|prc2=0|prc1=bi_prep|prc0=0|per=na|asp=na|vox=na|mod=na|gen=m|num=s|stt=c|cas=g|enc0=0|rat=i']
\ No newline at end of file
+    assert word_feats['feats'] == ['catib6=PRT|prc3=0|prc2=0|prc1=0|prc0=na|per=na|asp=na|vox=na|mod=na|gen=na|num=na|stt=na|cas=na|enc0=0|rat=na', 'catib6=NOM|prc3=0|prc2=0|prc1=bi_prep|prc0=0|per=na|asp=na|vox=na|mod=na|gen=m|num=s|stt=c|cas=g|enc0=0|rat=i']
+
+def test_join_feats_keeps_word_feats(word_feats):
+    columns = list(word_feats.columns)
+    join_feats(word_feats, 'catib6')
+    
+    assert list(word_feats.columns) == columns
+
+def test_to_conll_fields_lists(word_analysis, clitic_feats):
+    clitic_feats = clitic_feats.astype(str).astype(object)
+    fields = to_conll_fields_lists([[word_analysis]], clitic_feats, ['catib6', 'ud'])
+    
+    assert [tup[3] for tup in fields['catib6'][0]] == ['PRT', 'NOM']
+    assert [tup[3] for tup in fields['ud'][0]] == ['ADP', 'NOUN']
+    assert [tup[1] for tup in fields['catib6'][0]] == [tup[1] for tup in fields['ud'][0]]
+
+def test_feats_dict_to_string_shares_strings():
+    feats = feats_dict_to_string({'pos': 'noun', 'gen': 'm'})
+    assert feats == 'pos=noun|gen=m'
+    # without the cache, the same FEATS string is built again and interned
+    feats_items_to_string.cache_clear()
+    assert feats_items_to_string((('pos', 'noun'), ('gen', 'm'))) is feats
+
+def test_to_conll_fields_lists_parallel(word_analysis, clitic_feats):
+    clitic_feats = clitic_feats.astype(str).astype(object)
+    sentence_analysis_list = [[word_analysis] * (i % 3 + 1) for i in range(7)]
+    fields = to_conll_fields_lists(sentence_analysis_list, clitic_feats, ['catib6', 'ud'])
+    
+    assert to_conll_fields_lists_parallel(sentence_analysis_list, clitic_feats, ['catib6', 'ud'], workers=2, chunk_size=2) == fields
@@ -0,0 +1,17 @@
+from src.utils.featurized_file import load_featurized, save_featurized
+
+
+def test_featurized_round_trip(tmp_path):
+    lines = ['بسم الله\n']
+    text_tuples = [[
+        (1, 'ب+', 'ب+', 'PRT', '_', 'ud=ADP|token_type=prc1', '_', '_', '_', '_'),
+        (2, 'اسم', 'اسم', 'NOM', '_', 'ud=NOUN|token_type=baseword', '_', '_', '_', '_'),
+        (3, 'الله', 'الله', 'PROP', '_', 'ud=PROPN|token_type=baseword', '_', '_', '_', '_'),
+    ]]
+    featurized_path = tmp_path / 'featurized.jsonl.gz'
+    save_featurized(featurized_path, lines, text_tuples, 'catib6')
+    
+    loaded_lines, loaded_tuples, tagset = load_featurized(featurized_path)
+    assert loaded_lines == ['بسم الله']
+    assert loaded_tuples == text_tuples
+    assert tagset == 'catib6'
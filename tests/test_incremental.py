@@ -0,0 +1,21 @@
+from src.utils.incremental import match_previous_trees, merge_trees, read_previous_version
+
+
+def get_tree(line):
+    return [f'# text = {line.strip()}', f'1\t{line.strip()}']
+
+def test_incremental_reparse(tmp_path):
+    previous_lines = ['a b\n', 'c\n', 'd e\n', 'f\n']
+    (tmp_path / 'previous.txt').write_text(''.join(previous_lines[:2]) + '\n' + ''.join(previous_lines[2:]))
+    (tmp_path / 'previous.conllx').write_text(''.join('\n'.join(get_tree(line)) + '\n\n' for line in previous_lines))
+    previous_lines, previous_trees = read_previous_version(tmp_path / 'previous.txt', tmp_path / 'previous.conllx')
+
+    lines = ['new\n', 'a b\n', 'd e changed\n', 'f  \n', 'g\n']
+    matched_trees = match_previous_trees(lines, previous_lines, previous_trees)
+    changed_lines = [line for line, tree in zip(lines, matched_trees) if tree is None]
+    assert changed_lines == ['new\n', 'd e changed\n', 'g\n']
+
+    expected = []
+    for line in lines:
+        expected.extend(get_tree(line) + [''])
+    assert merge_trees(matched_trees, [get_tree(line) for line in changed_lines]) == expected
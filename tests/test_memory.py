@@ -0,0 +1,21 @@
+from src.utils import stages
+from src.utils.memory import StageMemoryRecorder
+
+
+def test_stage_memory_recorder():
+    memory_recorder = StageMemoryRecorder()
+    memory_recorder.start()
+    try:
+        with stages.stage(stages.PARSING):
+            temporary = [str(i) for i in range(100000)]
+            del temporary
+        with stages.stage(stages.OUTPUT):
+            kept = [str(i) for i in range(100000)]
+    finally:
+        memory_recorder.stop()
+
+    parsing, output = memory_recorder.records[stages.PARSING], memory_recorder.records[stages.OUTPUT]
+    assert parsing['python peak'] > 1 and parsing['python kept'] < 1
+    assert output['python kept'] > 1
+    assert memory_recorder.report().splitlines()[1].startswith(stages.PARSING)
+    assert len(kept) == 100000
@@ -0,0 +1,23 @@
+from src.initialize_disambiguator.mle_disambiguator import MLEDisambiguatorAdapter
+
+
+class WordLengthDisambiguator:
+    # context-free like the MLE disambiguator, and counts the words it disambiguates
+    def __init__(self):
+        self.disambiguated_words = 0
+
+    def disambiguate(self, sentence):
+        self.disambiguated_words += len(sentence)
+        return [(word, len(word)) for word in sentence]
+
+def test_disambiguate_types():
+    lines = [['a', 'bb', 'a'], [], ['bb', 'ccc']]
+    adapter = MLEDisambiguatorAdapter.__new__(MLEDisambiguatorAdapter)
+    adapter.disambiguator = WordLengthDisambiguator()
+    adapter.type_level = False
+    sentence_level = adapter.disambiguate_sentences(lines)
+
+    adapter.disambiguator = WordLengthDisambiguator()
+    adapter.type_level = True
+    assert adapter.disambiguate_sentences(lines) == sentence_level
+    assert adapter.disambiguator.disambiguated_words == 3
@@ -0,0 +1,24 @@
+from src.utils import stages
+from src.utils.profiling import NO_STAGE, StageProfiler
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+def test_stage_profiler(tmp_path):
+    profiler = StageProfiler(interval=0.001)
+    profiler.start()
+    try:
+        busy(10000)
+        with stages.stage(stages.PARSING):
+            busy(500000)
+    finally:
+        profiler.stop()
+
+    paths = profiler.write(str(tmp_path / 'profile'))
+    assert sorted(path.split('/')[-1] for path in paths) == sorted([
+        'profile.pstats', f'profile.{NO_STAGE}.pstats', f'profile.{stages.PARSING}.pstats', 'profile.collapsed'
+    ])
+    with open(tmp_path / 'profile.collapsed', 'r') as f:
+        stacks = [line.rsplit(' ', 1)[0] for line in f]
+    assert any(stack.startswith(f'{stages.PARSING};') and 'busy' in stack for stack in stacks)
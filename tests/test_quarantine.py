@@ -0,0 +1,33 @@
+import json
+
+from src.utils.quarantine import Quarantine
+
+
+def upper_words(batch):
+    for line in batch:
+        if 'bad' in line:
+            raise ValueError(f'bad word in {line}')
+    return [line.upper() for line in batch]
+
+def test_quarantine_failing_sentences(tmp_path):
+    quarantine_path = tmp_path / 'quarantine.jsonl'
+    quarantine = Quarantine(quarantine_path)
+    lines = [f'line {i}' for i in range(10)]
+    lines[3] = 'a bad line'
+    lines[7] = 'another bad line'
+    quarantine.start(lines, source='input.txt')
+
+    results, kept = quarantine.run('cleaning', upper_words, lines)
+    assert results == [line.upper() for line in lines if 'bad' not in line]
+    assert kept == [0, 1, 2, 4, 5, 6, 8, 9]
+
+    results, kept = quarantine.run('parsing', lambda batch: [len(word) for word in batch], results)
+    assert kept == list(range(8))
+    assert quarantine.filter_lines(lines) == [line for line in lines if 'bad' not in line]
+    quarantine.close()
+
+    records = [json.loads(line) for line in quarantine_path.read_text().splitlines()]
+    assert [(record['index'], record['text'], record['stage']) for record in records] == \
+        [(3, 'a bad line', 'cleaning'), (7, 'another bad line', 'cleaning')]
+    assert records[0]['error'] == 'ValueError: bad word in a bad line'
+    assert quarantine.summary() == '2 of 10 sentences quarantined (cleaning: 2)'
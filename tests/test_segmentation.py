@@ -0,0 +1,40 @@
+from src.utils.segmentation import segment_sentence_tuples, split_long_line, stitch_segments
+
+
+def test_split_long_line_on_punctuation():
+    tokens = ['a', 'b', '،', 'c', 'd', 'e', '.', 'f']
+    assert split_long_line(tokens, 5) == [['a', 'b', '،'], ['c', 'd', 'e', '.', 'f']]
+
+def test_split_long_line_without_punctuation():
+    tokens = ['a', 'b', 'c', 'd', 'e']
+    assert split_long_line(tokens, 2) == [['a', 'b'], ['c', 'd'], ['e']]
+
+def test_short_line_is_not_split():
+    tokens = ['a', 'b', '.']
+    assert split_long_line(tokens, 3) == [tokens]
+
+def test_segment_sentence_tuples_renumbers_ids():
+    sentence = [(i, form, '_', 'NOM', '_', '_', '_', '_', '_', '_') for i, form in enumerate(['a', '،', 'b', 'c'], 1)]
+    segments, segment_counts = segment_sentence_tuples([sentence], 3)
+    assert segment_counts == [2]
+    assert [[tup[:2] for tup in segment] for segment in segments] == [[(1, 'a'), (2, '،')], [(1, 'b'), (2, 'c')]]
+
+def test_stitch_segments_attaches_to_first_root():
+    segments = [
+        [('1', 'a', '_', 'VRB', '_', '_', 0, '---', '_', '_'), ('2', '،', '_', 'PNX', '_', '_', 1, 'MOD', '_', '_')],
+        [('1', 'b', '_', 'NOM', '_', '_', 2, 'SBJ', '_', '_'), ('2', 'c', '_', 'VRB', '_', '_', 0, '---', '_', '_')],
+        [('1', 'd', '_', 'NOM', '_', '_', 0, '---', '_', '_')],
+    ]
+    sentences = stitch_segments(segments, [2, 1])
+    assert [tup[0] for tup in sentences[0]] == [1, 2, 3, 4]
+    assert [tup[6] for tup in sentences[0]] == [0, 1, 4, 1]
+    assert [tup[7] for tup in sentences[0]] == ['---', 'MOD', 'SBJ', 'MOD']
+    assert sentences[1] == segments[2]
+
+def test_stitch_segments_ud_relation():
+    segments = [
+        [('1', 'a', '_', 'VERB', '_', '_', 0, 'root', '_', '_')],
+        [('1', 'b', '_', 'VERB', '_', '_', 0, 'root', '_', '_')],
+    ]
+    sentence = stitch_segments(segments, [2])[0]
+    assert [(tup[6], tup[7]) for tup in sentence] == [(0, 'root'), (1, 'parataxis')]
@@ -0,0 +1,44 @@
+import gzip
+
+from src.utils.sharding import (format_shard_header, get_shard_range, load_offset_index, merge_shards,
+    read_shard_lines)
+
+
+def test_shards_cover_input(tmp_path):
+    input_path = tmp_path / 'input.txt'
+    input_lines = [f'line {i} ' + 'word ' * (i % 7) + '\n' for i in range(50)]
+    input_path.write_text(''.join(input_lines[:10]) + '\n' + ''.join(input_lines[10:]))
+
+    offsets = load_offset_index(input_path, 'lines')
+    assert len(offsets) == 51
+    shard_lines = []
+    for shard_idx in range(4):
+        start, end = get_shard_range(offsets, shard_idx, 4)
+        shard_lines.extend(line for line in read_shard_lines(input_path, start, end) if line.strip())
+    assert shard_lines == input_lines
+
+def test_merge_shards(tmp_path):
+    shard_paths = []
+    for shard_idx, (start, end) in enumerate([(0, 10), (10, 25)]):
+        shard_path = tmp_path / f'shard.{shard_idx}.conllx'
+        trees = f'# text = {shard_idx}\n1\ta\n\n1\tb\n\n'
+        shard_path.write_text(format_shard_header(shard_idx, 2, start, end, 25, 2) + '\n' + trees)
+        shard_paths.append(shard_path)
+
+    output_path = tmp_path / 'merged.conllx'
+    assert merge_shards(shard_paths[::-1], output_path) == 4
+    assert output_path.read_text().startswith('# text = 0\n')
+
+def test_merge_compressed_shards(tmp_path):
+    shard_paths = []
+    for shard_idx, (start, end) in enumerate([(0, 10), (10, 25)]):
+        # written with a compressed -o
+        shard_path = tmp_path / f'shard.{shard_idx}.conllx.gz'
+        with gzip.open(shard_path, 'wt') as f:
+            f.write(format_shard_header(shard_idx, 2, start, end, 25, 1) + '\n' + f'1\t{shard_idx}\n\n')
+        shard_paths.append(shard_path)
+
+    output_path = tmp_path / 'merged.conllx.gz'
+    assert merge_shards(shard_paths, output_path) == 2
+    with gzip.open(output_path, 'rt') as f:
+        assert f.read() == '1\t0\n\n1\t1\n\n'
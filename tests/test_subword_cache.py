@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from src.utils.subword_cache import SubwordCache, cache_subwords
+
+
+class CountingTokenizer:
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.calls = 0
+
+    def get_vocab(self):
+        return self.vocab
+
+    def tokenize(self, word):
+        self.calls += 1
+        return [word[:2], f'##{word[2:]}'] if len(word) > 2 else [word]
+
+def test_subword_cache_is_bounded():
+    cache = SubwordCache(max_size=2)
+    tokenizer = CountingTokenizer({})
+    tokenize = cache.wrap(tokenizer.tokenize)
+    for word in ['abc', 'de', 'abc', 'fgh', 'de']:
+        tokenize(word)
+
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert list(cache.entries) == ['fgh', 'de']
+
+def test_cache_shared_by_matching_vocabularies():
+    # the layout of camel_tools' BERTUnfactoredDisambiguator, whose BERT tagger holds the tokenizer
+    disambiguator_tokenizer = CountingTokenizer({'ab': 0, '##c': 1})
+    disambiguator = SimpleNamespace(_model={'unfactored': SimpleNamespace(_tokenizer=disambiguator_tokenizer)})
+    parser_tokenizer = CountingTokenizer({'ab': 0, '##c': 1})
+    other_tokenizer = CountingTokenizer({'ab': 0, '##d': 1})
+    parsers = {
+        'catib': SimpleNamespace(transform=SimpleNamespace(flattened_fields=[SimpleNamespace(tokenize=parser_tokenizer.tokenize)])),
+        'ud': SimpleNamespace(transform=SimpleNamespace(flattened_fields=[SimpleNamespace(tokenize=other_tokenizer.tokenize)])),
+    }
+    caches = cache_subwords(disambiguator, parsers)
+    assert len(caches) == 2
+
+    assert disambiguator_tokenizer.tokenize('abc') == ['ab', '##c']
+    assert parsers['catib'].transform.flattened_fields[0].tokenize('abc') == ['ab', '##c']
+    parsers['ud'].transform.flattened_fields[0].tokenize('abc')
+    assert (disambiguator_tokenizer.calls, parser_tokenizer.calls, other_tokenizer.calls) == (1, 0, 1)
+    # caching again does not wrap the tokenizers twice
+    assert cache_subwords(disambiguator, parsers) == caches
@@ -0,0 +1,19 @@
+import json
+
+from src.utils.threads import load_thread_config, save_thread_config
+
+
+def test_thread_config(tmp_path):
+    config_path = tmp_path / 'thread_config.json'
+    assert load_thread_config(config_path) == {}
+
+    save_thread_config({'threads': 2, 'interop_threads': 1, 'workers': 4}, config_path)
+    assert load_thread_config(config_path)['workers'] == 4
+
+    # measured on another machine
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    config['machine']['cpu_count'] += 1
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+    assert load_thread_config(config_path) == {}
@@ -0,0 +1,49 @@
+import os
+
+from src.utils.watch_folder import FolderWatcher, get_output_path, group_batches, move_aside, split_batch, write_atomic
+
+
+def test_folder_watcher(tmp_path):
+    watcher = FolderWatcher(tmp_path)
+    (tmp_path / 'a.txt').write_text('a\n')
+    (tmp_path / '.hidden.txt').write_text('hidden\n')
+    (tmp_path / 'processed').mkdir()
+    assert watcher.poll() == []
+    assert watcher.poll() == ['a.txt']
+
+    # a file still being written is not ready until it stops changing
+    (tmp_path / 'b.txt').write_text('b\n')
+    assert watcher.poll() == ['a.txt']
+    with open(tmp_path / 'b.txt', 'a') as f:
+        f.write('more b\n')
+    assert watcher.poll() == ['a.txt']
+    assert watcher.poll() == ['a.txt', 'b.txt']
+
+    move_aside(tmp_path / 'a.txt', tmp_path / 'processed')
+    move_aside(tmp_path / 'b.txt', tmp_path / 'processed')
+    assert watcher.poll() == []
+    assert not watcher.has_files()
+
+def test_batches():
+    assert group_batches([3, 1, 5, 0, 2], 4) == [[0, 1], [2], [3, 4]]
+    # the sentence at index 3 failed, and the second file is empty
+    assert split_batch([0, 1, 2, 4, 5], [3, 0, 3]) == [[0, 1, 2], [], [3, 4]]
+
+def test_write_atomic_and_move_aside(tmp_path):
+    write_atomic(['1\ta', ''], tmp_path / 'a.conllx')
+    assert (tmp_path / 'a.conllx').read_text() == '1\ta\n\n'
+    assert os.listdir(tmp_path) == ['a.conllx']
+
+    (tmp_path / 'a.txt').write_text('first\n')
+    assert move_aside(tmp_path / 'a.txt', tmp_path / 'processed') == tmp_path / 'processed' / 'a.txt'
+    (tmp_path / 'a.txt').write_text('second\n')
+    assert move_aside(tmp_path / 'a.txt', tmp_path / 'processed') == tmp_path / 'processed' / 'a.txt.1'
+    assert (tmp_path / 'processed' / 'a.txt').read_text() == 'first\n'
+
+def test_get_output_path(tmp_path):
+    # a.txt and a.conllx have the same base name, and a.txt arrives again once parsed
+    output_paths = []
+    for _ in range(3):
+        output_paths.append(get_output_path(tmp_path, 'a', '.conllx.gz'))
+        write_atomic(['1\ta', ''], output_paths[-1])
+    assert output_paths == [tmp_path / 'a.conllx.gz', tmp_path / 'a.1.conllx.gz', tmp_path / 'a.2.conllx.gz']
@@ -4,14 +4,32 @@ Disambiguator and Conll builder CLI.
 Usage:
     text_to_conll_cli (-i <input> | --input=<input> | -s <string> | --string=<string>)
         (-f <file_type> | --file_type=<file_type>)
+        [-o <output> | --output=<output>]
         [-b <morphology_db_type> | --morphology_db_type=<morphology_db_type>]
         [-d <disambiguator> | --disambiguator=<disambiguator>]
+        [--db_snapshot]
+        [--token_budget=<tokens>]
         [-m <model> | --model=<model>]
+        [--mmap]
+        [-l <max_length> | --max_length=<max_length>]
+        [--decoding=<decoding>]
+        [--feature_workers=<feature_workers>]
+        [--subword_cache=<size>]
+        [--quarantine=<quarantine_file>]
+        [--trace=<trace_file>] [--slowest=<slowest>]
+        [--multi_scheme=<output_prefix>]
+        [--save_featurized=<featurized_file>]
+        [--memory_report]
+        [--profile=<prefix>]
+        [--threads=<threads>] [--interop_threads=<interop_threads>]
+        [--shard=<shard>]
+        [--previous_input=<previous_input> --previous_output=<previous_output>]
     text_to_conll_cli (-h | --help)
 
 Options:
     -i <input> --input=<input>
-        A text file or conll file.
+        A text file or conll file. Files ending with .gz, .bz2, .xz or .zst (with the zstandard package)
+        are decompressed as they are read.
     -s <string> --string=<string>
         A string to parse.
     -f <file_type> --file_type=<file_type>
@@ -21,21 +39,112 @@ Options:
             preprocessed_text: whitespace tokenized text (text will not be cleaned)
             tokenized_tagged: text is already tokenized and POS tagged, in tuple form
             tokenized: text is already tokenized, only parse tokenized input; don't disambiguate to add POS tags or features
+            featurized: a file saved with --save_featurized; text that was already disambiguated and featurized
+    -o <output> --output=<output>
+        Write the trees to this file instead of stdout. Files ending with .gz, .bz2, .xz or .zst
+        are compressed by a background thread as they are written.
     -b <morphology_db_type> --morphology_db_type=<morphology_db_type>
         The morphology database to use; will use camel_tools built-in by default [default: r13]
     -d <disambiguator> --disambiguator=<disambiguator>
-        The disambiguation technique used to tokenize the text lines, either 'mle' or 'bert' [default: bert]
+        The disambiguation technique used to tokenize the text lines, either 'mle', 'mle_type' or 'bert' [default: bert]
+            mle_type: mle, disambiguating each distinct word once per batch instead of every token (same output, faster)
+    --db_snapshot
+        Load the morphology database from a binary snapshot in the models directory, which is much faster
+        than building it from the database file. The snapshot is created on first use.
+    --token_budget=<tokens>
+        Batch the sentences disambiguated by BERT by subword length, each batch holding up to this many subword
+        tokens, padding included, instead of 32 sentences. Less padding is computed on inputs of mixed lengths.
     -m <model> --model=<model>
         The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    --mmap
+        Memory-map the parser weights instead of reading the whole checkpoint into memory.
+        The model is converted to a memory-mappable copy (next to the model file) on first use;
+        once converted, the copy is used by every run.
+    -l <max_length> --max_length=<max_length>
+        Split lines longer than max_length tokens on punctuation (or at max_length tokens) before
+        disambiguation and parsing, and stitch the parsed segments back into one tree per line.
+        Bounds the time and memory spent on paragraph-long lines. Not applied to conll files.
+    --decoding=<decoding>
+        The parser decoding algorithm [default: proj]
+            proj: projective trees (Eisner), cubic in sentence length
+            mst: non-projective trees (Chu-Liu/Edmonds maximum spanning tree)
+            greedy: highest scoring head per token, fastest but might not produce a well-formed tree
+    --feature_workers=<feature_workers>
+        The number of worker processes extracting the features of text and preprocessed_text lines,
+        in chunks of sentences. The output is the same as with a single process [default: 1]
+    --subword_cache=<size>
+        Cache the WordPiece tokenization of up to size words, shared by the BERT disambiguator and the parser
+        when their vocabularies match. The hit rate and the time saved are printed to stderr at exit.
+    --quarantine=<quarantine_file>
+        Set aside the sentences that fail (e.g. a clitic missing from the clitic table) instead of stopping:
+        they are written to quarantine_file as JSON lines with their index, text, stage and error, and left out
+        of the output. The number of sentences quarantined in each stage is printed to stderr at exit.
+        Not available for conll files, or with --max_length, --multi_scheme or --previous_input.
+    --trace=<trace_file>
+        Process the sentences one at a time and write the time each sentence spends in each stage
+        (cleaning, disambiguation, feature extraction, parsing, output) to trace_file as JSON lines.
+        A summary of latency percentiles by sentence length and the slowest sentences is printed to stderr.
+        Not available for conll files.
+    --slowest=<slowest>
+        The number of slowest sentences listed in the trace summary [default: 10]
+    --multi_scheme=<output_prefix>
+        Parse with both the CATiB and the UD models, disambiguating and featurizing the text only once.
+        The trees are written to <output_prefix>.catib.conllx and <output_prefix>.ud.conllx
+        (-m is ignored). Only for text and preprocessed_text, without -o, --trace or --save_featurized.
+    --save_featurized=<featurized_file>
+        Also save the disambiguated and featurized text to featurized_file (gzipped JSON lines),
+        to parse it again later with -f featurized without disambiguating it again.
+        Only for text and preprocessed_text.
+    --memory_report
+        Record the memory used by each stage (Python allocation peaks with tracemalloc, and RSS changes),
+        and print a table of it to stderr at exit. Slows the Python stages down.
+    --profile=<prefix>
+        Profile the run, and write <prefix>.pstats (cProfile, with one <prefix>.<stage>.pstats per stage)
+        and <prefix>.collapsed (sampled call stacks with the stage as root frame, for flame graphs).
+    --threads=<threads>
+        The number of torch intra-op threads used by disambiguation and parsing. Defaults to the configuration
+        saved by autotune_threads.py on this machine, or to torch's default (one per core).
+    --interop_threads=<interop_threads>
+        The number of torch inter-op threads. Defaults to the saved configuration, or to torch's default.
+    --shard=<shard>
+        Parse only shard i of N of the input file, given as i/N (i from 0 to N-1), reading only its byte range.
+        The shard boundaries come from an offset index of the file (see shards.py), built on first use.
+        The output starts with a '# shard = ...' header; merge the shard outputs with shards.py merge.
+        Not available with --string, compressed or featurized files, --trace or --multi_scheme.
+    --previous_input=<previous_input>
+        A previous version of the input file, parsed into previous_output. The input is diffed by line against it,
+        and only the inserted or changed lines are disambiguated and parsed; the trees of the unchanged lines
+        are copied from previous_output. Not available for conll and featurized files, or with --string, --trace,
+        --multi_scheme, --save_featurized or --shard.
+    --previous_output=<previous_output>
+        The CoNLL output of previous_input.
     -h --help
         Show this screen.
 """
 
+import atexit
+import sys
 from src.logger import log
 from pathlib import Path
 from camel_tools.utils.charmap import CharMapper
-from src.conll_output import print_to_conll, text_tuples_to_string
-from src.data_preparation import get_file_type_params, get_tagset, parse_text
+from src.conll_output import print_to_conll, save_to_file, text_tuples_to_string
+from src.data_preparation import get_file_type_params, get_tagset, parse_text, parse_text_schemes
+from src.dependency_parser.biaff_parser import load_parser, parse_conll_trees
+from src.dependency_parser.mmap_checkpoint import convert_checkpoint, has_mmap_checkpoint
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+from src.utils import stages
+from src.utils.compressed_io import get_compression, open_output, read_lines
+from src.utils.conll_reader import read_conll_lines, split_conll_blocks
+from src.utils.featurized_file import load_featurized
+from src.utils.incremental import match_previous_trees, merge_trees, read_previous_version
+from src.utils.memory import StageMemoryRecorder
+from src.utils.profiling import profile_until_exit
+from src.utils.quarantine import Quarantine
+from src.utils.sharding import (format_shard_header, get_record_kind, get_shard_range, load_offset_index,
+    parse_shard, read_shard_lines)
+from src.utils.subword_cache import cache_subwords, format_cache_reports
+from src.utils.threads import configure_threads
+from src.utils.tracing import SentenceTracer
 from src.utils.model_downloader import get_model_name
 from docopt import docopt
 from transformers.utils import logging
@@ -46,7 +155,7 @@ arguments = docopt(__doc__)
 logging.set_verbosity_error()
 
 def get_file_type(file_type):
-    if file_type in ['conll', 'text', 'preprocessed_text', 'tokenized_tagged', 'tokenized']:
+    if file_type in ['conll', 'text', 'preprocessed_text', 'tokenized_tagged', 'tokenized', 'featurized']:
         return file_type 
     assert False, 'Unknown file type'
 
@@ -73,14 +182,62 @@ def main():
     file_type = get_file_type(arguments['--file_type'])
     morphology_db_type = arguments['--morphology_db_type']
     disambiguator_type = arguments['--disambiguator']
+    snapshot_dir = model_path if arguments['--db_snapshot'] else None
+    token_budget = int(arguments['--token_budget']) if arguments['--token_budget'] else None
     parse_model = arguments['--model']
+    max_length = int(arguments['--max_length']) if arguments['--max_length'] else None
+    decoding = arguments['--decoding']
+    feature_workers = int(arguments['--feature_workers'])
+    trace_path = arguments['--trace']
+    assert not (trace_path and file_type == 'conll'), 'Tracing is not available for conll files'
+    multi_scheme_prefix = arguments['--multi_scheme']
+    featurized_path = arguments['--save_featurized']
+    assert not (multi_scheme_prefix and (trace_path or featurized_path or arguments['--output'])), \
+        '--multi_scheme is not available with --output, --trace or --save_featurized'
+    shard = parse_shard(arguments['--shard']) if arguments['--shard'] else None
+    assert not (shard and (file_path is None or get_compression(file_path) or file_type == 'featurized' or trace_path
+        or multi_scheme_prefix)), '--shard is only available for uncompressed text and conll files, without --trace or --multi_scheme'
+    previous_input = arguments['--previous_input']
+    assert bool(previous_input) == bool(arguments['--previous_output']), '--previous_input and --previous_output should be given together'
+    assert not (previous_input and (file_path is None or file_type in ['conll', 'featurized'] or trace_path
+        or multi_scheme_prefix or featurized_path or shard)), \
+        '--previous_input is only available for text files, without --trace, --multi_scheme, --save_featurized or --shard'
+    quarantine_path = arguments['--quarantine']
+    assert not (quarantine_path and (file_type == 'conll' or max_length or multi_scheme_prefix or previous_input)), \
+        '--quarantine is not available for conll files, or with --max_length, --multi_scheme or --previous_input'
 
+    output_file = open_output(arguments['--output']) if arguments['--output'] else None
+    if output_file is not None:
+        # closed at exit, so the trees written so far are saved even if parsing fails
+        atexit.register(output_file.close)
+
+    quarantine = None
+    if quarantine_path:
+        quarantine = Quarantine(quarantine_path)
+        def report_quarantine():
+            quarantine.close()
+            print(quarantine.summary(), file=sys.stderr)
+        atexit.register(report_quarantine)
+
+    if arguments['--memory_report']:
+        memory_recorder = StageMemoryRecorder()
+        memory_recorder.start()
+        # printed even if parsing fails, to see how far memory got
+        atexit.register(lambda: print(memory_recorder.report(), file=sys.stderr))
+    if arguments['--profile']:
+        profile_until_exit(arguments['--profile'])
+    configure_threads(
+        int(arguments['--threads']) if arguments['--threads'] else None,
+        int(arguments['--interop_threads']) if arguments['--interop_threads'] else None
+    )
 
     #
     ### Set up parsing model 
     # (download defaults models, and get correct model name from the models directory)
     #
     model_name = get_model_name(parse_model, model_path=model_path)
+    if arguments['--mmap'] and not has_mmap_checkpoint(model_path/model_name):
+        convert_checkpoint(model_path/model_name)
 
     # 
     ### get tagset (depends on model)
@@ -92,19 +249,118 @@ def main():
     ### main code ###
     #
     lines = []
-    if string_text is not None:
+    featurized_tuples = None
+    if file_type == 'featurized':
+        assert file_path is not None, 'featurized input should be passed as a file'
+        lines, featurized_tuples, featurized_tagset = load_featurized(file_path)
+        assert featurized_tagset == tagset, f'The file was featurized for {featurized_tagset}, but the {parse_model} model uses {tagset}'
+    elif string_text is not None:
         lines = [string_text]
+    elif shard:
+        offsets = load_offset_index(file_path, get_record_kind(file_type))
+        shard_start, shard_end = get_shard_range(offsets, *shard)
+        shard_lines = read_shard_lines(file_path, shard_start, shard_end)
+        lines = [line for line in shard_lines if line.strip()]
     elif file_path is not None:
-        with open(file_path, 'r') as f:
-            lines = [line for line in f.readlines() if line.strip()]
+        lines = read_lines(file_path)
+
+
+    if file_type in ['text', 'preprocessed_text']:
+        disambiguator = get_disambiguator(disambiguator_type, morphology_db_type, snapshot_dir, token_budget)
+    else:
+        disambiguator = disambiguator_type
+
+    if arguments['--subword_cache']:
+        cached_models = ['catib', 'ud'] if multi_scheme_prefix else [parse_model]
+        parsers = {
+            cached_model: load_parser(str(model_path/get_model_name(cached_model, model_path=model_path)))
+            for cached_model in cached_models
+        }
+        subword_caches = cache_subwords(disambiguator, parsers, int(arguments['--subword_cache']))
+        atexit.register(lambda: print(format_cache_reports(subword_caches), file=sys.stderr))
+
+    if multi_scheme_prefix:
+        parse_models = ['catib', 'ud']
+        parse_model_paths = {
+            get_tagset(scheme_model): model_path/get_model_name(scheme_model, model_path=model_path)
+            for scheme_model in parse_models
+        }
+        file_type_params = get_file_type_params(lines, file_type, file_path, model_path/model_name,
+            arclean, disambiguator, clitic_feats_df, tagset, morphology_db_type)
+        parsed_text_tuples_by_tagset = parse_text_schemes(file_type, file_type_params, parse_model_paths,
+            max_length=max_length, decoding=decoding, feature_workers=feature_workers)
+
+        for scheme_model in parse_models:
+            with stages.stage(stages.OUTPUT):
+                save_to_file(
+                    text_tuples_to_string(parsed_text_tuples_by_tagset[get_tagset(scheme_model)], file_type, sentences=lines),
+                    Path(f'{multi_scheme_prefix}.{scheme_model}.conllx')
+                )
+        return
+
+    if trace_path:
+        tracer = SentenceTracer()
+        stages.add_stage_observer(tracer)
+        for i, line in enumerate(lines):
+            tracer.start_sentence(line)
+            file_type_params = get_file_type_params([line], file_type, file_path, model_path/model_name,
+                arclean, disambiguator, clitic_feats_df, tagset, morphology_db_type,
+                featurized_tuples=featurized_tuples[i:i + 1] if featurized_tuples else None)
+            if quarantine:
+                quarantine.start([line], first_index=i, source=file_path)
+            parsed_text_tuples = parse_text(file_type, file_type_params, max_length=max_length, decoding=decoding,
+                quarantine=quarantine)
+            with stages.stage(stages.OUTPUT):
+                sentences = quarantine.filter_lines([line]) if quarantine else [line]
+                print_to_conll(text_tuples_to_string(parsed_text_tuples, file_type, sentences=sentences), file=output_file)
+            tracer.end_sentence(sum(len(sentence_tuples) for sentence_tuples in parsed_text_tuples))
+        stages.remove_stage_observer(tracer)
+
+        tracer.write(trace_path)
+        print(tracer.summary(slowest=int(arguments['--slowest'])), file=sys.stderr)
+        return
+
+    if shard and file_type == 'conll':
+        # only the trees of the shard are read, and their comments are kept
+        comments, conll_trees = read_conll_lines(shard_lines)
+        with stages.stage(stages.PARSING):
+            parsed_text_tuples = parse_conll_trees(conll_trees, parse_model=str(model_path/model_name), decoding=decoding)
+        with stages.stage(stages.OUTPUT):
+            print(format_shard_header(*shard, shard_start, shard_end, int(offsets[-1]), len(parsed_text_tuples)), file=output_file)
+            print_to_conll(text_tuples_to_string(parsed_text_tuples, file_type, comments=comments), file=output_file)
+        return
 
+    if previous_input:
+        previous_lines, previous_trees = read_previous_version(previous_input, arguments['--previous_output'])
+        matched_trees = match_previous_trees(lines, previous_lines, previous_trees)
+        changed_lines = [line for line, tree in zip(lines, matched_trees) if tree is None]
+        parsed_text_tuples = []
+        if changed_lines:
+            file_type_params = get_file_type_params(changed_lines, file_type, file_path, model_path/model_name,
+                arclean, disambiguator, clitic_feats_df, tagset, morphology_db_type)
+            parsed_text_tuples = parse_text(file_type, file_type_params, max_length=max_length, decoding=decoding,
+                feature_workers=feature_workers)
+        with stages.stage(stages.OUTPUT):
+            parsed_trees = split_conll_blocks(text_tuples_to_string(parsed_text_tuples, file_type, sentences=changed_lines))
+            print_to_conll(merge_trees(matched_trees, parsed_trees), file=output_file)
+        print(f'{len(lines) - len(changed_lines)} of {len(lines)} trees reused, {len(changed_lines)} lines parsed', file=sys.stderr)
+        return
 
     file_type_params = get_file_type_params(lines, file_type, file_path, model_path/model_name,
-        arclean, disambiguator_type, clitic_feats_df, tagset, morphology_db_type)
-    parsed_text_tuples = parse_text(file_type, file_type_params)
+        arclean, disambiguator, clitic_feats_df, tagset, morphology_db_type, featurized_tuples=featurized_tuples)
+    if quarantine:
+        quarantine.start(lines, source=file_path)
+    parsed_text_tuples = parse_text(file_type, file_type_params, max_length=max_length, decoding=decoding,
+        featurized_path=featurized_path, feature_workers=feature_workers, quarantine=quarantine)
+    if quarantine:
+        # the quarantined sentences have no tree
+        lines = quarantine.filter_lines(lines)
 
-    string_lines = text_tuples_to_string(parsed_text_tuples, file_type, sentences=lines)
-    print_to_conll(string_lines)
+    with stages.stage(stages.OUTPUT):
+        string_lines = text_tuples_to_string(parsed_text_tuples, file_type, sentences=lines)
+        if shard:
+            print(format_shard_header(*shard, shard_start, shard_end, int(offsets[-1]), len(parsed_text_tuples)), file=output_file)
+        print_to_conll(string_lines, file=output_file)
 
 if __name__ == '__main__':
     main()
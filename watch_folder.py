@@ -0,0 +1,206 @@
+"""
+Parse the text files dropped into a directory as they arrive, keeping the models loaded.
+
+The directory is polled every interval seconds. New files are parsed once they have stopped
+changing, in batches of several files, and each file is saved as [name].conllx in the output
+directory (or [name].1.conllx, ... if that output is already there, e.g. from a.txt and a.conllx),
+written to a temporary file that is then renamed. The parsed files are then moved
+to the processed directory, and the files that cannot be parsed to the failed directory.
+
+Usage:
+    watch_folder (-i <input> | --input=<input>)
+        (-o <output> | --output=<output>)
+        [-m <model> | --model=<model>]
+        [--processed=<processed>] [--failed=<failed>]
+        [--interval=<interval>] [--batch_lines=<batch_lines>]
+        [--compress=<extension>]
+        [--feature_workers=<feature_workers>]
+        [--token_budget=<tokens>]
+        [--subword_cache=<size>]
+        [--quarantine=<quarantine_file>]
+        [--once]
+        [--threads=<threads>] [--interop_threads=<interop_threads>]
+    watch_folder (-h | --help)
+
+Options:
+    -i <input> --input=<input>
+        The directory watched for text files. Subdirectories and hidden files are ignored. Files ending
+        with .gz, .bz2, .xz or .zst (with the zstandard package) are decompressed as they are read.
+    -o <output> --output=<output>
+        The directory to save the parsed CoNLL-X files
+    -m <model> --model=<model>
+        The name BERT model used to parse (to be placed in the model directory) [default: catib]
+    --processed=<processed>
+        The directory the parsed files are moved to. Defaults to the processed directory in the input directory
+    --failed=<failed>
+        The directory the files that cannot be parsed (e.g. not utf-8) are moved to.
+        Defaults to the failed directory in the input directory
+    --interval=<interval>
+        The seconds between two polls of the input directory. A file is parsed once it has not changed
+        between two polls [default: 1]
+    --batch_lines=<batch_lines>
+        The number of lines parsed together; files are added to a batch until it has this many lines [default: 5000]
+    --compress=<extension>
+        Compress the CoNLL-X files as they are written, with gz, bz2, xz or zst (e.g. [name].conllx.gz)
+    --feature_workers=<feature_workers>
+        The number of worker processes extracting the features of each batch, in chunks of sentences [default: 1]
+    --token_budget=<tokens>
+        Batch the sentences disambiguated by BERT by subword length, each batch holding up to this many subword
+        tokens, padding included, instead of 32 sentences. Less padding is computed on inputs of mixed lengths.
+    --subword_cache=<size>
+        Cache the WordPiece tokenization of up to size words over all the files, shared by the BERT disambiguator
+        and the parser when their vocabularies match. The hit rate and the time saved are printed to stderr at exit.
+    --quarantine=<quarantine_file>
+        Write the sentences that fail to quarantine_file as JSON lines with their file, index, text, stage and error.
+        The sentences that fail are always left out of the output, so one sentence does not fail a whole batch.
+    --once
+        Parse the files in the input directory, and exit once it is empty, instead of watching it
+    --threads=<threads>
+        The number of torch intra-op threads used by disambiguation and parsing. Defaults to the configuration
+        saved by autotune_threads.py on this machine, or to torch's default (one per core).
+    --interop_threads=<interop_threads>
+        The number of torch inter-op threads. Defaults to the saved configuration, or to torch's default.
+    -h --help
+        Show this screen.
+"""
+
+import atexit
+import sys
+import time
+import traceback
+from pathlib import Path
+from camel_tools.utils.charmap import CharMapper
+from src.classes import TextParams
+from src.conll_output import text_tuples_to_string
+from src.data_preparation import get_tagset, parse_text
+from src.dependency_parser.biaff_parser import load_parser
+from src.initialize_disambiguator.disambiguator_interface import get_disambiguator
+from src.utils import stages
+from src.utils.compressed_io import get_compression, read_lines, strip_compression_suffix
+from src.utils.quarantine import Quarantine
+from src.utils.subword_cache import cache_subwords, format_cache_reports
+from src.utils.threads import configure_threads
+from src.utils.model_downloader import get_model_name
+from src.utils.watch_folder import FolderWatcher, get_output_path, group_batches, move_aside, split_batch, write_atomic
+from docopt import docopt
+from pandas import read_csv
+from transformers.utils import logging
+
+logging.set_verbosity_error()
+
+arguments = docopt(__doc__)
+
+def main():
+    root_dir = Path(__file__).parent
+    model_path = root_dir/"models"
+
+    # camel_tools import used to clean text
+    arclean = CharMapper.builtin_mapper("arclean")
+
+    #
+    ### Get clitic features
+    #
+    clitic_feats_df = read_csv(root_dir / 'data/clitic_feats.csv')
+    clitic_feats_df = clitic_feats_df.astype(str).astype(object) # so ints read are treated as string objects
+
+
+    #
+    ### cli user input ###
+    #
+    input_path = Path(arguments['--input'])
+    output_path = Path(arguments['--output'])
+    parse_model = arguments['--model']
+    processed_path = Path(arguments['--processed']) if arguments['--processed'] else input_path/'processed'
+    failed_path = Path(arguments['--failed']) if arguments['--failed'] else input_path/'failed'
+    interval = float(arguments['--interval'])
+    batch_lines = int(arguments['--batch_lines'])
+    output_suffix = f".{arguments['--compress']}" if arguments['--compress'] else ''
+    assert not output_suffix or get_compression(f'output.conllx{output_suffix}'), f"Unknown compression {arguments['--compress']}"
+    feature_workers = int(arguments['--feature_workers'])
+    token_budget = int(arguments['--token_budget']) if arguments['--token_budget'] else None
+    assert input_path.is_dir(), f'{input_path} is not a directory'
+    assert interval > 0 and batch_lines > 0, '--interval and --batch_lines should be positive'
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    # the sentences that fail are always set aside; --quarantine only adds a file to keep them
+    quarantine = Quarantine(arguments['--quarantine'])
+    def report_quarantine():
+        quarantine.close()
+        print(quarantine.summary(), file=sys.stderr)
+    atexit.register(report_quarantine)
+
+    configure_threads(
+        int(arguments['--threads']) if arguments['--threads'] else None,
+        int(arguments['--interop_threads']) if arguments['--interop_threads'] else None
+    )
+
+    #
+    ### Load the models once, so new files are parsed without loading them again
+    #
+    model_name = get_model_name(parse_model, model_path=model_path)
+    tagset = get_tagset(parse_model)
+    disambiguator = get_disambiguator("bert", "r13", token_budget=token_budget)
+    parser = load_parser(str(model_path/model_name))
+    if arguments['--subword_cache']:
+        subword_caches = cache_subwords(disambiguator, {parse_model: parser}, int(arguments['--subword_cache']))
+        atexit.register(lambda: print(format_cache_reports(subword_caches), file=sys.stderr))
+
+    #
+    ### main code ###
+    #
+    def read_files(text_files):
+        lines_by_file = {}
+        for text_file in text_files:
+            try:
+                lines_by_file[text_file] = read_lines(input_path/text_file)
+            except Exception as error:
+                print(f'cannot read {text_file} ({type(error).__name__}: {error}), moved to {failed_path}', file=sys.stderr)
+                move_aside(input_path/text_file, failed_path)
+        return lines_by_file
+
+    def parse_batch(text_files, file_lines):
+        lines = [line for one_file_lines in file_lines for line in one_file_lines]
+        # each sentence is quarantined with the name of its file
+        quarantine.start(lines, source=[text_file for text_file, one_file_lines in zip(text_files, file_lines) for _ in one_file_lines])
+        quarantined_count = len(quarantine.records)
+        file_type_params = TextParams(lines, model_path/model_name, arclean, disambiguator, clitic_feats_df, tagset, "")
+        start_time = time.perf_counter()
+        parsed_text_tuples = parse_text("text", file_type_params, feature_workers=feature_workers, quarantine=quarantine)
+
+        positions_by_file = split_batch(quarantine.sentence_indices, [len(lines) for lines in file_lines])
+        for text_file, positions in zip(text_files, positions_by_file):
+            base_name = Path(strip_compression_suffix(text_file)).stem
+            with stages.stage(stages.OUTPUT):
+                write_atomic(
+                    text_tuples_to_string(
+                        [parsed_text_tuples[position] for position in positions], file_type='text',
+                        sentences=[lines[quarantine.sentence_indices[position]] for position in positions]
+                    ),
+                    get_output_path(output_path, base_name, f'.conllx{output_suffix}')
+                )
+            # moved once its output is written, so a file is parsed again (to a numbered output) if the daemon stops in between
+            move_aside(input_path/text_file, processed_path)
+        print(f'parsed {len(text_files)} files ({len(lines)} lines, '
+              f'{len(quarantine.records) - quarantined_count} quarantined) in {time.perf_counter() - start_time:.2f}s')
+
+    watcher = FolderWatcher(input_path)
+    while True:
+        lines_by_file = read_files(watcher.poll())
+        text_files = list(lines_by_file)
+        for batch in group_batches([len(lines_by_file[text_file]) for text_file in text_files], batch_lines):
+            batch_files = [text_files[position] for position in batch]
+            try:
+                parse_batch(batch_files, [lines_by_file[text_file] for text_file in batch_files])
+            except Exception:
+                # the daemon goes on with the next batch
+                traceback.print_exc()
+                for text_file in batch_files:
+                    if (input_path/text_file).exists():
+                        move_aside(input_path/text_file, failed_path)
+                print(f'failed to parse {", ".join(batch_files)}, moved to {failed_path}', file=sys.stderr)
+        if arguments['--once'] and not watcher.has_files():
+            return
+        time.sleep(interval)
+
+if __name__ == '__main__':
+    main()